@@ -0,0 +1,262 @@
+"""
+Servidor HTTP local que substitui a E-utilities nos benchmarks.
+
+Reproduz respostas gravadas do efetch (por padrão tests/fixtures/efetch_sample.xml)
+em qualquer tamanho: os artigos gravados são repetidos com PMIDs novos até
+chegar ao total pedido. O total de uma busca vem do termo (`benchmark_<N>`),
+e cada resposta pode ter latência fixa e 429 a cada N requisições. GET /stats
+devolve os contadores de requisições atendidas.
+
+Uso:
+    python -m benchmarks.eutils_server serve --port 8750 --latency 0.05 --throttle-every 10
+    python -m benchmarks.eutils_server record --query "parkinson disease" --max 1000 -o recorded.xml
+"""
+import re
+import json
+import time
+import argparse
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_RECORDING = BACKEND_DIR / "tests" / "fixtures" / "efetch_sample.xml"
+
+# PMIDs sintéticos começam longe dos reais para não se confundirem com eles
+FIRST_PMID = 90000000
+DEFAULT_SIZE = 100
+
+ARTICLE_PATTERN = re.compile(rb"<PubmedArticle>.*?</PubmedArticle>", re.S)
+PMID_PATTERN = re.compile(rb"<PMID[^>]*>(\d+)</PMID>")
+SIZE_PATTERN = re.compile(r"benchmark_(\d+)")
+XML_HEADER = b'<?xml version="1.0" ?>\n<PubmedArticleSet>\n'
+XML_FOOTER = b"</PubmedArticleSet>\n"
+CHUNK_SIZE = 64 * 1024
+
+
+def search_term(size: int, query: str = "parkinson disease") -> str:
+    """Termo de busca que o servidor responde com `size` PMIDs"""
+    return f"({query}) AND benchmark_{size}"
+
+
+def term_size(term: str, default: int = DEFAULT_SIZE) -> int:
+    match = SIZE_PATTERN.search(term or "")
+    return int(match.group(1)) if match else default
+
+
+class RecordedArticles:
+    """Artigos gravados de um ou mais XML do efetch, repetidos com PMIDs novos sob demanda"""
+
+    def __init__(self, paths: Sequence[Path] = (DEFAULT_RECORDING,)):
+        self.templates: List[tuple] = []
+        for path in paths:
+            for match in ARTICLE_PATTERN.finditer(Path(path).read_bytes()):
+                article = match.group(0)
+                pmid = PMID_PATTERN.search(article).group(1)
+                self.templates.append((article, pmid))
+        if not self.templates:
+            raise ValueError("Nenhum <PubmedArticle> encontrado nas gravações")
+        self._rendered: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def pmids(size: int) -> List[str]:
+        return [str(FIRST_PMID + i) for i in range(size)]
+
+    def article(self, pmid: str) -> bytes:
+        """XML do artigo com o PMID informado (o gravado na posição correspondente)"""
+        rendered = self._rendered.get(pmid)
+        if rendered is None:
+            template, original = self.templates[int(pmid) % len(self.templates)]
+            rendered = template.replace(b">" + original + b"<", b">" + pmid.encode() + b"<")
+            with self._lock:
+                self._rendered[pmid] = rendered
+        return rendered
+
+    def efetch(self, pmids: Sequence[str]) -> bytes:
+        return XML_HEADER + b"".join(self.article(pmid) for pmid in pmids) + XML_FOOTER
+
+
+class EutilsHandler(BaseHTTPRequestHandler):
+    server: "EutilsServer"
+    protocol_version = "HTTP/1.1"
+    # Sem o atraso do Nagle + ACK atrasado, que somaria ~40 ms a cada resposta pequena
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        # Envia em blocos, como o NCBI, para o parser incremental ter o que consumir
+        for start in range(0, len(body), CHUNK_SIZE):
+            self.wfile.write(body[start:start + CHUNK_SIZE])
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        status, body, content_type, headers = self.server.respond(url.path, params)
+        self.send_body(status, body, content_type, headers)
+
+
+class EutilsServer(ThreadingHTTPServer):
+    """
+    Substituto local do esearch (com History server e rettype=count) e do
+    efetch (por id ou por WebEnv). `latency` atrasa cada resposta e
+    `throttle_every` devolve 429 a cada N requisições.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        articles: Optional[RecordedArticles] = None,
+        latency: float = 0.0,
+        throttle_every: int = 0,
+        retry_after: float = 0.0
+    ):
+        super().__init__((host, port), EutilsHandler)
+        self.articles = articles or RecordedArticles()
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.counters = {"requests": 0, "throttled": 0, "esearch": 0, "efetch": 0}
+        self._sequence = itertools.count(1)
+        self._histories: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def respond(self, path: str, params: Dict[str, str]):
+        if path == "/stats":
+            with self._lock:
+                return 200, json.dumps(self.counters).encode(), "application/json", None
+        request_number = next(self._sequence)
+        self._count("requests")
+        if self.latency:
+            time.sleep(self.latency)
+        if self.throttle_every and request_number % self.throttle_every == 0:
+            self._count("throttled")
+            body = b'{"error":"API rate limit exceeded"}'
+            return 429, body, "application/json", {"Retry-After": str(self.retry_after)}
+
+        retstart, retmax = int(params.get("retstart", 0)), int(params.get("retmax", 20))
+        if path.endswith("/esearch.fcgi"):
+            self._count("esearch")
+            pmids = self.articles.pmids(term_size(params.get("term", "")))
+            if params.get("rettype") == "count":
+                result = {"count": str(len(pmids))}
+            else:
+                result = {"count": str(len(pmids)), "idlist": pmids[retstart:retstart + retmax]}
+                if params.get("usehistory") == "y":
+                    webenv = f"MCID_bench_{request_number}"
+                    with self._lock:
+                        self._histories[webenv] = pmids
+                    result.update({"webenv": webenv, "querykey": "1"})
+            return 200, json.dumps({"esearchresult": result}).encode(), "application/json", None
+        if path.endswith("/efetch.fcgi"):
+            self._count("efetch")
+            if "id" in params:
+                pmids = params["id"].split(",")
+            else:
+                pmids = self._histories.get(params.get("WebEnv"), [])[retstart:retstart + retmax]
+            return 200, self.articles.efetch(pmids), "text/xml", None
+        return 404, b"", "text/plain", None
+
+    def start(self) -> "EutilsServer":
+        """Atende em uma thread de fundo (uso dentro do processo, ex.: testes)"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "EutilsServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def record(query: str, max_results: int, output: Path, api_key: Optional[str] = None):
+    """Grava o efetch real de uma busca para ser reproduzido pelo servidor"""
+    from med_search.models.schemas import SearchRequest
+    from med_search.services.pubmed import PubMedClient
+
+    client = PubMedClient(api_key=api_key, article_cache=None, search_cache=None)
+    pmids = client.search_pmids_articles(SearchRequest(query=query, max_results=max_results))
+    with open(output, "wb") as file:
+        file.write(XML_HEADER)
+        for batch in client._pmid_batches(pmids):
+            response = client._get("efetch.fcgi", client._build_fetch_params(batch))
+            file.write(b"".join(ARTICLE_PATTERN.findall(response.content)))
+        file.write(XML_FOOTER)
+    client.close()
+    print(f"{len(pmids)} artigos gravados em {output}")
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Atende como E-utilities local")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=0, help="0 escolhe uma porta livre")
+    serve.add_argument("--latency", type=float, default=0.0, help="Segundos de atraso por resposta")
+    serve.add_argument("--throttle-every", type=int, default=0, help="Devolve 429 a cada N requisições")
+    serve.add_argument("--retry-after", type=float, default=0.0, help="Retry-After dos 429, em segundos")
+    serve.add_argument("--recording", type=Path, action="append", help="XML do efetch gravado (repetível)")
+
+    rec = commands.add_parser("record", help="Grava o efetch de uma busca real no NCBI")
+    rec.add_argument("--query", required=True)
+    rec.add_argument("--max", type=int, default=1000)
+    rec.add_argument("--api-key")
+    rec.add_argument("-o", "--output", type=Path, required=True)
+
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        record(args.query, args.max, args.output, args.api_key)
+        return
+
+    server = EutilsServer(
+        args.host,
+        args.port,
+        RecordedArticles(args.recording or [DEFAULT_RECORDING]),
+        latency=args.latency,
+        throttle_every=args.throttle_every,
+        retry_after=args.retry_after
+    )
+    # A primeira linha informa a URL para quem iniciou o processo
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Modelo de chat falso e determinístico para os testes de carga.
+
+Responde pelo estado da conversa, então sessões simultâneas não interferem
+entre si:
+
+- mensagem do usuário com uma pergunta -> chamada de medical_query (e, com
+  `web_search`, de search_query em paralelo)
+- mensagem do usuário confirmando ("sim") -> chamada de pubmed_research com a estratégia
+- resultado de ferramenta -> resposta final em texto
+- prompt das ferramentas (sem mensagem de sistema) -> estratégia de busca
+
+Cada chamada espera `delay` segundos (e `token_delay` por token no streaming),
+simulando a latência do Gemini sem bloquear o event loop.
+"""
+import json
+import time
+import asyncio
+import itertools
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from med_search.agent.langgraph import models
+
+from benchmarks.eutils_server import search_term
+
+# Mensagens do usuário tratadas como confirmação da busca
+CONFIRMATIONS = {"sim", "s", "yes", "ok", "pode buscar", "confirmo"}
+
+DEFAULT_RESULTS = 10
+
+_call_ids = itertools.count(1)
+
+
+def fake_strategy(results: int = DEFAULT_RESULTS) -> str:
+    """Estratégia compilável localmente; o servidor da E-utilities devolve `results` PMIDs"""
+    return search_term(results, '("Parkinson Disease"[Mesh] OR parkinson) AND ("Deep Brain Stimulation"[Mesh] OR DBS)')
+
+
+class FakeChatModel(BaseChatModel):
+    """Modelo de chat com respostas roteirizadas e latência configurável"""
+
+    model: str = "fake-chat"
+    temperature: float = 0.7
+    delay: float = 0.05
+    token_delay: float = 0.0
+    results: int = DEFAULT_RESULTS
+    web_search: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Sequence, **kwargs) -> "FakeChatModel":
+        return self
+
+    def _tool_call(self, name: str, **args) -> Dict[str, Any]:
+        return {"name": name, "args": args, "id": f"call_{next(_call_ids)}", "type": "tool_call"}
+
+    def respond(self, messages: List[BaseMessage]) -> AIMessage:
+        if not messages or not isinstance(messages[0], SystemMessage):
+            # Chamada feita de dentro de uma ferramenta (geração da estratégia)
+            return self._message(f"Estratégia final:\n```\n{fake_strategy(self.results)}\n```")
+
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            if last.name == "medical_query":
+                return self._message("Esta é a estratégia de busca proposta. Deseja que eu realize a busca no PubMed?")
+            return self._message(f"Resumo dos resultados encontrados ({len(str(last.content))} caracteres analisados).")
+        text = str(last.content).strip()
+        if isinstance(last, HumanMessage) and text.lower() in CONFIRMATIONS:
+            return self._message("", [self._tool_call("pubmed_research", query=fake_strategy(self.results))])
+        calls = [self._tool_call("medical_query", query=text)]
+        if self.web_search:
+            calls.append(self._tool_call("search_query", query=text))
+        return self._message("", calls)
+
+    @staticmethod
+    def _message(content: str, tool_calls: Optional[List[Dict[str, Any]]] = None) -> AIMessage:
+        tokens = len(content.split()) + 10 * len(tool_calls or [])
+        return AIMessage(
+            content=content,
+            tool_calls=tool_calls or [],
+            usage_metadata={"input_tokens": 100, "output_tokens": tokens, "total_tokens": 100 + tokens}
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.delay)
+        for chunk in self._chunks(self.respond(messages)):
+            time.sleep(self.token_delay)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.delay)
+        for chunk in self._chunks(self.respond(messages)):
+            await asyncio.sleep(self.token_delay)
+            yield chunk
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> List[ChatGenerationChunk]:
+        """Tokens do texto (um por palavra) e as chamadas de ferramenta em um único bloco final"""
+        words = message.content.split(" ") if message.content else []
+        chunks = [
+            ChatGenerationChunk(message=AIMessageChunk(content=word if not index else " " + word))
+            for index, word in enumerate(words)
+        ]
+        tool_call_chunks = [
+            {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+            for index, call in enumerate(message.tool_calls)
+        ]
+        chunks.append(ChatGenerationChunk(message=AIMessageChunk(
+            content="", tool_call_chunks=tool_call_chunks, usage_metadata=message.usage_metadata
+        )))
+        return chunks
+
+
+class FakeWebSearch:
+    """Busca na web falsa com a interface usada por search_query (`invoke`)"""
+
+    def __init__(self, max_results: int = 2, delay: float = 0.05):
+        self.max_results = max_results
+        self.delay = delay
+
+    def invoke(self, query: str) -> List[Dict[str, str]]:
+        time.sleep(self.delay)
+        return [
+            {"url": f"https://example.org/{index}", "content": f"Resultado {index} sobre {query}"}
+            for index in range(self.max_results)
+        ]
+
+
+def install_fake_models(model: FakeChatModel, web_search_delay: float = 0.05):
+    """Faz o registro de modelos do agente devolver o modelo falso (e a busca na web falsa)"""
+    models.set_model_factories(
+        chat=lambda name, temperature: model,
+        web_search=lambda max_results: FakeWebSearch(max_results, web_search_delay)
+    )
+
+
+def uninstall_fake_models():
+    models.set_model_factories()
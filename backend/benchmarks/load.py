@@ -0,0 +1,347 @@
+"""
+Teste de carga dos endpoints do chat com o modelo falso (benchmarks/fake_llm.py)
+e a E-utilities local (benchmarks/eutils_server.py).
+
+O driver chama o app ASGI diretamente, sem rede, em estágios com número
+crescente de sessões simultâneas. Cada sessão conversa em dois turnos
+(pergunta -> estratégia, "sim" -> busca no PubMed) por /chat/message ou
+/chat/stream. Para cada estágio reporta requisições/s, latência p50/p95/p99
+(e do primeiro token no stream), atraso do event loop e memória por sessão.
+Atraso alto no event loop indica chamadas bloqueantes no caminho assíncrono.
+
+Uso (a partir de backend/):
+    python -m benchmarks.load --stages 1,5,10,25,50 --duration 10 --endpoint stream
+    python -m benchmarks.load --llm-delay 0.5 --eutils-latency 0.1 --max-lag-ms 50 --output load.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+import resource
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.fake_llm import FakeChatModel, install_fake_models, uninstall_fake_models
+from benchmarks.run import percentile, serve
+
+ENDPOINTS = ("message", "stream")
+DEFAULT_STAGES = (1, 5, 10, 25)
+
+# Intervalo da medição do atraso do event loop
+LAG_INTERVAL = 0.01
+
+_questions = itertools.count(1)
+
+
+@dataclass
+class StageResult:
+    concurrency: int
+    endpoint: str
+    sessions: int
+    requests: int
+    errors: int
+    duration: float
+    rps: float
+    p50: float
+    p95: float
+    p99: float
+    first_token_p50: Optional[float]
+    first_token_p99: Optional[float]
+    loop_lag_p99: float
+    loop_lag_max: float
+    memory_per_session: float
+    rss: int
+
+
+def current_rss() -> int:
+    """Memória residente do processo em bytes (pico, fora do Linux)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LoopLagMonitor:
+    """Mede o quanto cada `sleep(interval)` atrasa: tempo em que o loop ficou bloqueado"""
+
+    def __init__(self, interval: float = LAG_INTERVAL):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def reset(self) -> List[float]:
+        samples, self.samples = self.samples, []
+        return samples
+
+
+class ASGIResponse:
+    def __init__(self):
+        self.status = 0
+        self.chunks: List[Tuple[float, bytes]] = []
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(chunk for _, chunk in self.chunks)
+
+
+async def asgi_post(app, path: str, payload: Dict[str, Any]) -> ASGIResponse:
+    """
+    POST direto no app ASGI, guardando o instante de cada bloco do corpo
+    (o ASGITransport do httpx só devolve a resposta completa).
+    """
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"loadtest"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("loadtest", 80)
+    }
+    response = ASGIResponse()
+    finished = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # O cliente só "desconecta" depois de receber a resposta inteira
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                response.chunks.append((time.perf_counter(), message["body"]))
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    return response
+
+
+def sse_events(body: bytes) -> List[Tuple[str, Dict[str, Any]]]:
+    events = []
+    for frame in body.decode().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":") and ": " in line)
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines.get("data", "{}"))))
+    return events
+
+
+class Conversations:
+    """Sessões de dois turnos contra um endpoint, acumulando latências e erros"""
+
+    def __init__(self, app, endpoint: str):
+        self.app = app
+        self.endpoint = endpoint
+        self.latencies: List[float] = []
+        self.first_tokens: List[float] = []
+        self.errors = 0
+        self.sessions = 0
+
+    async def turn(self, message: str, session_id: Optional[str]) -> Optional[str]:
+        payload = {"message": message, "session_id": session_id}
+        started = time.perf_counter()
+        response = await asgi_post(self.app, f"/chat/{self.endpoint}", payload)
+        self.latencies.append(time.perf_counter() - started)
+        if response.status != 200:
+            self.errors += 1
+            return None
+        if self.endpoint == "message":
+            return json.loads(response.body)["session_id"]
+
+        events = sse_events(response.body)
+        first_token = next((at for at, chunk in response.chunks if b"event: token" in chunk), None)
+        if first_token is not None:
+            self.first_tokens.append(first_token - started)
+        done = [data for kind, data in events if kind == "done"]
+        if not done or any(kind == "error" for kind, _ in events):
+            self.errors += 1
+            return None
+        return done[0]["session_id"]
+
+    async def run_one(self):
+        question = f"Pergunta {next(_questions)}: DBS melhora a qualidade de vida de idosos com Parkinson avançado?"
+        session_id = await self.turn(question, None)
+        if session_id is not None:
+            await self.turn("sim", session_id)
+        self.sessions += 1
+
+
+async def run_stage(app, endpoint: str, concurrency: int, duration: float, monitor: LoopLagMonitor) -> StageResult:
+    conversations = Conversations(app, endpoint)
+    rss_before = current_rss()
+    monitor.reset()
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await conversations.run_one()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    lag = monitor.reset() or [0.0]
+    rss = current_rss()
+    latencies = conversations.latencies or [0.0]
+    first_tokens = conversations.first_tokens
+    return StageResult(
+        concurrency=concurrency,
+        endpoint=endpoint,
+        sessions=conversations.sessions,
+        requests=len(conversations.latencies),
+        errors=conversations.errors,
+        duration=elapsed,
+        rps=len(conversations.latencies) / elapsed,
+        p50=percentile(latencies, 0.5),
+        p95=percentile(latencies, 0.95),
+        p99=percentile(latencies, 0.99),
+        first_token_p50=percentile(first_tokens, 0.5) if first_tokens else None,
+        first_token_p99=percentile(first_tokens, 0.99) if first_tokens else None,
+        loop_lag_p99=percentile(lag, 0.99),
+        loop_lag_max=max(lag),
+        memory_per_session=max(0, rss - rss_before) / max(1, conversations.sessions),
+        rss=rss
+    )
+
+
+async def run_load(
+    app,
+    stages: Sequence[int] = DEFAULT_STAGES,
+    duration: float = 10.0,
+    endpoints: Sequence[str] = ("message",)
+) -> List[StageResult]:
+    """Executa os estágios em ordem, depois de uma conversa de aquecimento (compila o grafo)"""
+    monitor = LoopLagMonitor()
+    monitor.start()
+    results = []
+    try:
+        for endpoint in endpoints:
+            await Conversations(app, endpoint).run_one()
+            for concurrency in stages:
+                results.append(await run_stage(app, endpoint, concurrency, duration, monitor))
+    finally:
+        await monitor.stop()
+    return results
+
+
+def configure_environment(eutils_url: str, cache: bool):
+    """Aponta o cliente PubMed para o servidor local; sem cache, toda sessão vai à E-utilities"""
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    os.environ.setdefault("TAVILY_API_KEY", "fake")
+    os.environ["PUBMED_EUTILS_URL"] = eutils_url
+    os.environ.setdefault("PUBMED_RATE_LIMIT", "1000")
+    if not cache:
+        os.environ["PUBMED_ARTICLE_CACHE"] = "off"
+        os.environ["PUBMED_SEARCH_CACHE"] = "off"
+        os.environ["LLM_CACHE_MEDICAL_QUERY"] = "off"
+
+
+def format_table(results: Sequence[StageResult]) -> str:
+    header = (
+        f"{'endpoint':<9}{'sessões':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'1º token ms':>13}{'lag p99 ms':>12}{'lag máx ms':>12}{'KiB/sessão':>12}{'erros':>7}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        first_token = f"{r.first_token_p50 * 1000:.1f}" if r.first_token_p50 is not None else "-"
+        lines.append(
+            f"{r.endpoint:<9}{r.concurrency:>8}{r.rps:>9.1f}{r.p50 * 1000:>9.1f}{r.p95 * 1000:>9.1f}"
+            f"{r.p99 * 1000:>9.1f}{first_token:>13}{r.loop_lag_p99 * 1000:>12.1f}{r.loop_lag_max * 1000:>12.1f}"
+            f"{r.memory_per_session / 1024:>12.1f}{r.errors:>7}"
+        )
+    return "\n".join(lines)
+
+
+async def load_app_and_run(args: argparse.Namespace, eutils_url: str) -> List[StageResult]:
+    configure_environment(eutils_url, args.cache)
+    install_fake_models(FakeChatModel(
+        delay=args.llm_delay,
+        token_delay=args.token_delay,
+        results=args.results,
+        web_search=args.web_search
+    ))
+    # Importado só depois do ambiente configurado (chaves e URL da E-utilities)
+    from api.main import app
+
+    try:
+        # O lifespan cria o serviço do chat e, ao sair, fecha clientes, sessões e checkpointer
+        async with app.router.lifespan_context(app):
+            return await run_load(app, args.stages, args.duration, args.endpoints)
+    finally:
+        uninstall_fake_models()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(map(str, DEFAULT_STAGES)), help="Sessões simultâneas por estágio")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de cada estágio")
+    parser.add_argument("--endpoint", choices=(*ENDPOINTS, "both"), default="message")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="Latência de cada chamada ao modelo falso (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Intervalo entre tokens no streaming (s)")
+    parser.add_argument("--web-search", action="store_true", help="A primeira resposta também chama a busca na web")
+    parser.add_argument("--results", type=int, default=10, help="Artigos devolvidos por busca")
+    parser.add_argument("--eutils-latency", type=float, default=0.05, help="Latência da E-utilities local (s)")
+    parser.add_argument("--throttle-every", type=int, default=0, help="429 a cada N requisições à E-utilities")
+    parser.add_argument("--cache", action="store_true", help="Mantém os caches de artigos, buscas e LLM ligados")
+    parser.add_argument("--max-lag-ms", type=float, help="Falha (código 1) se o atraso p99 do loop passar deste valor")
+    parser.add_argument("--output", type=Path, help="Salva os resultados em JSON")
+    args = parser.parse_args(argv)
+    args.stages = [int(stage) for stage in args.stages.split(",") if stage]
+    args.endpoints = ENDPOINTS if args.endpoint == "both" else (args.endpoint,)
+
+    with serve(args.eutils_latency, args.throttle_every) as eutils_url:
+        results = asyncio.run(load_app_and_run(args, eutils_url))
+
+    print(format_table(results))
+    if args.output:
+        args.output.write_text(json.dumps([asdict(result) for result in results], indent=2), encoding="utf-8")
+
+    if args.max_lag_ms is not None:
+        blocked = [r for r in results if r.loop_lag_p99 * 1000 > args.max_lag_ms]
+        if blocked:
+            print(f"\nAtraso do event loop acima de {args.max_lag_ms} ms em {len(blocked)} estágio(s): "
+                  "há chamadas bloqueantes no caminho assíncrono.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Benchmarks offline do cliente PubMed e do parser do efetch.
+
+Para cada tamanho de resultado, mede três cenários contra o substituto local
+da E-utilities (benchmarks/eutils_server.py):
+
+- search: esearch que devolve a lista de PMIDs, sem o History server (search_pmids_articles)
+- fetch: efetch em lotes paralelos com o parse em streaming (fetch_articles)
+- parse: apenas o parse incremental do XML já em memória (iter_articles_xml)
+
+Reporta vazão (artigos/s), latência p50/p99 das repetições e pico de memória
+(tracemalloc, em uma execução separada para não distorcer os tempos). Com
+--baseline, compara com um resultado salvo e termina com código 1 quando
+algum cenário piora além da tolerância.
+
+Uso (a partir de backend/):
+    python -m benchmarks.run --sizes 10,100,1000,10000 --repeat 5 --output bench.json
+    python -m benchmarks.run --latency 0.05 --throttle-every 20 --baseline bench.json
+"""
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+
+from med_search.models.schemas import SearchRequest
+from med_search.services.pubmed import AsyncPubMedClient
+from med_search.services.pubmed_parser import iter_articles_xml
+from med_search.services.rate_limit import RequestScheduler
+
+from benchmarks.eutils_server import RecordedArticles, search_term
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+SCENARIOS = ("search", "fetch", "parse")
+
+# Piora aceita em relação à linha de base antes de acusar regressão
+DEFAULT_TOLERANCE = 0.25
+
+
+@dataclass
+class BenchmarkResult:
+    scenario: str
+    size: int
+    repeat: int
+    p50: float
+    p99: float
+    mean: float
+    throughput: float
+    peak_memory: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.scenario}[{self.size}]"
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Percentil pelo método do posto mais próximo"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(scenario: str, size: int, durations: List[float], peak_memory: int) -> BenchmarkResult:
+    p50 = percentile(durations, 0.5)
+    return BenchmarkResult(
+        scenario=scenario,
+        size=size,
+        repeat=len(durations),
+        p50=p50,
+        p99=percentile(durations, 0.99),
+        mean=sum(durations) / len(durations),
+        throughput=size / p50 if p50 else float("inf"),
+        peak_memory=peak_memory
+    )
+
+
+async def measure(run: Callable[[], Awaitable], repeat: int, warmup: int = 1) -> tuple:
+    """Durações das repetições e o pico de memória de uma execução extra sob tracemalloc"""
+    for _ in range(warmup):
+        await run()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run()
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        await run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return durations, peak
+
+
+def make_client(base_url: str) -> AsyncPubMedClient:
+    """Cliente sem caches (cada repetição vai ao servidor) e sem o limite de taxa do NCBI"""
+    return AsyncPubMedClient(
+        api_key="benchmark",
+        base_url=base_url,
+        scheduler=RequestScheduler(rate=10000, backoff_base=0.01, backoff_max=0.1),
+        article_cache=None,
+        search_cache=None,
+        corpus=None,
+        max_concurrency=10
+    )
+
+
+async def run_benchmarks(
+    base_url: str,
+    articles: RecordedArticles,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    repeat: int = 5,
+    scenarios: Sequence[str] = SCENARIOS
+) -> List[BenchmarkResult]:
+    client = make_client(base_url)
+    results = []
+    try:
+        for size in sizes:
+            request = SearchRequest(query=search_term(size), max_results=size)
+            pmids = articles.pmids(size)
+            payload = articles.efetch(pmids)
+
+            async def search():
+                found = await client.search_pmids_articles(request)
+                assert len(found) == size, f"esearch devolveu {len(found)} de {size} PMIDs"
+
+            async def fetch():
+                fetched = await client.fetch_articles(pmids)
+                assert fetched is not None and len(fetched) == size, "efetch incompleto"
+
+            async def parse():
+                # Lido em blocos, como o stream do efetch chega ao parser
+                parsed = sum(1 for _ in iter_articles_xml(io.BytesIO(payload)))
+                assert parsed == size, f"parse devolveu {parsed} de {size} artigos"
+
+            runs = {"search": search, "fetch": fetch, "parse": parse}
+            for scenario in scenarios:
+                durations, peak = await measure(runs[scenario], repeat)
+                results.append(summarize(scenario, size, durations, peak))
+    finally:
+        await client.aclose()
+    return results
+
+
+def compare(
+    results: Sequence[BenchmarkResult],
+    baseline: Dict[str, Dict],
+    tolerance: float = DEFAULT_TOLERANCE
+) -> List[str]:
+    """Cenários cujo p50 ou pico de memória pioraram além da tolerância"""
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.key)
+        if previous is None:
+            continue
+        for metric in ("p50", "peak_memory"):
+            before, after = previous[metric], getattr(result, metric)
+            if before and after > before * (1 + tolerance):
+                regressions.append(f"{result.key} {metric}: {before:.6g} -> {after:.6g} (+{after / before - 1:.0%})")
+    return regressions
+
+
+def format_table(results: Sequence[BenchmarkResult]) -> str:
+    header = f"{'cenário':<18}{'p50 (ms)':>12}{'p99 (ms)':>12}{'artigos/s':>14}{'pico (MiB)':>13}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result.key:<18}{result.p50 * 1000:>12.2f}{result.p99 * 1000:>12.2f}"
+            f"{result.throughput:>14.0f}{result.peak_memory / 2 ** 20:>13.2f}"
+        )
+    return "\n".join(lines)
+
+
+@contextmanager
+def serve(latency: float = 0.0, throttle_every: int = 0, recordings: Sequence[Path] = ()) -> Iterator[str]:
+    """
+    Sobe o servidor em outro processo, para que as respostas não disputem o
+    GIL com o cliente medido nem entrem no pico de memória. Devolve a URL.
+    """
+    command = [
+        sys.executable, "-m", "benchmarks.eutils_server", "serve",
+        "--latency", str(latency),
+        "--throttle-every", str(throttle_every)
+    ]
+    for recording in recordings:
+        command += ["--recording", str(recording)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        url = process.stdout.readline().strip()
+        if not url:
+            raise RuntimeError("O servidor local da E-utilities não iniciou")
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Artigos por busca")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso do servidor por resposta (s)")
+    parser.add_argument("--throttle-every", type=int, default=0, help="429 a cada N requisições")
+    parser.add_argument("--recording", type=Path, action="append", help="XML do efetch gravado (repetível)")
+    parser.add_argument("--output", type=Path, help="Salva os resultados em JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    articles = RecordedArticles(args.recording) if args.recording else RecordedArticles()
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    scenarios = [scenario for scenario in args.scenarios.split(",") if scenario]
+    with serve(args.latency, args.throttle_every, args.recording or []) as url:
+        results = asyncio.run(run_benchmarks(url, articles, sizes, args.repeat, scenarios))
+        served = httpx.get(f"{url}/stats").json()
+
+    print(format_table(results))
+    print(f"\nservidor: {served}")
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "latency": args.latency,
+            "throttle_every": args.throttle_every,
+            "results": {result.key: asdict(result) for result in results}
+        }
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressões:\n" + "\n".join(f"- {line}" for line in regressions))
+            return 1
+        print("\nSem regressões em relação à linha de base.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
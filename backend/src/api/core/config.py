@@ -4,6 +4,9 @@ import os
 from dotenv import load_dotenv
 
 load_dotenv()
+# Depois do .env, que pode definir MED_SEARCH_CACHE_DIR
+from med_search.services.cache import DEFAULT_CACHE_DIR  # noqa: E402
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 PUBMED_API_KEY = os.getenv("PUBMED_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
@@ -27,6 +30,17 @@ class Settings(BaseSettings):
     # Session Management
     session_timeout_minutes: int = 30
     max_sessions: int = 1000
+    session_store: str = "memory"  # memory | sqlite (compartilhado entre workers)
+    session_store_path: str = os.path.join(DEFAULT_CACHE_DIR, "sessions.sqlite3")
+    session_sweep_interval_seconds: int = 60
+    checkpointer_backend: str = "memory"  # memory | sqlite
+    checkpointer_path: str = os.path.join(DEFAULT_CACHE_DIR, "checkpoints.sqlite3")
+
+    # Streaming (SSE)
+    sse_heartbeat_seconds: float = 15.0
+
+    # Inicialização: compila o grafo e cria os clientes no startup em vez de na primeira requisição
+    warmup_on_startup: bool = False
 
     # Logging
     log_level: str = "INFO"
@@ -0,0 +1,56 @@
+import json
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+# Comentário SSE: mantém a conexão viva através de proxies sem gerar evento no cliente
+HEARTBEAT_FRAME = ": ping\n\n"
+
+
+def sse_event(event: Dict[str, Any]) -> str:
+    """Formata um evento tipado ({"type": ..., ...}) como frame text/event-stream"""
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+async def sse_stream(
+    events: AsyncIterator[Dict[str, Any]],
+    heartbeat_interval: float = 15.0,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+) -> AsyncIterator[str]:
+    """
+    Converte eventos em frames SSE, enviando um ping sempre que nada for
+    produzido em `heartbeat_interval` segundos. Se o cliente desconectar, a
+    geração dos eventos é cancelada (e com ela a execução do agente).
+    """
+    iterator = events.__aiter__()
+    pending: Optional[asyncio.Task] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            # Não usa wait_for: o timeout do heartbeat não pode cancelar o próximo evento
+            done, _ = await asyncio.wait({pending}, timeout=heartbeat_interval)
+            if is_disconnected is not None and await is_disconnected():
+                break
+            if not done:
+                yield HEARTBEAT_FRAME
+                continue
+            task, pending = pending, None
+            try:
+                event = task.result()
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                yield sse_event({"type": "error", "message": str(e)})
+                break
+            yield sse_event(event)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                pass
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -1,14 +1,33 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import chat
+from api.routes import chat, metrics, search
 from api.core.config import get_settings
+from api.services.agent_service import AgentService
+from med_search.services.pubmed import close_async_pubmed_client
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serviço do chat e varredura de sessões existem só enquanto o servidor está de pé
+    chat.agent_services = AgentService()
+    chat.agent_services.start()
+    # Modelos, ferramentas e grafo são carregados sob demanda; o warm-up antecipa isso para o startup
+    if settings.warmup_on_startup:
+        await chat.agent_services.warm_up()
+    yield
+    # Fecha o pool de conexões compartilhado com a E-utilities
+    await close_async_pubmed_client()
+    # Interrompe (e aguarda) a varredura de sessões e fecha sessões e checkpointer
+    await chat.agent_services.close()
+    chat.agent_services = None
+
 app = FastAPI(
     title="Med-Research API",
     description= "API para agente de busca médica",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS para frontend
@@ -22,6 +41,8 @@ app.add_middleware(
 
 # Rotas
 app.include_router(chat.router)
+app.include_router(search.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
@@ -14,3 +14,6 @@ class SearchRequest(BaseModel):
     query: str = Field(..., description="Query de busca médica")
     filter: Optional[Dict[str, Any]] = Field(None, description="Filtros de busca")
     max_results: Optional[int] = Field(None, description="Número máximo de resultados")
+
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest] = Field(..., min_length=1, max_length=50, description="Estratégias de busca executadas em conjunto")
@@ -7,7 +7,8 @@ class Chatresponse(BaseModel):
     session_id: str = Field(..., description="Id da Sessão")
     sources: Optional[List[Dict[str, Any]]] = Field(None, description="Fontes utilizadas")
     response_metadata: Optional[Dict[str, Any]] = None
-    usage_metadata: Optional[Dict[str, Any]] = None
+    usage_metadata: Optional[Dict[str, Any]] = Field(None, description="Tokens somados de todas as chamadas ao LLM do turno")
+    timings: Optional[Dict[str, Any]] = Field(None, description="Tempo total e por etapa (ferramentas, E-utilities, LLM)")
     # tool_calls: Optional[List[Dict[str, Any]]] = None
     type: Optional[str]
     timestamp: datetime = Field(default_factory=datetime.now)
@@ -22,9 +23,37 @@ class SearchResult(BaseModel):
     publication_date: Optional[str] 
     relevance_score: Optional[float]
 
+    @classmethod
+    def from_article(cls, article: Dict[str, Any]) -> "SearchResult":
+        """Converte um artigo do efetch (com `relevance_score` do índice BM25, se houver)"""
+        return cls(
+            title=article.get("title", ""),
+            abstract=article.get("simple_abstract", ""),
+            authors=article.get("authors", []),
+            journal=article.get("journal", ""),
+            pubmed_id=article["pmid"],
+            doi=article.get("doi"),
+            publication_date=article.get("publication_date"),
+            relevance_score=article.get("relevance_score")
+        )
+
 class SearchResponse(BaseModel):
     results: List[SearchResult]
     total_found: int
     query_used: str
     execution_time: float
+    timings: Optional[Dict[str, Any]] = Field(None, description="Tempo por etapa (E-utilities, parse do XML)")
+    next_cursor: Optional[str] = Field(None, description="Cursor da próxima página (None na última)")
+
 
+class BatchStrategyResult(BaseModel):
+    query_used: str
+    pmids: List[str] = Field(..., description="PMIDs encontrados pela estratégia, na ordem do PubMed")
+
+class BatchSearchResponse(BaseModel):
+    strategies: List[BatchStrategyResult]
+    results: List[SearchResult] = Field(..., description="Artigos únicos da união de todas as estratégias")
+    overlap: List[List[int]] = Field(..., description="PMIDs em comum entre cada par de estratégias")
+    unique_found: int
+    execution_time: float
+    timings: Optional[Dict[str, Any]] = Field(None, description="Tempo por etapa (E-utilities, parse do XML)")
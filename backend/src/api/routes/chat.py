@@ -1,13 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
 from api.models.requests import ChatRequest
 from api.models.responses import Chatresponse
 from api.services.agent_service import AgentService
+from api.core.sse import sse_stream
+from typing import Optional
 import json
 import logging
 
 router = APIRouter(prefix="/chat", tags=["chat"])
-agent_services = AgentService()
+# Criado no lifespan do app (api.main), para que importar as rotas não inicie threads nem conexões
+agent_services: Optional[AgentService] = None
 
 @router.post("/message", response_model=Chatresponse)
 async def send_message(request: ChatRequest):
@@ -33,27 +36,29 @@ async def send_message(request: ChatRequest):
         raise HTTPException(status_code=500, detail="Erro interno no servidor")
     
 @router.post("/stream")
-async def stream_message(request: ChatRequest):
-    """Stream da resposta do agente"""
-    async def generate():
-        try:
-            async for chunk in  agent_services.stream_message(
-                message=request.message,
-                session_id=request.session_id
-            ):
-                yield f"data: {json.dumps({'content': chunk})}\n\n"
-        except Exception as e:
-            yield f"data: (json.dumps({'error': str(e)}))\n\n"
+async def stream_message(request: ChatRequest, http_request: Request):
+    """
+    Stream da resposta do agente em Server-Sent Events. Cada frame tem o tipo
+    do evento (token, tool_start, tool_end, article, done, error) e um JSON.
+    """
+    events = agent_services.stream_message(
+        message=request.message,
+        session_id=request.session_id
+    )
     return StreamingResponse(
-        generate(),
-        media_type="text/plain",
-        headers={"Cache-Control": "no-cache"}
+        sse_stream(
+            events,
+            heartbeat_interval=agent_services.settings.sse_heartbeat_seconds,
+            is_disconnected=http_request.is_disconnected
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @router.get("/session/{session_id}/history")
 async def get_session_history(session_id: str):
     """Recupera o histórico de uma sessão"""
-    session = agent_services.sessions.get(session_id)
-    if not session:
+    messages = await agent_services.get_history(session_id)
+    if messages is None:
         raise HTTPException(status_code=404, detail="Sessão não encontrada")
-    return {"messages": session["messages"]}
+    return {"messages": messages}
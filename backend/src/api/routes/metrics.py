@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from med_search.services.telemetry import REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+# Content-Type do formato de exposição em texto do Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Métricas no formato do Prometheus: duração por etapa (ferramentas,
+    E-utilities, parse do XML, LLM), bytes e artigos por resposta, acertos
+    dos caches, 429 do NCBI e tokens do LLM.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
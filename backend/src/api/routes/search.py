@@ -0,0 +1,62 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, Response
+from fastapi.responses import JSONResponse
+
+from api.models.requests import BatchSearchRequest, SearchRequest
+from api.models.responses import BatchSearchResponse, SearchResponse
+from api.services.search_service import SearchService, parse_fields
+
+router = APIRouter(prefix="/search", tags=["search"])
+search_service = SearchService()
+
+FIELDS_DESCRIPTION = "Campos dos resultados separados por vírgula (ex.: title,pubmed_id,doi)"
+
+
+def search_response(body, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+
+@router.post("", response_model=SearchResponse)
+async def search(
+    request: SearchRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Busca direta no PubMed, sem passar pelo agente.
+
+    Args:
+        request (SearchRequest): Estratégia de busca, filtros (date_range, article_types, sort_by) e tamanho da página.
+
+    Returns:
+        SearchResponse: Primeira página dos resultados e o `next_cursor` da próxima.
+    """
+    body, etag = await search_service.search(request, parse_fields(fields), if_none_match)
+    return search_response(body, etag)
+
+
+@router.get("/page", response_model=SearchResponse)
+async def search_page(
+    cursor: str = Query(..., description="Valor de next_cursor da resposta anterior"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Página seguinte de uma busca, buscada pelo WebEnv do History server"""
+    body, etag = await search_service.page(cursor, parse_fields(fields), if_none_match)
+    return search_response(body, etag)
+
+
+@router.post("/batch", response_model=BatchSearchResponse)
+async def search_batch(
+    request: BatchSearchRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
+):
+    """
+    Executa várias estratégias de uma vez (ex.: análises de sensibilidade ou variações por bloco PICOTS).
+    Retorna os PMIDs de cada estratégia, os artigos únicos e a sobreposição entre as estratégias.
+    """
+    return JSONResponse(await search_service.search_batch(request, parse_fields(fields)))
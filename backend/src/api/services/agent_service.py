@@ -1,98 +1,259 @@
+import asyncio
+import json
 import logging
 import uuid
 from datetime import datetime
-from typing import Dict, Any, AsyncGenerator
+from typing import Dict, Any, AsyncGenerator, List, Optional
 from fastapi import HTTPException
-from med_search.agent.langgraph.agent import graph
+from med_search.agent.langgraph.checkpoint import close_checkpointer, open_checkpointer
+from med_search.agent.langgraph.events import ARTICLE_EVENT, article_event
+from med_search.agent.langgraph.prefetch import get_prefetcher
+from med_search.services.mesh import get_mesh_index
+from med_search.services.pubmed import get_async_pubmed_client
+from med_search.services.telemetry import RequestTimings, collect_timings, span
 from api.core.config import get_settings
+from api.services.session_store import create_session_store
+
+# Papéis exibidos no histórico para cada tipo de mensagem do LangChain
+ROLE_BY_TYPE = {"human": "user", "ai": "assistant", "tool": "tool", "system": "system"}
+
+
+def build_graph(checkpointer=None):
+    """Importa o agente (modelos, ferramentas e grafo) só na primeira utilização, fora do boot"""
+    from med_search.agent.langgraph.agent import build_graph as build_agent_graph
+    return build_agent_graph(checkpointer)
+
 
 class AgentService:
     def __init__(self):
         self.settings = get_settings()
-        self.sessions: Dict[str, Any] = {}
-        self.agent = graph
+        # Sessões limitadas a max_sessions e expiradas após session_timeout_minutes sem atividade
+        self.sessions = create_session_store(self.settings)
+        self.sessions.on_evict = self._on_sessions_evicted
+        # O histórico das conversas fica no checkpointer do grafo, por thread_id = session_id
+        self.checkpointer = None
+        self.agent = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def get_agent(self):
+        """Compila o grafo com o checkpointer configurado na primeira utilização"""
+        if self.agent is None:
+            checkpointer = await open_checkpointer(
+                self.settings.checkpointer_backend,
+                self.settings.checkpointer_path
+            )
+            if self.agent is not None:
+                # Outra requisição concorrente já inicializou o agente
+                await close_checkpointer(checkpointer)
+            else:
+                self._loop = asyncio.get_running_loop()
+                self.checkpointer = checkpointer
+                self.agent = build_graph(checkpointer)
+        return self.agent
+
+    def start(self):
+        """Inicia a varredura das sessões expiradas (no startup do servidor)"""
+        self.sessions.start_sweeper(self.settings.session_sweep_interval_seconds)
+
+    async def warm_up(self):
+        """Compila o grafo e cria os clientes antes da primeira requisição (warmup_on_startup)"""
+        await self.get_agent()
+        get_async_pubmed_client()
+        get_mesh_index()
+
+    def _on_sessions_evicted(self, session_ids: List[str]):
+        """Remove o índice de busca e o histórico do checkpointer das sessões expiradas ou descartadas"""
+        from med_search.services.search_index import drop_search_index
+        for session_id in session_ids:
+            drop_search_index(session_id)
+        if self.checkpointer is None or self._loop is None or self._loop.is_closed():
+            return
+        for session_id in session_ids:
+            # A varredura roda em outra thread: agenda a remoção no loop da aplicação
+            asyncio.run_coroutine_threadsafe(self.checkpointer.adelete_thread(session_id), self._loop)
+            self._loop.call_soon_threadsafe(get_prefetcher().cancel, session_id)
+
+    @staticmethod
+    def thread_config(session_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": session_id}}
+
+    @classmethod
+    def run_config(cls, session_id: str) -> Dict[str, Any]:
+        """Configuração de uma execução do grafo, com a medição das ferramentas"""
+        from med_search.agent.langgraph.tracing import get_tool_timing_handler
+        return {**cls.thread_config(session_id), "callbacks": [get_tool_timing_handler()]}
     
+    async def _session_io(self, func, *args):
+        """Executa uma operação do armazenamento de sessões, em uma thread se ela bloqueia em disco"""
+        if self.sessions.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
     async def create_session(self) -> str:
         """Cria uma nova sessão do chat"""
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = {
-            "messages": [],
-            "created_at": datetime.now(),
-            "last_activity": datetime.now()
-        }
+        await self._session_io(self.sessions.set, session_id, {
+            "created_at": datetime.now().isoformat(),
+            "last_activity": datetime.now().isoformat()
+        })
+        return session_id
+
+    async def touch_session(self, session_id: Optional[str]) -> str:
+        """Renova a sessão informada ou cria uma nova; sessões expiradas recomeçam sem histórico"""
+        if not session_id:
+            return await self.create_session()
+        session = await self._session_io(self.sessions.get, session_id)
+        if session is None:
+            await self.get_agent()
+            await self.checkpointer.adelete_thread(session_id)
+            session = {"created_at": datetime.now().isoformat()}
+        session["last_activity"] = datetime.now().isoformat()
+        await self._session_io(self.sessions.set, session_id, session)
         return session_id
+
+    async def get_history(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Histórico completo da sessão (inclusive chamadas de ferramentas), ou None se ela não existe"""
+        if await self._session_io(self.sessions.get, session_id) is None:
+            return None
+        agent = await self.get_agent()
+        state = await agent.aget_state(self.thread_config(session_id))
+        return [
+            {"role": ROLE_BY_TYPE.get(msg.type, msg.type), "content": msg.content}
+            for msg in state.values.get("messages", [])
+        ]
+
+    async def close(self):
+        self.sessions.close()
+        get_prefetcher().cancel_all()
+        if self.checkpointer is not None:
+            await close_checkpointer(self.checkpointer)
+            self.checkpointer = None
+            self.agent = None
+
     async def process_message(
         self,
         message: str,
         session_id: str = None
     ) -> Dict[str, Any]:
         """Processa uma mensagem através do agente LangGraph"""
-        if not session_id:
-            session_id = await self.create_session()
+        with collect_timings() as timings:
+            with span("session.touch"):
+                session_id = await self.touch_session(session_id)
+            agent = await self.get_agent()
 
-        # Recupera o histórico da sessão
-        session = self.sessions.get(session_id, {})
-        messages = session.get("messages", [])
+            # Processa através do agente LangGraph; o histórico é restaurado pelo checkpointer,
+            # então apenas a nova mensagem do usuário é enviada
+            try:
+                with span("agent.turn"):
+                    response = await agent.ainvoke(
+                        {"messages": [{"role": "user", "content": message}]},
+                        config=self.run_config(session_id)
+                    )
 
-        # Adiciona a mensagem do usuário
-        messages.append({"role": "user", "content": message})
+                # Extrai a última mensagem do agente
+                agent_message_obj = response["messages"][-1]
+                agent_message = agent_message_obj.content
+                logging.debug("Sessão %s: %d mensagens no estado", session_id, len(response["messages"]))
 
-        # Processa através do agente LangGraph
-        try:
-            response = await self.agent.ainvoke({
-                "messages": messages,
-                "session_id": session_id
-            })
-
-            logging.info(f"Response completo do agente: {response}") # Log do response completo
-
-            # Extrai a última mensagem do agente
-            agent_message_obj = response["messages"][-1]
-            agent_message = agent_message_obj.content
-            logging.info(f"Dado da última mensagem: {agent_message_obj}") # Log da última mensagem retornada
-
-            # Extrai os metadados da última mensagem do agente
-            response_metadata = getattr(agent_message_obj, "response_metadata", {})
-            usage_metadata = getattr(agent_message_obj, "usage_metadata", {})
-            type = getattr(agent_message_obj, "type")
-        
-            # Atualiza a sessão
-            messages.append({"role": "assistant", "content": agent_message})
-            self.sessions[session_id] = {
-                "messages": messages,
-                "last_activity": datetime.now()
-            }
+                # Extrai os metadados da última mensagem do agente
+                response_metadata = getattr(agent_message_obj, "response_metadata", {})
+                type = getattr(agent_message_obj, "type")
+
+                # Retorna os dados processados
+                return {
+                    "message": agent_message,
+                    "session_id": session_id,
+                    "sources": [],
+                    "response_metadata": response_metadata,
+                    "usage_metadata": turn_usage(timings, agent_message_obj),
+                    "timings": timings.as_dict(),
+                    "type": type,
+                    "timestamp": datetime.now().isoformat()
+                }
+
+            except Exception as e:
+                logging.error(f"Erro ao processar mensagem: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Erro no agente: {str(e)}")
 
-            # Retorna os dados processados
-            return {
-                "message": agent_message,
-                "session_id": session_id,
-                "sources": [],
-                "response_metadata": response_metadata,
-                "usage_metadata": usage_metadata,
-                "type": type,
-                "timestamp": datetime.now().isoformat()
-            }
-        
-        except Exception as e:
-            logging.error(f"Erro ao processar mensagem: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Erro no agente: {str(e)}")
     async def stream_message(
             self,
             message: str,
             session_id: str = None
-    )-> AsyncGenerator[str, None]:
-        """Stream da resposta do agente"""
-        if not session_id:
-            session_id = await self.create_session()
-        
-        session = self.sessions.get(session_id, {})
-        messages = session.get("messages", [])
-        messages.append({"role": "user", "content": message})
-
-        async for chunk in self.agent.astream({
-            "messages": messages,
-            "session_id": session_id
-        }):
-            if "messages" in chunk:
-                yield chunk["messages"][-1].content
+    )-> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream da resposta do agente como eventos tipados: token, tool_start,
+        tool_end, article, done e error. Os tokens são enviados à medida que o
+        modelo os gera, sem esperar o fim de cada nó do grafo.
+        """
+        # Etapas e tokens do turno; o grafo roda em uma tarefa criada na primeira iteração
+        with collect_timings() as timings:
+            with span("session.touch"):
+                session_id = await self.touch_session(session_id)
+            agent = await self.get_agent()
+
+            content = ""
+            # PMIDs já enviados neste turno, para não repetir artigos ao fim da ferramenta
+            sent_pmids = set()
+            try:
+                async for event in agent.astream_events(
+                    {"messages": [{"role": "user", "content": message}]},
+                    config=self.run_config(session_id),
+                    version="v2"
+                ):
+                    kind = event["event"]
+                    metadata = event.get("metadata", {})
+                    if kind == "on_chat_model_stream":
+                        # Ignora LLMs chamados dentro das ferramentas (ex.: geração da estratégia)
+                        if metadata.get("langgraph_node") != "agent":
+                            continue
+                        token = event["data"]["chunk"].content
+                        if isinstance(token, str) and token:
+                            content += token
+                            yield {"type": "token", "content": token}
+                    elif kind == "on_custom_event" and event["name"] == ARTICLE_EVENT:
+                        # Artigos chegam durante a busca, antes de o modelo narrar o resultado
+                        sent_pmids.add(event["data"]["pmid"])
+                        yield {"type": "article", **event["data"]}
+                    elif kind == "on_tool_start":
+                        yield {"type": "tool_start", "tool": event["name"], "input": event["data"].get("input")}
+                    elif kind == "on_tool_end":
+                        for article in tool_articles(event["data"].get("output")):
+                            if article["pmid"] not in sent_pmids:
+                                sent_pmids.add(article["pmid"])
+                                yield {"type": "article", **article_event(article)}
+                        yield {"type": "tool_end", "tool": event["name"]}
+            except Exception as e:
+                logging.error(f"Erro ao processar mensagem: {str(e)}")
+                yield {"type": "error", "message": str(e)}
+                return
+
+            yield {
+                "type": "done",
+                "session_id": session_id,
+                "message": content,
+                "usage_metadata": turn_usage(timings),
+                "timings": timings.as_dict()
+            }
+
+
+def turn_usage(timings: RequestTimings, message: Any = None) -> Dict[str, Any]:
+    """Tokens somados de todas as chamadas ao LLM do turno (agente e ferramentas)"""
+    if timings.usage:
+        return dict(timings.usage)
+    # Modelo chamado fora do gateway: usa o que a última mensagem informa
+    return dict(getattr(message, "usage_metadata", None) or {})
+
+
+def tool_articles(output: Any) -> List[Dict[str, Any]]:
+    """Artigos retornados por uma ferramenta de busca (lista de dicionários com `pmid`)"""
+    content = getattr(output, "content", output)
+    if isinstance(content, str):
+        if not content.startswith("["):
+            return []
+        try:
+            content = json.loads(content)
+        except json.JSONDecodeError:
+            return []
+    if not isinstance(content, list):
+        return []
+    return [item for item in content if isinstance(item, dict) and "pmid" in item]
@@ -0,0 +1,200 @@
+import json
+import base64
+import hashlib
+import binascii
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from api.models.requests import BatchSearchRequest, SearchRequest as ApiSearchRequest
+from api.models.responses import SearchResult
+from med_search.models.schemas import ArticleType, SearchHistory, SearchRequest
+from med_search.services.cache import search_cache_key
+from med_search.services.pubmed import AsyncPubMedClient, get_async_pubmed_client
+from med_search.services.rate_limit import DeadlineExceeded
+from med_search.services.telemetry import RequestTimings, collect_timings
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+SEARCH_RESULT_FIELDS = set(SearchResult.model_fields)
+
+# Falhas da E-utilities (HTTP, prazo esgotado ou resposta inesperada) viram 502
+EUTILS_ERRORS = (httpx.HTTPError, DeadlineExceeded, KeyError, ValueError)
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return {key: data[key] for key in ("webenv", "query_key", "count", "retstart", "retmax", "query")}
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """Projeção de campos (ex.: `title,pubmed_id,doi`); None retorna todos"""
+    if not fields:
+        return None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - SEARCH_RESULT_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+    return selected
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara o If-None-Match (lista separada por vírgulas, com `*` e prefixo W/) com o ETag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == etag for candidate in candidates
+    )
+
+
+class SearchService:
+    """
+    Busca direta no PubMed, sem o agente: esearch com History server na
+    primeira página e efetch por WebEnv/retstart nas seguintes.
+    """
+
+    def __init__(self, client: Optional[AsyncPubMedClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> AsyncPubMedClient:
+        return self._client or get_async_pubmed_client()
+
+    @staticmethod
+    def build_search_request(request: ApiSearchRequest) -> SearchRequest:
+        """Converte a requisição da API (query, filter, max_results) para a do cliente PubMed"""
+        filters = dict(request.filter or {})
+        query = request.query
+        article_types = [t for t in filters.pop("article_types", None) or [] if t != ArticleType.ALL.value]
+        if article_types:
+            types_block = " OR ".join(f'"{article_type}"[pt]' for article_type in article_types)
+            query = f"({query}) AND ({types_block})"
+        try:
+            return SearchRequest(
+                query=query,
+                date_range=filters.get("date_range"),
+                sort_by=filters.get("sort_by", "relevance"),
+                max_results=min(request.max_results or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+            )
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+    @staticmethod
+    def project(articles: List[Dict], fields: Optional[Set[str]]) -> List[Dict[str, Any]]:
+        return [
+            SearchResult.from_article(article).model_dump(include=fields)
+            for article in articles
+        ]
+
+    def response(
+        self,
+        articles: List[Dict],
+        cursor: Dict[str, Any],
+        fields: Optional[Set[str]],
+        timings: RequestTimings
+    ) -> Dict[str, Any]:
+        next_retstart = cursor["retstart"] + cursor["retmax"]
+        next_cursor = None
+        if next_retstart < cursor["count"]:
+            next_cursor = encode_cursor({**cursor, "retstart": next_retstart})
+        return {
+            "results": self.project(articles, fields),
+            "total_found": cursor["count"],
+            "query_used": cursor["query"],
+            "execution_time": round(timings.elapsed, 4),
+            "timings": timings.as_dict()["stages"],
+            "next_cursor": next_cursor
+        }
+
+    async def search(
+        self,
+        request: ApiSearchRequest,
+        fields: Optional[Set[str]] = None,
+        if_none_match: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Primeira página. Retorna (corpo, ETag); o corpo é None quando o ETag
+        coincide com `if_none_match`, caso em que o efetch nem é feito.
+        """
+        with collect_timings() as timings:
+            search_request = self.build_search_request(request)
+            try:
+                history, pmids = await self.client.search_page(search_request)
+            except EUTILS_ERRORS as e:
+                raise HTTPException(status_code=502, detail=f"Erro ao buscar no PubMed: {e}")
+            # A estratégia (forma canônica e filtros) entra no ETag: buscas diferentes com os mesmos PMIDs não coincidem
+            etag = make_etag(search_cache_key(search_request), pmids, history.count, sorted(fields or []))
+            if etag_matches(if_none_match, etag):
+                return None, etag
+
+            articles = await self.client.fetch_articles(pmids) if pmids else []
+            if articles is None:
+                raise HTTPException(status_code=502, detail="Erro ao buscar os artigos no PubMed")
+            cursor = {
+                "webenv": history.webenv,
+                "query_key": history.query_key,
+                "count": history.count,
+                "retstart": 0,
+                "retmax": search_request.max_results,
+                "query": search_request.query
+            }
+            return self.response(articles, cursor, fields, timings), etag
+
+    async def page(
+        self,
+        cursor_token: str,
+        fields: Optional[Set[str]] = None,
+        if_none_match: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Página seguinte a partir do cursor (WebEnv, query_key e retstart), sem novo esearch"""
+        with collect_timings() as timings:
+            cursor = decode_cursor(cursor_token)
+            # A página de um WebEnv não muda: o ETag sai do próprio cursor
+            etag = make_etag(cursor, sorted(fields or []))
+            if etag_matches(if_none_match, etag):
+                return None, etag
+
+            history = SearchHistory(webenv=cursor["webenv"], query_key=cursor["query_key"], count=cursor["count"])
+            try:
+                articles = await self.client.fetch_history_page(history, cursor["retstart"], cursor["retmax"])
+            except EUTILS_ERRORS as e:
+                raise HTTPException(status_code=502, detail=f"Erro ao buscar no PubMed: {e}")
+            if not articles and cursor["retstart"] < cursor["count"]:
+                # O History server descarta o WebEnv após algumas horas sem uso
+                raise HTTPException(status_code=410, detail="Cursor expirado; refaça a busca")
+            return self.response(articles, cursor, fields, timings), etag
+
+    async def search_batch(self, request: BatchSearchRequest, fields: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Várias estratégias em paralelo, com os artigos da união buscados uma única vez"""
+        with collect_timings() as timings:
+            search_requests = [self.build_search_request(search) for search in request.searches]
+            try:
+                result = await self.client.search_batch(search_requests)
+            except RuntimeError as e:
+                raise HTTPException(status_code=502, detail=str(e))
+            return {
+                "strategies": [
+                    {"query_used": search_request.query, "pmids": pmids}
+                    for search_request, pmids in zip(search_requests, result.hits)
+                ],
+                "results": self.project(result.articles, fields),
+                "overlap": result.overlap,
+                "unique_found": len(result.articles),
+                "execution_time": round(timings.elapsed, 4),
+                "timings": timings.as_dict()["stages"]
+            }
@@ -0,0 +1,226 @@
+import json
+import time
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """
+    Armazenamento das sessões do chat com limite de quantidade (max_sessions)
+    e expiração por inatividade (session_timeout_minutes). Uma thread em
+    segundo plano remove periodicamente as sessões expiradas.
+    """
+
+    # Operações que bloqueiam em disco: o serviço assíncrono as executa fora do loop
+    blocking = False
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        # Chamado com os ids removidos, para liberar dados associados às sessões
+        self.on_evict: Optional[Callable[[List[str]], None]] = None
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna a sessão, ou None se ela não existe ou expirou"""
+
+    @abstractmethod
+    def set(self, session_id: str, session: Dict[str, Any]):
+        """Grava a sessão e renova a sua expiração"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Remove a sessão"""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Remove sessões expiradas e as excedentes; retorna quantas foram removidas"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Quantidade de sessões armazenadas (inclui expiradas ainda não varridas)"""
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def _evicted(self, session_ids: List[str]) -> int:
+        if session_ids and self.on_evict is not None:
+            self.on_evict(session_ids)
+        return len(session_ids)
+
+    def start_sweeper(self, interval: float):
+        """Inicia a varredura periódica em uma thread daemon"""
+        if self._sweeper is not None or interval <= 0:
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval,), daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except Exception:
+                # Uma falha pontual não deve encerrar a varredura
+                logger.exception("Falha na varredura das sessões expiradas")
+
+    def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Sessões em memória do processo, em ordem de última atividade. Ao exceder
+    `max_sessions`, a sessão inativa há mais tempo é descartada na hora.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        super().__init__(max_sessions, ttl_seconds)
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # Leitura sem lock: dict.get é atômico e a expiração é conferida aqui
+        item = self._data.get(session_id)
+        if item is None or item[0] <= time.time():
+            return None
+        return item[1]
+
+    def set(self, session_id: str, session: Dict[str, Any]):
+        evicted = []
+        with self._lock:
+            self._data[session_id] = (time.time() + self.ttl_seconds, session)
+            self._data.move_to_end(session_id)
+            while len(self._data) > self.max_sessions:
+                evicted.append(self._data.popitem(last=False)[0])
+        self._evicted(evicted)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def sweep(self) -> int:
+        now = time.time()
+        removed = []
+        with self._lock:
+            # Como o TTL é o mesmo para todas, as expiradas estão no início da ordem
+            while self._data:
+                session_id, (expires_at, _) = next(iter(self._data.items()))
+                if expires_at > now:
+                    break
+                del self._data[session_id]
+                removed.append(session_id)
+        return self._evicted(removed)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessões persistentes em SQLite (modo WAL), compartilháveis entre workers
+    do uvicorn. Cada thread usa a própria conexão, então as leituras não
+    disputam lock; expiração e limite de quantidade são aplicados na varredura.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_sessions: int, ttl_seconds: float):
+        super().__init__(max_sessions, ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " last_activity REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_activity ON sessions (last_activity)")
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT data FROM sessions WHERE session_id = ? AND last_activity > ?",
+            (session_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, session_id: str, session: Dict[str, Any]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data, last_activity) VALUES (?, ?, ?)",
+            (session_id, json.dumps(session, ensure_ascii=False), time.time())
+        )
+
+    def delete(self, session_id: str):
+        self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def sweep(self) -> int:
+        conn = self._conn
+        cutoff = time.time() - self.ttl_seconds
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = [row[0] for row in conn.execute(
+                "SELECT session_id FROM sessions WHERE last_activity <= ?", (cutoff,)
+            )]
+            excess = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - len(removed) - self.max_sessions
+            if excess > 0:
+                removed += [row[0] for row in conn.execute(
+                    "SELECT session_id FROM sessions WHERE last_activity > ? ORDER BY last_activity LIMIT ?",
+                    (cutoff, excess)
+                )]
+            conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(session_id,) for session_id in removed])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self._evicted(removed)
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        super().close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_session_store(settings) -> SessionStore:
+    """
+    Cria o armazenamento configurado em `session_store` (memory ou sqlite). A
+    varredura em segundo plano não é iniciada aqui: quem usa o armazenamento
+    chama `start_sweeper` quando o servidor sobe.
+    """
+    ttl_seconds = settings.session_timeout_minutes * 60
+    if settings.session_store == "sqlite":
+        store = SQLiteSessionStore(settings.session_store_path, settings.max_sessions, ttl_seconds)
+    elif settings.session_store == "memory":
+        store = MemorySessionStore(settings.max_sessions, ttl_seconds)
+    else:
+        raise ValueError(f"session_store inválido: {settings.session_store}")
+    return store
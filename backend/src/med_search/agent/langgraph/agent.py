@@ -1,22 +1,8 @@
-from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
+from med_search.agent.langgraph.context import get_context_manager
+from med_search.agent.langgraph.graph import build_agent_graph
 from med_search.agent.langgraph.tools import tools
-from dotenv import load_dotenv
-import os
-
-# Configuração das variáveis de ambiente
-
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-# Inicialização do modelo
-model = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0.7,
-    api_key=GEMINI_API_KEY
-)
 
 # Define o prompt do sistema
 system_message = SystemMessage(
@@ -27,26 +13,46 @@ system_message = SystemMessage(
     
     USO DE FERRAMENTAS
     1.  Para estratégia de busca SEMPRE use a ferramenta medical_query para criar estratégias de busca PICOTS e Building Block. 
-        Sempre retorne a estratégia completa ao usuário após utilizar a ferramenta medical_query.
+        Sempre retorne a estratégia completa ao usuário após utilizar a ferramenta medical_query, junto com o total de artigos
+        da estratégia e de cada bloco e os alertas de estratégia vazia ou ampla demais.
 
     2.  Você também é capaz de realizar pesquisas de artigos no PubMed via API utilizando a ferramenta pubmed_research, mas só faça isso após confirmação do usuário;
         Você deve retornar de forma estruturada em markdown o resultado da busca na API trazendo de cada artigo encontrado. Enumere cada artigo e use cada dado retornado com respectivo chave : valor:
         title; authors; journal ublication_date; abstract no idioma original; article_type; keywords; doi; data da puplicação e url.
         ATENÇÃO: Retorne para o usuário TODOS os dados, sem abreviação ou resumo. Traduza apenas as chaves para o idioma do usuário mas nunca o valor. Seja fiel ao json retornado.
 
-    3. Para informações adicionais, use a ferramenta search_web.
+    3. Para perguntas sobre os artigos já retornados nesta conversa (ex.: quais mencionam um desfecho), use a ferramenta search_fetched_articles
+        em vez de uma nova busca no PubMed. Se um resultado antigo aparecer compactado, recupere os artigos com fetch_articles_by_pmid.
+
+    4. Para informações adicionais, use a ferramenta search_web.
+        Quando precisar da web e do PubMed ao mesmo tempo, chame as duas ferramentas na mesma resposta para que rodem em paralelo.
     
     IMPORTANTE!
     Não informe ao usuário o nome das ferramentas que você utiliza, abstraia essa informação utilizando sinônimos.
     """
 )
 
-# Criar o grafo
-try:
-    graph = create_react_agent(
-        model=model,
+def build_graph(checkpointer=None):
+    """Cria o grafo do agente; com checkpointer, o histórico fica salvo por thread_id"""
+    return build_agent_graph(
+        # O gateway escolhe o modelo (com fallback) e limita as chamadas simultâneas
+        model=None,
         tools=tools,
-        prompt=system_message
+        prompt=system_message,
+        # Mantém a entrada do modelo dentro do orçamento de tokens
+        context_manager=get_context_manager(),
+        checkpointer=checkpointer
     )
-except Exception as e:
-    print(f"Erro ao criar o grafo: {e}")
+
+
+_graph = None
+
+
+def __getattr__(name: str):
+    # `graph` (usado pelo langgraph-cli, ver langgraph.json) é compilado no primeiro acesso, não na importação
+    global _graph
+    if name == "graph":
+        if _graph is None:
+            _graph = build_graph()
+        return _graph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,51 @@
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langgraph.checkpoint.base import BaseCheckpointSaver
+
+
+def sqlite_checkpointer_supported() -> bool:
+    """
+    Se o aiosqlite instalado funciona com o AsyncSqliteSaver: a partir do
+    0.22 a conexão deixou de ser uma thread e não tem mais `is_alive()`.
+    """
+    import aiosqlite
+
+    return hasattr(aiosqlite.Connection, "is_alive")
+
+
+async def open_checkpointer(backend: str = "memory", path: str = ":memory:") -> "BaseCheckpointSaver":
+    """
+    Cria o checkpointer do grafo. `memory` guarda o estado no processo;
+    `sqlite` persiste em arquivo e pode ser compartilhado entre workers.
+    """
+    # Importações adiadas: o LangGraph só é carregado quando o agente é inicializado
+    if backend == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        return InMemorySaver()
+    if backend == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        if not sqlite_checkpointer_supported():
+            raise RuntimeError(
+                f"aiosqlite {aiosqlite.__version__} não é compatível com o AsyncSqliteSaver instalado; "
+                "use aiosqlite<0.22 (pyproject.toml) ou checkpointer_backend=memory"
+            )
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = await aiosqlite.connect(path)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        saver = AsyncSqliteSaver(conn)
+        await saver.setup()
+        return saver
+    raise ValueError(f"checkpointer inválido: {backend}")
+
+
+async def close_checkpointer(checkpointer: "BaseCheckpointSaver"):
+    """Fecha a conexão do checkpointer, se ele tiver uma"""
+    conn = getattr(checkpointer, "conn", None)
+    if conn is not None:
+        await conn.close()
@@ -0,0 +1,184 @@
+import os
+import re
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+# Orçamento de tokens do histórico enviado ao modelo a cada chamada
+DEFAULT_CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "16000"))
+# Turnos mais recentes que nunca são compactados
+DEFAULT_CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "2"))
+# Tamanho máximo do conteúdo de uma ferramenta em turnos antigos
+DEFAULT_TOOL_PAYLOAD_MAX_CHARS = int(os.getenv("CONTEXT_TOOL_PAYLOAD_MAX_CHARS", "1500"))
+
+# Estimativa sem chamada de rede: ~4 caracteres por token, mais o custo fixo de cada mensagem
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+PMID_PATTERN = re.compile(r"""["']pmid["']\s*:\s*["']?(\d+)""")
+TITLE_PATTERN = re.compile(r"""["']title["']\s*:\s*["']((?:[^"'\\]|\\.)*)""")
+MAX_TITLE_CHARS = 80
+MAX_QUESTION_CHARS = 200
+# Limites do resumo, para que ele também não cresça com a conversa
+MAX_SUMMARY_QUESTIONS = 10
+MAX_SUMMARY_PMIDS = 50
+COMPACTED_REF_PATTERN = re.compile(r"^- PMID (\d+):", re.MULTILINE)
+
+
+def message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    # Conteúdo multimodal: soma apenas as partes de texto
+    return " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+def estimate_tokens(message: BaseMessage) -> int:
+    """Estimativa de tokens de uma mensagem (texto e argumentos das chamadas de ferramentas)"""
+    chars = len(message_text(message))
+    if isinstance(message, AIMessage):
+        chars += sum(len(str(call.get("args", ""))) + len(call.get("name", "")) for call in message.tool_calls)
+    return math.ceil(chars / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+def extract_article_refs(text: str) -> List[Tuple[str, str]]:
+    """Pares (PMID, título) citados no resultado de uma busca"""
+    refs = []
+    for match in PMID_PATTERN.finditer(text):
+        # O título de cada artigo vem logo depois do seu PMID no JSON retornado
+        next_pmid = PMID_PATTERN.search(text, match.end())
+        window = text[match.end():next_pmid.start() if next_pmid else len(text)]
+        title = TITLE_PATTERN.search(window)
+        refs.append((match.group(1), title.group(1)[:MAX_TITLE_CHARS] if title else ""))
+    return list(dict(refs).items())
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Agrupa as mensagens em turnos, cada um começando por uma mensagem do usuário"""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+class ContextManager:
+    """
+    Mantém o histórico enviado ao LLM dentro de um orçamento de tokens. O
+    estado salvo no checkpointer não é alterado: apenas a entrada do modelo é
+    compactada, em duas etapas e sempre preservando os turnos mais recentes.
+
+    1. Resultados de ferramentas de turnos antigos são reduzidos a referências
+       (PMIDs e títulos), que podem ser reidratadas do cache de artigos.
+    2. Se ainda exceder o orçamento, os turnos mais antigos viram um resumo
+       com as perguntas do usuário e os PMIDs já citados.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_CONTEXT_MAX_TOKENS,
+        recent_turns: int = DEFAULT_CONTEXT_RECENT_TURNS,
+        tool_payload_max_chars: int = DEFAULT_TOOL_PAYLOAD_MAX_CHARS
+    ):
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.tool_payload_max_chars = tool_payload_max_chars
+        # Contagem por id da mensagem: o histórico não é recontado a cada turno
+        self._token_counts: Dict[Tuple[Optional[str], int], int] = {}
+        # Resultados de ferramentas já compactados, pelo id da mensagem
+        self._compacted: Dict[str, ToolMessage] = {}
+
+    def count(self, message: BaseMessage) -> int:
+        if message.id is None:
+            return estimate_tokens(message)
+        key = (message.id, len(message_text(message)))
+        tokens = self._token_counts.get(key)
+        if tokens is None:
+            if len(self._token_counts) > 100_000:
+                self._token_counts.clear()
+            tokens = self._token_counts[key] = estimate_tokens(message)
+        return tokens
+
+    def count_messages(self, messages: Sequence[BaseMessage]) -> int:
+        return sum(self.count(message) for message in messages)
+
+    def compact_tool_message(self, message: ToolMessage) -> ToolMessage:
+        """Substitui o conteúdo volumoso de uma ferramenta por uma referência"""
+        text = message_text(message)
+        if len(text) <= self.tool_payload_max_chars:
+            return message
+        if message.id is not None and message.id in self._compacted:
+            return self._compacted[message.id]
+        refs = extract_article_refs(text)
+        if refs:
+            lines = "\n".join(f"- PMID {pmid}: {title}" for pmid, title in refs)
+            content = (
+                f"[Resultado compactado: {len(refs)} artigos. Use fetch_articles_by_pmid "
+                f"para recuperar os dados completos.]\n{lines}"
+            )
+        else:
+            content = f"{text[:self.tool_payload_max_chars]}\n[... conteúdo truncado]"
+        compacted = ToolMessage(content=content, tool_call_id=message.tool_call_id, name=message.name, id=message.id)
+        if message.id is not None:
+            if len(self._compacted) > 10_000:
+                self._compacted.clear()
+            self._compacted[message.id] = compacted
+        return compacted
+
+    def summarize_turns(self, turns: List[List[BaseMessage]]) -> SystemMessage:
+        """Resumo extrativo (sem chamada ao LLM) dos turnos descartados, já compactados"""
+        questions, pmids = [], []
+        for turn in turns:
+            for message in turn:
+                if isinstance(message, HumanMessage):
+                    questions.append(message_text(message)[:MAX_QUESTION_CHARS])
+                elif isinstance(message, ToolMessage):
+                    # Os resultados já chegam compactados: os PMIDs estão nas referências
+                    pmids.extend(COMPACTED_REF_PATTERN.findall(message_text(message)))
+        pmids = list(dict.fromkeys(pmids))
+        lines = ["Resumo da conversa anterior (turnos antigos omitidos):"]
+        if len(questions) > MAX_SUMMARY_QUESTIONS:
+            lines.append(f"- {len(questions) - MAX_SUMMARY_QUESTIONS} perguntas mais antigas omitidas")
+        lines += [f"- Usuário perguntou: {question}" for question in questions[-MAX_SUMMARY_QUESTIONS:]]
+        if pmids:
+            lines.append(f"- Artigos já encontrados (PMIDs): {', '.join(pmids[-MAX_SUMMARY_PMIDS:])}")
+        return SystemMessage(content="\n".join(lines))
+
+    def compact(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """Retorna o histórico a ser enviado ao modelo, dentro do orçamento sempre que possível"""
+        messages = list(messages)
+        if self.count_messages(messages) <= self.max_tokens:
+            return messages
+
+        turns = split_turns(messages)
+        split = max(len(turns) - self.recent_turns, 0)
+        old = [
+            [self.compact_tool_message(m) if isinstance(m, ToolMessage) else m for m in turn]
+            for turn in turns[:split]
+        ]
+        recent = [message for turn in turns[split:] for message in turn]
+
+        # Descarta turnos antigos inteiros (mantendo pares chamada/resultado de ferramenta válidos)
+        dropped: List[List[BaseMessage]] = []
+        total = self.count_messages(recent) + sum(self.count_messages(turn) for turn in old)
+        while old and total > self.max_tokens:
+            turn = old.pop(0)
+            total -= self.count_messages(turn)
+            dropped.append(turn)
+
+        compacted = [message for turn in old for message in turn]
+        if dropped:
+            compacted.insert(0, self.summarize_turns(dropped))
+        return compacted + recent
+
+
+_context_manager: Optional[ContextManager] = None
+
+
+def get_context_manager() -> ContextManager:
+    global _context_manager
+    if _context_manager is None:
+        _context_manager = ContextManager()
+    return _context_manager
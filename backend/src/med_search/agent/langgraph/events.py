@@ -0,0 +1,12 @@
+from typing import Any, Dict
+
+# Campos de cada artigo enviados ao cliente assim que ele é processado
+ARTICLE_EVENT = "article"
+ARTICLE_EVENT_FIELDS = ("pmid", "title", "authors", "journal", "publication_date", "doi", "url", "abstract")
+
+
+def article_event(article: Dict[str, Any]) -> Dict[str, Any]:
+    """Dados do artigo para o evento de streaming (resumo estruturado quando existir)"""
+    event = {field: article.get(field) for field in ARTICLE_EVENT_FIELDS}
+    event["abstract"] = article.get("abstract") or article.get("simple_abstract")
+    return event
@@ -0,0 +1,311 @@
+import os
+import heapq
+import asyncio
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from med_search.agent.langgraph.models import AGENT_TEMPERATURE, DEFAULT_CHAT_MODEL, get_chat_model
+from med_search.services.telemetry import REGISTRY, record_usage, span
+
+logger = logging.getLogger(__name__)
+
+# Prioridades da fila (menor sai primeiro): o chat interativo passa na frente de jobs em lote
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+def parse_model_limits(value: str) -> Dict[str, int]:
+    """`modelo=limite` separados por vírgula (ex.: gemini-2.0-flash=16,gemini-1.5-flash=4)"""
+    limits = {}
+    for item in value.split(","):
+        name, _, limit = item.partition("=")
+        if name.strip() and limit.strip():
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+# Chamadas simultâneas por modelo (LLM_MODEL_CONCURRENCY sobrescreve por modelo)
+DEFAULT_LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+DEFAULT_MODEL_LIMITS = parse_model_limits(os.getenv("LLM_MODEL_CONCURRENCY", ""))
+# Tempo máximo de cada tentativa, incluindo a espera na fila do modelo
+DEFAULT_LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# Modelos tentados, em ordem, quando o principal falha ou excede o tempo
+DEFAULT_FALLBACK_MODELS = [m.strip() for m in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if m.strip()]
+
+_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int) -> Iterator[None]:
+    """Define a prioridade das chamadas ao LLM feitas dentro do bloco (ex.: PRIORITY_BATCH)"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class PriorityLimiter:
+    """
+    Semáforo com fila de prioridade: quando as vagas acabam, a próxima vaga
+    vai para o pedido de menor prioridade e, no empate, para o mais antigo.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # A vaga já tinha sido repassada a este pedido: devolve para o próximo
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # A vaga passa direto para o próximo da fila
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class StreamInterruptedError(RuntimeError):
+    """O modelo falhou depois de enviar tokens ao stream: o fallback repetiria a resposta"""
+
+
+class StreamWatcher(BaseCallbackHandler):
+    """Registra se a tentativa já enviou algum token ao stream do chat"""
+
+    run_inline = True
+
+    def __init__(self):
+        self.streamed = False
+
+    def on_llm_new_token(self, token: str, **kwargs: Any):
+        self.streamed = True
+
+
+def with_callback(config: Optional[Dict], handler: BaseCallbackHandler) -> Dict:
+    """Cópia do config com mais um handler (lista de handlers ou gerenciador da execução pai)"""
+    config = dict(config or {})
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        config["callbacks"] = [handler]
+    elif isinstance(callbacks, list):
+        config["callbacks"] = [*callbacks, handler]
+    else:
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+        config["callbacks"] = callbacks
+    return config
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    fallbacks: int = 0
+
+
+class GatewayModel:
+    """
+    Fachada de um modelo do gateway com a interface usada pelas ferramentas
+    e pelo cache de LLM (`model`, `temperature` e `ainvoke`).
+    """
+
+    def __init__(self, gateway: "LLMGateway", temperature: float, model: str):
+        self.gateway = gateway
+        self.temperature = temperature
+        self.model = model
+
+    async def ainvoke(self, input: Any, config: Optional[Dict] = None, **kwargs) -> Any:
+        return await self.gateway.ainvoke(input, config, model_name=self.model, temperature=self.temperature, **kwargs)
+
+
+class LLMGateway:
+    """
+    Ponto único das chamadas ao Gemini. Os clientes vêm do registro
+    compartilhado (models.py); cada modelo tem um limite de chamadas
+    simultâneas com fila por prioridade, e cada tentativa tem um tempo
+    máximo. Se o modelo falhar ou exceder o tempo, os modelos de fallback
+    são tentados em ordem.
+    """
+
+    def __init__(
+        self,
+        default_model: str = DEFAULT_CHAT_MODEL,
+        fallback_models: Optional[Sequence[str]] = None,
+        default_limit: int = DEFAULT_LLM_CONCURRENCY,
+        model_limits: Optional[Dict[str, int]] = None,
+        timeout: Optional[float] = DEFAULT_LLM_TIMEOUT
+    ):
+        self.default_model = default_model
+        self.fallback_models = list(DEFAULT_FALLBACK_MODELS if fallback_models is None else fallback_models)
+        self.default_limit = default_limit
+        self.model_limits = dict(DEFAULT_MODEL_LIMITS if model_limits is None else model_limits)
+        self.timeout = timeout
+        self._limiters: Dict[str, PriorityLimiter] = {}
+        self._bound: Dict[Tuple, Any] = {}
+        self._stats: Dict[str, ModelStats] = {}
+
+    def limiter(self, model_name: str) -> PriorityLimiter:
+        limiter = self._limiters.get(model_name)
+        if limiter is None:
+            limit = self.model_limits.get(model_name, self.default_limit)
+            limiter = self._limiters[model_name] = PriorityLimiter(limit)
+        return limiter
+
+    def chat_model(self, temperature: float = AGENT_TEMPERATURE, model: Optional[str] = None) -> GatewayModel:
+        return GatewayModel(self, temperature, model or self.default_model)
+
+    def _runnable(self, model_name: str, temperature: float, tools: Optional[Sequence]) -> Any:
+        """Cliente do registro, com as ferramentas vinculadas uma única vez por modelo"""
+        model = get_chat_model(temperature=temperature, model=model_name)
+        if not tools:
+            return model
+        key = (model_name, temperature, tuple(getattr(tool, "name", str(tool)) for tool in tools))
+        cached = self._bound.get(key)
+        # O cliente do registro pode ter sido trocado (set_model_factories)
+        if cached is None or cached[0] is not model:
+            cached = self._bound[key] = (model, model.bind_tools(tools))
+        return cached[1]
+
+    def candidates(
+        self,
+        model: Any = None,
+        model_name: Optional[str] = None,
+        temperature: float = AGENT_TEMPERATURE,
+        tools: Optional[Sequence] = None
+    ) -> List[Tuple[str, Any]]:
+        """Pares (nome, runnable) na ordem de tentativa"""
+        if model is not None:
+            # Modelo fornecido pelo chamador (ex.: testes): sem fallback
+            name = getattr(model, "model", None) or getattr(getattr(model, "bound", None), "model", None)
+            return [(name or type(model).__name__, model)]
+        names = [model_name or self.default_model]
+        names += [name for name in self.fallback_models if name not in names]
+        return [(name, self._runnable(name, temperature, tools)) for name in names]
+
+    async def _call(self, name: str, runnable: Any, input: Any, config: Optional[Dict], priority: int, **kwargs):
+        limiter = self.limiter(name)
+        with span("llm.queue", model=name):
+            await limiter.acquire(priority)
+        try:
+            with span("llm.invoke", model=name):
+                response = await runnable.ainvoke(input, config, **kwargs)
+            record_usage(name, getattr(response, "usage_metadata", None))
+            return response
+        finally:
+            limiter.release()
+
+    async def ainvoke(
+        self,
+        input: Any,
+        config: Optional[Dict] = None,
+        *,
+        model: Any = None,
+        model_name: Optional[str] = None,
+        temperature: float = AGENT_TEMPERATURE,
+        tools: Optional[Sequence] = None,
+        priority: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Equivalente a `await model.ainvoke(input, config)`. Sem `model`, usa
+        `model_name` (ou o modelo padrão) do registro, com `tools` vinculadas.
+        O fallback só acontece antes do primeiro token: se a resposta já
+        começou a chegar ao stream, a falha vira StreamInterruptedError.
+        """
+        priority = _priority.get() if priority is None else priority
+        timeout = self.timeout if timeout is None else timeout
+        attempts = self.candidates(model, model_name, temperature, tools)
+        error: Optional[BaseException] = None
+        for position, (name, runnable) in enumerate(attempts):
+            stats = self._stats.setdefault(name, ModelStats())
+            stats.calls += 1
+            if position:
+                stats.fallbacks += 1
+            watcher = StreamWatcher()
+            attempt_config = with_callback(config, watcher) if position + 1 < len(attempts) else config
+            try:
+                return await asyncio.wait_for(
+                    self._call(name, runnable, input, attempt_config, priority, **kwargs), timeout
+                )
+            except asyncio.TimeoutError as e:
+                stats.timeouts += 1
+                error = e
+            except Exception as e:
+                stats.failures += 1
+                error = e
+            if watcher.streamed:
+                raise StreamInterruptedError(
+                    f"O modelo {name} falhou depois de enviar parte da resposta ao stream"
+                ) from error
+            if position + 1 < len(attempts):
+                logger.warning("Falha no modelo %s (%r); tentando %s", name, error, attempts[position + 1][0])
+        raise error
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                **vars(stats),
+                "active": self._limiters[name].active if name in self._limiters else 0,
+                "waiting": self._limiters[name].waiting if name in self._limiters else 0
+            }
+            for name, stats in self._stats.items()
+        }
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Gateway compartilhado pelo processo"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+def gateway_metrics():
+    """Chamadas em andamento e na fila de cada modelo, lidas na exposição das métricas"""
+    stats = _gateway.stats() if _gateway is not None else {}
+    yield (
+        "med_search_llm_active_calls", "gauge", "Chamadas ao LLM em andamento por modelo",
+        [({"model": name}, model["active"]) for name, model in stats.items()]
+    )
+    yield (
+        "med_search_llm_waiting_calls", "gauge", "Chamadas ao LLM aguardando vaga por modelo",
+        [({"model": name}, model["waiting"]) for name, model in stats.items()]
+    )
+
+
+REGISTRY.add_collector(gateway_metrics)
@@ -0,0 +1,78 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.prebuilt import ToolNode, tools_condition
+
+from med_search.agent.langgraph.context import ContextManager, message_text
+from med_search.agent.langgraph.gateway import LLMGateway, get_llm_gateway
+from med_search.agent.langgraph.tools.pubmed_tools import prefetch_strategy, session_id_from_config
+
+# Ferramenta cujo resultado dispara a busca especulativa no PubMed
+STRATEGY_TOOL = "medical_query"
+
+
+def new_tool_messages(messages: Sequence) -> List[ToolMessage]:
+    """Resultados de ferramentas posteriores à última chamada do modelo"""
+    results = []
+    for message in reversed(messages):
+        if isinstance(message, AIMessage):
+            break
+        if isinstance(message, ToolMessage):
+            results.append(message)
+    return results[::-1]
+
+
+def build_agent_graph(
+    model: Optional[BaseChatModel],
+    tools: Sequence[BaseTool],
+    prompt: SystemMessage,
+    context_manager: Optional[ContextManager] = None,
+    checkpointer=None,
+    prefetch: Callable[[str, Optional[str]], bool] = prefetch_strategy,
+    gateway: Optional[LLMGateway] = None
+):
+    """
+    Grafo ReAct do agente (agent -> tools -> prefetch -> agent).
+
+    - tools: as chamadas de uma mesma resposta do modelo (ex.: web e PubMed)
+      rodam em paralelo; o ToolNode as agrupa com asyncio.gather e as
+      ferramentas síncronas vão para threads.
+    - prefetch: quando medical_query devolve uma estratégia, a busca no
+      PubMed começa em segundo plano enquanto o modelo apresenta a estratégia
+      ao usuário, e a confirmação encontra os caches prontos.
+
+    As chamadas ao modelo passam pelo gateway de LLM (limite de concorrência,
+    prioridade, tempo máximo e fallback). Sem `model`, o gateway usa o modelo
+    padrão do registro, com as ferramentas vinculadas.
+    """
+    bound_model = model.bind_tools(tools) if model is not None else None
+
+    async def call_model(state: MessagesState, config: RunnableConfig) -> Dict[str, Any]:
+        messages = state["messages"]
+        if context_manager is not None:
+            # Mantém a entrada do modelo dentro do orçamento de tokens sem alterar o estado
+            messages = context_manager.compact(messages)
+        llm = gateway or get_llm_gateway()
+        response = await llm.ainvoke([prompt, *messages], config, model=bound_model, tools=tools)
+        return {"messages": [response]}
+
+    async def prefetch_node(state: MessagesState, config: RunnableConfig) -> Dict[str, Any]:
+        session_id = session_id_from_config(config)
+        for message in new_tool_messages(state["messages"]):
+            if message.name == STRATEGY_TOOL and message.status != "error":
+                prefetch(message_text(message), session_id)
+        return {}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("agent", call_model)
+    builder.add_node("tools", ToolNode(tools))
+    builder.add_node("prefetch", prefetch_node)
+    builder.add_edge(START, "agent")
+    builder.add_conditional_edges("agent", tools_condition, {"tools": "tools", END: END})
+    builder.add_edge("tools", "prefetch")
+    builder.add_edge("prefetch", "agent")
+    return builder.compile(checkpointer=checkpointer)
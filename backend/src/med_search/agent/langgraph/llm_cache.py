@@ -0,0 +1,189 @@
+import os
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from med_search.services.cache import DEFAULT_CACHE_DIR, MemoryLRU, SQLiteStore
+from med_search.services.telemetry import record_cache
+
+DEFAULT_LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+DEFAULT_LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# Cache ligado por padrão por ferramenta; chamadas "criativas" ficam fora (LLM_CACHE_<FERRAMENTA>=on|off)
+TOOL_CACHE_DEFAULTS = {
+    "medical_query": True,
+    "pubmed_research": False,
+}
+
+
+class LeaderCancelled(Exception):
+    """A chamada que os seguidores aguardavam foi cancelada; um deles assume a chamada"""
+
+
+def llm_cache_key(model: Any, prompt: str) -> str:
+    """Chave (modelo, temperatura, hash do prompt) de uma chamada ao LLM"""
+    payload = {
+        "model": getattr(model, "model", type(model).__name__),
+        "temperature": getattr(model, "temperature", None),
+        "prompt": hashlib.sha256(prompt.encode()).hexdigest(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Cache de respostas do LLM em duas camadas (memória e SQLite opcional) com
+    deduplicação de chamadas simultâneas: prompts idênticos em paralelo
+    compartilham uma única requisição ao modelo.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = DEFAULT_LLM_CACHE_TTL,
+        memory_entries: int = DEFAULT_LLM_CACHE_MEMORY_ENTRIES,
+        max_entries: int = DEFAULT_LLM_CACHE_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.memory = MemoryLRU(memory_entries)
+        self.store = SQLiteStore(path, table="llm_responses", max_entries=max_entries) if path else None
+        self._async_inflight: Dict[str, asyncio.Future] = {}
+        self._sync_inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+
+    def _load(self, key: str) -> Optional[Dict]:
+        data = self.store.get(key)
+        if data is not None:
+            self.memory.set(key, data, self.ttl)
+        return data
+
+    def _message(self, data: Optional[Dict]) -> Optional[BaseMessage]:
+        record_cache("llm", hits=data is not None, misses=data is None)
+        return messages_from_dict([data])[0] if data is not None else None
+
+    def get(self, key: str) -> Optional[BaseMessage]:
+        data = self.memory.get(key)
+        if data is None and self.store is not None:
+            data = self._load(key)
+        return self._message(data)
+
+    def set(self, key: str, message: BaseMessage):
+        data = message_to_dict(message)
+        self.memory.set(key, data, self.ttl)
+        if self.store is not None:
+            self.store.set(key, data, self.ttl)
+
+    async def aget(self, key: str) -> Optional[BaseMessage]:
+        """Como `get`, com a leitura do SQLite em uma thread para não bloquear o loop"""
+        data = self.memory.get(key)
+        if data is None and self.store is not None:
+            data = await asyncio.to_thread(self._load, key)
+        return self._message(data)
+
+    async def aset(self, key: str, message: BaseMessage):
+        """Como `set`, com a escrita no SQLite em uma thread para não bloquear o loop"""
+        data = message_to_dict(message)
+        self.memory.set(key, data, self.ttl)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, data, self.ttl)
+
+    def invoke(self, model: Any, prompt: str) -> BaseMessage:
+        """Equivalente a `model.invoke(prompt)` passando pelo cache"""
+        key = llm_cache_key(model, prompt)
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            with self._lock:
+                event = self._sync_inflight.get(key)
+                leader = event is None
+                if leader:
+                    event = self._sync_inflight[key] = threading.Event()
+                else:
+                    self.deduplicated += 1
+            if not leader:
+                # Outra thread já está chamando o modelo com o mesmo prompt
+                event.wait()
+                continue
+            try:
+                response = model.invoke(prompt)
+                self.set(key, response)
+                return response
+            finally:
+                with self._lock:
+                    self._sync_inflight.pop(key, None)
+                event.set()
+
+    async def ainvoke(self, model: Any, prompt: str) -> BaseMessage:
+        """Equivalente a `await model.ainvoke(prompt)` passando pelo cache"""
+        key = llm_cache_key(model, prompt)
+        while True:
+            cached = await self.aget(key)
+            if cached is not None:
+                return cached
+
+            inflight = self._async_inflight.get(key)
+            if inflight is not None:
+                with self._lock:
+                    self.deduplicated += 1
+                try:
+                    return await asyncio.shield(inflight)
+                except LeaderCancelled:
+                    # Quem chamava o modelo foi cancelado (ex.: cliente desconectou);
+                    # o primeiro seguidor a acordar vira o novo líder
+                    continue
+
+            future = asyncio.get_running_loop().create_future()
+            self._async_inflight[key] = future
+            try:
+                response = await model.ainvoke(prompt)
+                await self.aset(key, response)
+                future.set_result(response)
+                return response
+            except asyncio.CancelledError:
+                # O cancelamento é só do líder: os seguidores tentam de novo
+                future.set_exception(LeaderCancelled())
+                future.exception()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                # Evita aviso de exceção não lida quando ninguém mais aguardava
+                future.exception()
+                raise
+            finally:
+                self._async_inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"memory": self.memory.stats.as_dict(), "deduplicated": self.deduplicated}
+        if self.store is not None:
+            stats["disk"] = self.store.stats.as_dict()
+        return stats
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Cache de LLM compartilhado pelo processo (camada em disco com LLM_CACHE_DISK=on)"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            path = None
+            if os.getenv("LLM_CACHE_DISK", "on").lower() in ("on", "1", "true"):
+                path = os.path.join(DEFAULT_CACHE_DIR, "llm.sqlite3")
+            _llm_cache = LLMResponseCache(path=path)
+        return _llm_cache
+
+
+def get_tool_llm_cache(tool_name: str) -> Optional[LLMResponseCache]:
+    """Retorna o cache de LLM da ferramenta, ou None se estiver desligado para ela"""
+    default = "on" if TOOL_CACHE_DEFAULTS.get(tool_name, False) else "off"
+    enabled = os.getenv(f"LLM_CACHE_{tool_name.upper()}", default).lower() in ("on", "1", "true")
+    return get_llm_cache() if enabled else None
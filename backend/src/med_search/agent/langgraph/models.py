@@ -0,0 +1,93 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Modelo padrão do agente e das ferramentas
+DEFAULT_CHAT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+# Temperaturas usadas pelo agente (respostas) e pela criação de estratégias (mais determinística)
+AGENT_TEMPERATURE = 0.7
+STRATEGY_TEMPERATURE = 0.2
+
+_models: Dict[Tuple[str, float], Any] = {}
+_web_search: Dict[int, Any] = {}
+_lock = threading.Lock()
+_environment_loaded = False
+
+# Fábricas que substituem os clientes reais (ex.: modelo falso dos testes de carga)
+ChatModelFactory = Callable[[str, float], Any]
+WebSearchFactory = Callable[[int], Any]
+_chat_model_factory: Optional[ChatModelFactory] = None
+_web_search_factory: Optional[WebSearchFactory] = None
+
+
+def load_environment():
+    """Carrega o .env uma única vez, antes de ler as chaves das APIs"""
+    global _environment_loaded
+    if not _environment_loaded:
+        load_dotenv()
+        _environment_loaded = True
+
+
+def get_chat_model(temperature: float = AGENT_TEMPERATURE, model: str = DEFAULT_CHAT_MODEL):
+    """
+    Cliente do Gemini compartilhado por (modelo, temperatura). A biblioteca só
+    é importada e o cliente só é criado na primeira utilização, fora do boot
+    dos workers.
+    """
+    key = (model, temperature)
+    chat_model = _models.get(key)
+    if chat_model is None:
+        with _lock:
+            chat_model = _models.get(key)
+            if chat_model is None:
+                factory = _chat_model_factory or gemini_chat_model
+                chat_model = _models[key] = factory(model, temperature)
+    return chat_model
+
+
+def gemini_chat_model(model: str, temperature: float):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    load_environment()
+    return ChatGoogleGenerativeAI(model=model, temperature=temperature, api_key=os.getenv("GEMINI_API_KEY"))
+
+
+def get_web_search(max_results: int = 2):
+    """Cliente da busca na web (Tavily), criado na primeira utilização"""
+    web_search = _web_search.get(max_results)
+    if web_search is None:
+        with _lock:
+            web_search = _web_search.get(max_results)
+            if web_search is None:
+                factory = _web_search_factory or tavily_web_search
+                web_search = _web_search[max_results] = factory(max_results)
+    return web_search
+
+
+def tavily_web_search(max_results: int):
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
+    load_environment()
+    return TavilySearchResults(max_results=max_results, api_key=os.getenv("TAVILY_API_KEY"))
+
+
+def set_model_factories(chat: Optional[ChatModelFactory] = None, web_search: Optional[WebSearchFactory] = None):
+    """
+    Troca a criação dos clientes de LLM e de busca na web (None volta ao
+    Gemini e ao Tavily). Os clientes já criados são descartados.
+    """
+    global _chat_model_factory, _web_search_factory
+    with _lock:
+        _chat_model_factory, _web_search_factory = chat, web_search
+        _models.clear()
+        _web_search.clear()
+
+
+def clear_models():
+    """Descarta os clientes criados (usado no encerramento e nos testes)"""
+    with _lock:
+        _models.clear()
+        _web_search.clear()
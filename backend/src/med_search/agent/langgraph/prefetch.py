@@ -0,0 +1,112 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from med_search.models.schemas import SearchRequest
+from med_search.services.cache import search_cache_key
+from med_search.services.pubmed import AsyncPubMedClient
+from med_search.services.telemetry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Busca especulativa da estratégia enquanto o usuário ainda não confirmou (AGENT_PREFETCH=off desliga)
+PREFETCH_ENABLED = os.getenv("AGENT_PREFETCH", "on").lower() in ("on", "1", "true")
+
+
+class StrategyPrefetcher:
+    """
+    Aquece os caches de busca e de artigos com a última estratégia criada em
+    cada sessão. Há no máximo uma busca especulativa por sessão: uma nova
+    estratégia cancela a anterior, e a busca confirmada reaproveita a que
+    estiver em andamento em vez de repetir o esearch e o efetch.
+    """
+
+    def __init__(self):
+        # sessão -> (chave da busca, tarefa)
+        self._tasks: Dict[str, Tuple[str, asyncio.Task]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def start(self, session_id: str, request: SearchRequest, client: AsyncPubMedClient) -> asyncio.Task:
+        """
+        Inicia a busca especulativa da sessão, cancelando a anterior (precisa de
+        um loop em execução). A mesma busca ainda em andamento não é reiniciada.
+        """
+        key = search_cache_key(request)
+        entry = self._tasks.get(session_id)
+        if entry is not None and entry[0] == key and not entry[1].done():
+            return entry[1]
+        self.cancel(session_id)
+        task = asyncio.create_task(self._warm(request, client))
+        self._tasks[session_id] = (key, task)
+        task.add_done_callback(lambda done: self._forget(session_id, done))
+        return task
+
+    @staticmethod
+    async def _warm(request: SearchRequest, client: AsyncPubMedClient):
+        # O esearch e o efetch gravam nos caches do cliente; o resultado em si é descartado
+        pmids = await client.search_pmids_articles(request)
+        if pmids:
+            await client.fetch_articles(pmids)
+
+    def _forget(self, session_id: str, task: asyncio.Task):
+        entry = self._tasks.get(session_id)
+        if entry is not None and entry[1] is task:
+            del self._tasks[session_id]
+        if not task.cancelled() and task.exception() is not None:
+            # Falha na especulação não afeta a conversa: a busca confirmada refaz as requisições
+            logger.debug("Busca especulativa falhou: %s", task.exception())
+
+    async def claim(self, session_id: Optional[str], request: SearchRequest) -> bool:
+        """
+        Chamado pela busca confirmada. Se a especulação da sessão for a mesma
+        busca, aguarda o seu término (os caches ficam prontos) e retorna True;
+        caso contrário, cancela a especulação e retorna False.
+        """
+        entry = self._tasks.get(session_id) if session_id is not None else None
+        if entry is None:
+            return False
+        key, task = entry
+        if key != search_cache_key(request):
+            self.cancel(session_id)
+            return False
+        try:
+            # shield: cancelar a ferramenta não cancela o aquecimento já pago
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            return False
+        except Exception:
+            return False
+        return True
+
+    def cancel(self, session_id: str) -> bool:
+        entry = self._tasks.pop(session_id, None)
+        if entry is None:
+            return False
+        return entry[1].cancel()
+
+    def cancel_all(self):
+        for session_id in list(self._tasks):
+            self.cancel(session_id)
+
+
+_prefetcher: Optional[StrategyPrefetcher] = None
+
+
+def get_prefetcher() -> StrategyPrefetcher:
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = StrategyPrefetcher()
+    return _prefetcher
+
+
+def prefetch_metrics():
+    count = len(_prefetcher) if _prefetcher is not None else 0
+    yield ("med_search_prefetch_tasks", "gauge", "Buscas especulativas em andamento", [({}, count)])
+
+
+REGISTRY.add_collector(prefetch_metrics)
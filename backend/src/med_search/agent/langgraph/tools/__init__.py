@@ -1,5 +1,5 @@
 from .search_tools import search_query
 from .medical_tools import medical_query
-from .pubmed_tools import pubmed_research
+from .pubmed_tools import fetch_articles_by_pmid, pubmed_research, search_fetched_articles
 
-tools = [search_query, medical_query, pubmed_research]
\ No newline at end of file
+tools = [search_query, medical_query, pubmed_research, search_fetched_articles, fetch_articles_by_pmid]
\ No newline at end of file
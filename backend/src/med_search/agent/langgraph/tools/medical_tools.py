@@ -1,19 +1,42 @@
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
-from dotenv import load_dotenv
+from med_search.agent.langgraph.llm_cache import get_tool_llm_cache
+from med_search.agent.langgraph.gateway import get_llm_gateway
+from med_search.agent.langgraph.models import STRATEGY_TEMPERATURE
+from med_search.agent.langgraph.tools.pubmed_tools import (
+    counts_note,
+    prefetch_strategy,
+    session_id_from_config,
+    strategy_counts
+)
+from med_search.services.mesh import get_mesh_index
+from med_search.services.strategy import StrategyParseError, compile_strategy
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-model = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0.2,
-    api_key=GEMINI_API_KEY
-)
+def mesh_validation_note(strategy_text: str) -> str:
+    """Confere os termos [Mesh] da estratégia no índice MeSH local e descreve os problemas"""
+    mesh_index = get_mesh_index()
+    if mesh_index is None:
+        return ""
+    try:
+        strategy = compile_strategy(strategy_text)
+    except StrategyParseError:
+        return ""
+
+    notes = []
+    for term in strategy.mesh_terms:
+        heading = mesh_index.preferred_heading(term)
+        if heading is None:
+            notes.append(f'- "{term}" não é um descritor MeSH oficial; será buscado em título/resumo [tiab].')
+        elif heading.casefold() != term.casefold():
+            notes.append(f'- "{term}" é termo de entrada do descritor oficial "{heading}"[Mesh].')
+    if not notes:
+        return ""
+    return "Validação MeSH (vocabulário NLM):\n" + "\n".join(notes)
+
 
 @tool
-def medical_query(query: str) -> str:
+async def medical_query(query: str, config: RunnableConfig) -> str:
     """
     Transforma a pergunta clínica em uma estratégia de busca PICOTS
     Args:
@@ -65,8 +88,17 @@ def medical_query(query: str) -> str:
             ("Randomized Controlled Trial"[Publication Type] OR "Systematic Review"[Publication Type])
         
         """
-        response = model.invoke(prompt)
-        return response
+        # Perguntas idênticas reaproveitam a estratégia já gerada
+        model = get_llm_gateway().chat_model(temperature=STRATEGY_TEMPERATURE)
+        llm_cache = get_tool_llm_cache("medical_query")
+        response = await llm_cache.ainvoke(model, prompt) if llm_cache else await model.ainvoke(prompt)
+
+        strategy_text = str(response.content)
+        # A busca especulativa começa já, em paralelo com as contagens (o grafo não a repete)
+        prefetch_strategy(strategy_text, session_id_from_config(config))
+        # Contagens da estratégia e dos blocos, com prazo: estratégias vazias ou amplas são corrigidas antes da busca
+        notes = [mesh_validation_note(strategy_text), counts_note(await strategy_counts(strategy_text))]
+        return "\n\n".join([strategy_text, *(note for note in notes if note)])
     except Exception as e:
         return f"Houve um erro ao gerar a estratégia de busca: {str(e)}"
     
\ No newline at end of file
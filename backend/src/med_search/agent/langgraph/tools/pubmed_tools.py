@@ -1,30 +1,224 @@
+from langchain_core.callbacks import Callbacks
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from dotenv import load_dotenv
 import os
 import json
-from datetime import date
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
 
-from med_search.services.pubmed import PubMedClient
-from med_search.models.schemas import SearchRequest
+from med_search.agent.langgraph.events import ARTICLE_EVENT, article_event
+from med_search.agent.langgraph.llm_cache import get_tool_llm_cache
+from med_search.agent.langgraph.gateway import get_llm_gateway
+from med_search.agent.langgraph.prefetch import PREFETCH_ENABLED, get_prefetcher
+from med_search.services.mesh import get_mesh_index
+from med_search.services.pubmed import get_async_pubmed_client
+from med_search.services.search_index import get_search_index, index_articles, rerank_enabled
+from med_search.services.strategy import (
+    StrategyParseError,
+    block_search_requests,
+    build_search_request,
+    compile_strategy
+)
+from med_search.models.schemas import SearchRequest, SearchStrategy
 
-# Configuração das variáveis de ambiente
+logger = logging.getLogger(__name__)
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Parâmetros da busca
+MAX_RESULTS = 10
+DEFAULT_START_YEAR = 2020
+DEFAULT_END_YEAR = 2025
+
+# Acima deste total a estratégia é apontada como ampla demais
+COUNT_TOO_BROAD = int(os.getenv("STRATEGY_COUNT_TOO_BROAD", "10000"))
+# Tempo máximo das contagens: acima dele a estratégia é devolvida sem elas
+COUNT_TIMEOUT = float(os.getenv("STRATEGY_COUNT_TIMEOUT", "1.5"))
+
+# Acrescenta sinônimos do MeSH ([tiab]) aos termos [Mesh] validados
+MESH_EXPAND_SYNONYMS = os.getenv("MESH_EXPAND_SYNONYMS", "off").lower() in ("on", "1", "true")
+
+
+async def extract_strategy_with_llm(query: str) -> SearchStrategy:
+    """Usa o LLM para estruturar a estratégia quando o compilador local não a reconhece"""
+    # Montar o prompt
+    prompt = f"""Você é um especialista em buscar artigos na API do PubMed e
+    deve extrair um JSON da estratégia de busca recebida para realizar a request na API.
+
+    estrategia = {query}
+
+    Retorne APENAS um objeto JSON com a seguinte estrutura, sem formatação markdown ou texto adicional:
+        {{
+            "picots": {{
+                "population": "descrição da população",
+                "intervention": "descrição da intervenção",
+                "comparison": "descrição da comparação ou null",
+                "outcomes": "descrição dos desfechos",
+                "time": "período de tempo ou null",
+                "study_design": "desenho de estudo ou null"
+            }},
+            "search_blocks": {{
+                "population": "bloco de busca para população",
+                "intervention": "bloco de busca para intervenção",
+                "comparison": "bloco de busca para comparação ou null",
+                "outcomes": "bloco de busca para desfechos",
+                "time": "bloco de busca para tempo ou null",
+                "study_design": "bloco de busca para desenho de estudo ou null"
+            }},
+            "final_search_strategy": "estratégia de busca completa",
+            "mesh_terms": ["lista de termos MeSH"],
+            "start_year": "ano de inicio da busca. caso não forneça, use o ano de {DEFAULT_START_YEAR}",
+            "end_year": "ano final da busca. caso não forneça, use o ano de {DEFAULT_END_YEAR}",
+        }}
+    """
+    model = get_llm_gateway().chat_model()
+    llm_cache = get_tool_llm_cache("pubmed_research")
+    response = await llm_cache.ainvoke(model, prompt) if llm_cache else await model.ainvoke(prompt)
+    logger.debug("Estratégia estruturada pelo LLM: %s", response.content)
+
+    # Limpar a resposta removendo marcadores de código
+    response_text = str(response.content).strip()
+
+    # Remover marcadores de código markdown se presentes
+    if response_text.startswith('```'):
+        # Remove a primeira linha (```json)
+        response_text = response_text.split('\n', 1)[1]
+    if response_text.endswith('```'):
+        # Remove a última linha (```)
+        response_text = response_text.rsplit('\n', 1)[0]
+
+    # Limpar espaços extras
+    response_text = response_text.strip()
+
+    # Converter para dict
+    result = json.loads(response_text)
+
+    # Validar chaves necessárias
+    required_keys = ["picots", "search_blocks", "final_search_strategy", "mesh_terms"]
+    if not all(key in result for key in required_keys):
+        raise ValueError("Resposta incompleta do modelo")
+
+    # Remover duplicatas das listas
+    result["mesh_terms"] = list(dict.fromkeys(result["mesh_terms"]))
+
+    return SearchStrategy(
+        picots=result["picots"],
+        search_blocks=result["search_blocks"],
+        final_search_strategy=result["final_search_strategy"],
+        mesh_terms=result["mesh_terms"],
+        start_year=result.get("start_year") or None,
+        end_year=result.get("end_year") or None
+    )
+
+
+def rewrite_mesh_terms(strategy: SearchStrategy) -> SearchStrategy:
+    """
+    Corrige termos MeSH inexistentes ou não preferidos sem ir à rede, na
+    estratégia completa e em cada bloco (usados nas contagens e na especulação)
+    """
+    mesh_index = get_mesh_index()
+    if mesh_index is not None:
+        strategy.final_search_strategy, _ = mesh_index.rewrite_query(
+            strategy.final_search_strategy,
+            expand_synonyms=MESH_EXPAND_SYNONYMS
+        )
+        strategy.search_blocks = {
+            name: mesh_index.rewrite_query(block, expand_synonyms=MESH_EXPAND_SYNONYMS)[0] if block else block
+            for name, block in (strategy.search_blocks or {}).items()
+        }
+    return strategy
+
+
+async def resolve_strategy(query: str) -> SearchStrategy:
+    """Compila a estratégia localmente; o LLM só é chamado se o texto não puder ser interpretado"""
+    try:
+        strategy = compile_strategy(query)
+    except StrategyParseError:
+        strategy = await extract_strategy_with_llm(query)
+    return rewrite_mesh_terms(strategy)
+
+
+def strategy_search_request(strategy: SearchStrategy) -> SearchRequest:
+    """Requisição usada pela busca do agente (a mesma da busca especulativa, para compartilhar o cache)"""
+    return build_search_request(
+        strategy,
+        max_results=MAX_RESULTS,
+        sort_by="relevance",
+        default_start_year=DEFAULT_START_YEAR,
+        default_end_year=DEFAULT_END_YEAR
+    )
+
+
+def local_search_request(strategy_text: str) -> Optional[Tuple[SearchStrategy, SearchRequest]]:
+    """Estratégia e requisição montadas só com o compilador local; None se o texto exigiria o LLM"""
+    try:
+        strategy = rewrite_mesh_terms(compile_strategy(strategy_text))
+        return strategy, strategy_search_request(strategy)
+    except (StrategyParseError, ValueError):
+        return None
+
+
+def prefetch_strategy(strategy_text: str, session_id: Optional[str]) -> bool:
+    """
+    Inicia a busca especulativa de uma estratégia recém-criada, antes da
+    confirmação do usuário. Texto que exigiria o LLM não é especulado.
+    """
+    if not PREFETCH_ENABLED or session_id is None:
+        return False
+    compiled = local_search_request(strategy_text)
+    if compiled is None:
+        return False
+    get_prefetcher().start(session_id, compiled[1], get_async_pubmed_client())
+    return True
+
+
+async def strategy_counts(strategy_text: str, timeout: Optional[float] = COUNT_TIMEOUT) -> Optional[Dict[str, int]]:
+    """
+    Total de artigos da estratégia completa e de cada bloco (rettype=count, em
+    paralelo). Retorna None se as contagens não terminarem dentro de `timeout`.
+    """
+    compiled = local_search_request(strategy_text)
+    if compiled is None:
+        return None
+    strategy, request = compiled
+    counts = get_async_pubmed_client().count_queries(block_search_requests(strategy, request))
+    try:
+        return await asyncio.wait_for(counts, timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Contagens da estratégia excederam %.1fs; seguindo sem elas", timeout)
+        return None
+    except Exception as e:
+        logger.warning("Erro ao contar artigos no PubMed: %s", e)
+        return None
+
+
+def counts_note(counts: Optional[Dict[str, int]]) -> str:
+    """Descreve as contagens para o usuário, com alerta de estratégia vazia ou ampla demais"""
+    if not counts:
+        return ""
+    total = counts["final_search_strategy"]
+    lines = ["Total de artigos no PubMed (no período da busca):"]
+    lines.append(f"- Estratégia completa: {total} artigos")
+    lines += [f"- Bloco {name}: {count} artigos" for name, count in counts.items() if name != "final_search_strategy"]
+    if total == 0:
+        empty = [name for name, count in counts.items() if count == 0 and name != "final_search_strategy"]
+        hint = f" Blocos sem resultado: {', '.join(empty)}." if empty else " Os blocos não se cruzam."
+        lines.append(f"ATENÇÃO: a estratégia não retorna artigos; revise-a antes da busca.{hint}")
+    elif total > COUNT_TOO_BROAD:
+        lines.append("ATENÇÃO: a estratégia é ampla demais; considere restringir blocos ou o período.")
+    return "\n".join(lines)
+
+
+def session_id_from_config(config: RunnableConfig) -> Optional[str]:
+    """O id da sessão do chat é o thread_id da execução do grafo"""
+    return (config or {}).get("configurable", {}).get("thread_id")
 
-# Inicialização do modelo
-model = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0.7,
-    api_key=GEMINI_API_KEY
-)
 
 @tool
-def pubmed_research(query: str) -> str:
+async def pubmed_research(query: str, config: RunnableConfig, callbacks: Callbacks = None) -> str:
     """
-    Utiliza uma estratégia de busca para realizar uma request na API do PubMed. 
+    Utiliza uma estratégia de busca para realizar uma request na API do PubMed.
     Não utilize IDs ou outros metódos além de uma estratégia de busca.
     Args:
         query: Estratégia de busca
@@ -32,85 +226,78 @@ def pubmed_research(query: str) -> str:
         O resultado da pesquisa retornado pela API da PubMed completo ou uma mensagem indicando que nenhuma informação foi encontrada
     """
     try:
-        # Montar o prompt
-        prompt = f"""Você é um especialista em buscar artigos na API do PubMed e 
-        deve extrair um JSON da estratégia de busca recebida para realizar a request na API. 
-
-        estrategia = {query}
-
-        Retorne APENAS um objeto JSON com a seguinte estrutura, sem formatação markdown ou texto adicional:
-            {{
-                "picots": {{
-                    "population": "descrição da população",
-                    "intervention": "descrição da intervenção",
-                    "comparison": "descrição da comparação ou null",
-                    "outcomes": "descrição dos desfechos",
-                    "time": "período de tempo ou null",
-                    "study_design": "desenho de estudo ou null"
-                }},
-                "search_blocks": {{
-                    "population": "bloco de busca para população",
-                    "intervention": "bloco de busca para intervenção",
-                    "comparison": "bloco de busca para comparação ou null",
-                    "outcomes": "bloco de busca para desfechos",
-                    "time": "bloco de busca para tempo ou null",
-                    "study_design": "bloco de busca para desenho de estudo ou null"
-                }},
-                "final_search_strategy": "estratégia de busca completa",
-                "mesh_terms": ["lista de termos MeSH"],
-                "start_year": "ano de inicio da busca. caso não forneça, use o ano de 2020",
-                "end_year": "ano final da busca. caso não forneça, use o ano de 2025",
-            }}
-        """
-        response = model.invoke(prompt)
-        print(response)
-        
-        # Limpar a resposta removendo marcadores de código
-        response_text = str(response.content).strip()
-
-        # Remover marcadores de código markdown se presentes
-        if response_text.startswith('```'):
-            # Remove a primeira linha (```json)
-            response_text = response_text.split('\n', 1)[1]
-        if response_text.endswith('```'):
-            # Remove a última linha (```)
-            response_text = response_text.rsplit('\n', 1)[0]
-
-        # Limpar espaços extras
-        response_text = response_text.strip()
-
-        # Converter para dict
-        result = json.loads(response_text)
-
-        # Validar chaves necessárias
-        required_keys = ["picots", "search_blocks", "final_search_strategy", "mesh_terms"]
-        if not all(key in result for key in required_keys):
-            raise ValueError("Resposta incompleta do modelo")
-        
-        # Remover duplicatas das listas
-        if "mesh_terms" in result:
-            result["mesh_terms"] = list(dict.fromkeys(result["mesh_terms"]))   
+        strategy = await resolve_strategy(query)
 
         # Cria a requisição de busca
-        MAX_RESULTS = 10
-        request = SearchRequest(
-            query=result["final_search_strategy"],
-            max_results=MAX_RESULTS,
-            sort_by="relevance"
-        )
-
-        # Se houver informação de data no resultado
-        if result.get("start_year") and result.get("end_year"):
-            request.date_range = (
-                date(int(result["start_year"]), 1, 1),
-                date(int(result["end_year"]), 12, 31)
-            )
+        request = strategy_search_request(strategy)
+        session_id = session_id_from_config(config)
+        # Se a estratégia já foi buscada de forma especulativa, os caches estão (ou ficarão) prontos
+        await get_prefetcher().claim(session_id, request)
 
-        # Busqua os artigos
-        client = PubMedClient()
-        pubmed_articles = client.search_articles(request)
+        # Busca os artigos, enviando cada um ao stream do chat assim que é processado
+        client = get_async_pubmed_client()
+        pubmed_articles = []
+        try:
+            async for article in client.iter_search_articles(request):
+                pubmed_articles.append(article)
+                # `callbacks` é o gerenciador da execução da ferramenta (o `config` injetado é o do chamador)
+                await adispatch_custom_event(ARTICLE_EVENT, article_event(article), config={"callbacks": callbacks})
+        except Exception as e:
+            logger.exception("Erro ao buscar artigos no PubMed: %s", e)
+            return f"Houve um erro ao buscar os artigos no PubMed: {str(e)}"
+        if not pubmed_articles:
+            return pubmed_articles
 
-        return pubmed_articles
+        # Indexa os artigos da sessão para perguntas de acompanhamento. A ordem do
+        # PubMed (a ordenação pedida) é mantida, salvo com SEARCH_RERANK=on
+        index = index_articles(pubmed_articles, session_id)
+        if rerank_enabled():
+            return index.rerank(strategy.final_search_strategy, pubmed_articles)
+        return index.score_articles(strategy.final_search_strategy, pubmed_articles)
 
     except json.JSONDecodeError as e:
         return f"Erro ao processar a resposta do modelo. Tente novamente. Detalhes: {str(e)}"
+
+
+@tool
+def search_fetched_articles(query: str, config: RunnableConfig) -> str:
+    """
+    Procura, entre os artigos do PubMed já retornados nesta conversa, os que tratam dos termos informados.
+    Use para perguntas de acompanhamento sobre os resultados (ex.: quais citam discinesia), sem nova busca no PubMed.
+    Args:
+        query: Termos ou pergunta sobre os artigos já encontrados
+    Returns:
+        Lista de artigos (PMID, título, URL e pontuação) em ordem de relevância ou uma mensagem indicando que nenhum artigo corresponde
+    """
+    index = get_search_index(session_id_from_config(config))
+    matches = index.search(query, limit=MAX_RESULTS)
+    if not matches:
+        return "Nenhum dos artigos já encontrados nesta conversa corresponde aos termos informados."
+    return json.dumps([
+        {
+            "pmid": pmid,
+            "title": index.title(pmid),
+            "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+            "relevance_score": round(score, 4)
+        }
+        for pmid, score in matches
+    ], ensure_ascii=False)
+
+
+@tool
+async def fetch_articles_by_pmid(pmids: str) -> str:
+    """
+    Recupera os dados completos de artigos já citados na conversa a partir dos seus PMIDs.
+    Use quando um resultado anterior aparecer compactado e for preciso consultar título, resumo ou autores.
+    Args:
+        pmids: PMIDs separados por vírgula
+    Returns:
+        Os artigos completos ou uma mensagem indicando que nenhum artigo foi encontrado
+    """
+    pmid_list = [pmid.strip() for pmid in pmids.split(",") if pmid.strip().isdigit()]
+    if not pmid_list:
+        return "Nenhum PMID válido informado."
+    # O cache de artigos atende os PMIDs já buscados; apenas os ausentes vão ao efetch
+    client = get_async_pubmed_client()
+    articles = await client.fetch_articles(pmid_list[:MAX_RESULTS])
+    return articles or "Nenhum artigo encontrado para os PMIDs informados."
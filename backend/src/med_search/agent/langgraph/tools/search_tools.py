@@ -1,10 +1,5 @@
 from langchain_core.tools import tool
-from langchain_community.tools.tavily_search import TavilySearchResults
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+from med_search.agent.langgraph.models import get_web_search
 
 @tool
 def search_query(query: str) -> str:
@@ -17,11 +12,7 @@ def search_query(query: str) -> str:
         Se a API retornar um erro, abstratia o erro com uma mensagem amigável ao usuário.
     """
     try:
-        tavily_search = TavilySearchResults(
-            max_results=2,
-            api_key=TAVILY_API_KEY
-        )
-        results = tavily_search.invoke(query)
+        results = get_web_search(max_results=2).invoke(query)
         return str(results)
     except Exception as e:
         return f"Houve um erro ao buscar dados na web: {str(e)}"
@@ -0,0 +1,50 @@
+from typing import Any, ContextManager, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from med_search.services.telemetry import span
+
+
+class ToolTimingHandler(BaseCallbackHandler):
+    """
+    Mede cada chamada de ferramenta do grafo como uma etapa `tool.<nome>`.
+    Roda inline no loop (sem thread), então o tempo entra na requisição
+    corrente e as chamadas paralelas do ToolNode são medidas separadamente.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._spans: Dict[UUID, ContextManager] = {}
+
+    def on_tool_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        input_str: str,
+        *,
+        run_id: UUID,
+        **kwargs: Any
+    ):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        current = span(f"tool.{name}")
+        current.__enter__()
+        self._spans[run_id] = current
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        current = self._spans.pop(run_id, None)
+        if current is not None:
+            current.__exit__(None, None, None)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        current = self._spans.pop(run_id, None)
+        if current is not None:
+            current.__exit__(type(error), error, error.__traceback__)
+
+
+_handler = ToolTimingHandler()
+
+
+def get_tool_timing_handler() -> ToolTimingHandler:
+    """Handler compartilhado (o estado por chamada é indexado pelo run_id)"""
+    return _handler
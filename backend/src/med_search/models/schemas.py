@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from enum import Enum
 from datetime import date
 
@@ -20,9 +20,31 @@ class SearchRequest(BaseModel):
     date_range: Optional[tuple[date, date]] = Field(None, description="Intervalo de datas para a busca")
     article_types: Optional[List[ArticleType]] = Field(None, description="Tipos de artigos desejados")
     sort_by: SortType = Field(default=SortType.RELEVANCE, description="Ordenação dos resultados")
-    max_results: int = Field(default=10, ge=1, le=100, description="Número máximo de resultados")
+    max_results: int = Field(default=10, ge=1, le=10000, description="Número máximo de resultados")
     language: Optional[str] = Field(default="English", description="Idioma dos artigos")
 
+class SearchStrategy(BaseModel):
+    """Estratégia de busca estruturada usada para montar a requisição ao PubMed"""
+    picots: Optional[Dict[str, Optional[str]]] = Field(None, description="Componentes PICOTS, quando conhecidos")
+    search_blocks: Dict[str, Optional[str]] = Field(default_factory=dict, description="Blocos de busca combinados com AND")
+    final_search_strategy: str = Field(..., description="Estratégia de busca completa")
+    mesh_terms: List[str] = Field(default_factory=list, description="Termos MeSH utilizados")
+    publication_types: List[str] = Field(default_factory=list, description="Filtros de tipo de publicação")
+    start_year: Optional[int] = Field(None, description="Ano inicial da busca")
+    end_year: Optional[int] = Field(None, description="Ano final da busca")
+
+class SearchHistory(BaseModel):
+    """Referência a um resultado de esearch armazenado no History server do NCBI"""
+    webenv: str = Field(..., description="Identificador WebEnv retornado pelo esearch")
+    query_key: str = Field(..., description="Chave da consulta no WebEnv")
+    count: int = Field(..., description="Total de artigos encontrados")
+
+class BatchSearchResult(BaseModel):
+    """Resultado de várias estratégias buscadas em conjunto, com os artigos deduplicados"""
+    hits: List[List[str]] = Field(..., description="PMIDs encontrados por cada estratégia, na ordem das requisições")
+    articles: List[Dict] = Field(..., description="Artigos únicos da união dos resultados, buscados uma única vez")
+    overlap: List[List[int]] = Field(..., description="Matriz de PMIDs em comum entre cada par de estratégias")
+
 class Author(BaseModel):
     name: str
     affiliation: Optional[str] = None
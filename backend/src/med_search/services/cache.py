@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..models.schemas import SearchRequest, SortType
+from .query import canonicalize_query
+
+# Diretório padrão dos caches persistentes; absoluto, para não depender do diretório de onde o servidor sobe
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.expanduser(os.getenv("MED_SEARCH_CACHE_DIR", "~/.cache/med_search")))
+
+# Artigos publicados mudam pouco (correções, MeSH indexado depois): 7 dias por padrão
+DEFAULT_ARTICLE_TTL = float(os.getenv("PUBMED_ARTICLE_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_ARTICLE_MAX_ENTRIES = int(os.getenv("PUBMED_ARTICLE_CACHE_MAX_ENTRIES", "100000"))
+
+# Resultados do esearch: ordenação por data muda a cada indexação diária, então expira antes
+DEFAULT_SEARCH_TTL = float(os.getenv("PUBMED_SEARCH_CACHE_TTL", str(24 * 3600)))
+DEFAULT_SEARCH_DATE_TTL = float(os.getenv("PUBMED_SEARCH_CACHE_DATE_TTL", str(3600)))
+DEFAULT_SEARCH_MEMORY_ENTRIES = int(os.getenv("PUBMED_SEARCH_CACHE_MEMORY_ENTRIES", "1024"))
+DEFAULT_SEARCH_MAX_ENTRIES = int(os.getenv("PUBMED_SEARCH_CACHE_MAX_ENTRIES", "20000"))
+
+
+class CacheStats:
+    """Contadores de acertos, falhas e remoções de um cache"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def record(self, hits: int = 0, misses: int = 0, evictions: int = 0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / total if total else 0.0
+            }
+
+
+class MemoryLRU:
+    """Cache em memória com expiração por item e remoção do menos usado recentemente"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.time():
+                if item is not None:
+                    del self._data[key]
+                self.stats.record(misses=1)
+                return None
+            self._data.move_to_end(key)
+            self.stats.record(hits=1)
+            return item[1]
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+            if evicted:
+                self.stats.record(evictions=evicted)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteStore:
+    """
+    Armazenamento chave/valor persistente em SQLite com expiração por item
+    e limite de tamanho (remove primeiro os itens acessados há mais tempo).
+    Os valores são serializados em JSON.
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Retorna os valores válidos (não expirados) das chaves encontradas"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        with self._lock:
+            # Consulta em blocos para respeitar o limite de variáveis do SQLite
+            for start in range(0, len(keys), 500):
+                block = keys[start:start + 500]
+                placeholders = ",".join("?" * len(block))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders}) AND expires_at > ?",
+                    (*block, now)
+                ).fetchall()
+                found.update({key: json.loads(value) for key, value in rows})
+            if found:
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+        self.stats.record(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Iterable[Tuple[str, Any]], ttl: float):
+        now = time.time()
+        rows = [(key, json.dumps(value, ensure_ascii=False), now + ttl, now) for key, value in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute("COMMIT")
+            self._evict(now)
+
+    def set(self, key: str, value: Any, ttl: float):
+        self.set_many([(key, value)], ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def _evict(self, now: float):
+        """Remove itens expirados e, se ainda acima do limite, os menos usados"""
+        evicted = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,)).rowcount
+        excess = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+        if excess > 0:
+            evicted += self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            ).rowcount
+        if evicted:
+            self.stats.record(evictions=evicted)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ArticleCache:
+    """Cache persistente de artigos já processados do efetch, indexado pelo PMID"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = DEFAULT_ARTICLE_TTL,
+        max_entries: int = DEFAULT_ARTICLE_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.store = SQLiteStore(
+            path or os.path.join(DEFAULT_CACHE_DIR, "articles.sqlite3"),
+            table="articles",
+            max_entries=max_entries
+        )
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.store.stats
+
+    def get_many(self, pmids: Iterable[str]) -> Dict[str, Dict]:
+        """Retorna os artigos em cache para os PMIDs informados"""
+        return self.store.get_many(pmids)
+
+    def put_many(self, articles: Iterable[Dict]):
+        """Armazena artigos (dicionários com a chave `pmid`)"""
+        self.store.set_many(((a["pmid"], a) for a in articles if a.get("pmid")), self.ttl)
+
+    def split(self, pmids: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+        """Separa os PMIDs em artigos já em cache e PMIDs que precisam ser buscados"""
+        cached = self.get_many(pmids)
+        missing = [pmid for pmid in dict.fromkeys(pmids) if pmid not in cached]
+        return cached, missing
+
+
+def search_cache_key(search_request: SearchRequest, **extra) -> str:
+    """Chave estável do esearch a partir da forma canônica da estratégia e dos filtros"""
+    date_range = None
+    if search_request.date_range:
+        date_range = [d.isoformat() for d in search_request.date_range]
+    payload = {
+        "query": canonicalize_query(search_request.query),
+        "date_range": date_range,
+        "sort_by": SortType(search_request.sort_by).value,
+        "max_results": search_request.max_results,
+        **extra
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def count_cache_key(search_request: SearchRequest) -> str:
+    """Chave do total (rettype=count): só a estratégia canônica e o período, que são o que muda o total"""
+    date_range = None
+    if search_request.date_range:
+        date_range = [d.isoformat() for d in search_request.date_range]
+    payload = {"query": canonicalize_query(search_request.query), "date_range": date_range, "rettype": "count"}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class SearchCache:
+    """
+    Cache de resultados do esearch em duas camadas: LRU em memória e,
+    opcionalmente, SQLite em disco compartilhado entre processos.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = DEFAULT_SEARCH_TTL,
+        date_ttl: float = DEFAULT_SEARCH_DATE_TTL,
+        memory_entries: int = DEFAULT_SEARCH_MEMORY_ENTRIES,
+        max_entries: int = DEFAULT_SEARCH_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.date_ttl = date_ttl
+        self.memory = MemoryLRU(memory_entries)
+        self.store = SQLiteStore(path, table="searches", max_entries=max_entries) if path else None
+
+    def ttl_for(self, search_request: SearchRequest) -> float:
+        return self.date_ttl if SortType(search_request.sort_by) == SortType.DATE else self.ttl
+
+    def _get(self, key: str, ttl: float) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                # Promove para a camada em memória (com o TTL restante aproximado pelo padrão)
+                self.memory.set(key, value, ttl)
+        return value
+
+    def _set(self, key: str, value: Any, ttl: float):
+        self.memory.set(key, value, ttl)
+        if self.store is not None:
+            self.store.set(key, value, ttl)
+
+    def get(self, search_request: SearchRequest, **extra) -> Optional[Any]:
+        return self._get(search_cache_key(search_request, **extra), self.ttl_for(search_request))
+
+    def set(self, search_request: SearchRequest, value: Any, **extra):
+        self._set(search_cache_key(search_request, **extra), value, self.ttl_for(search_request))
+
+    def get_count(self, search_request: SearchRequest) -> Optional[int]:
+        """Total da estratégia, compartilhado entre requisições com outro tamanho de página ou ordenação"""
+        return self._get(count_cache_key(search_request), self.ttl)
+
+    def set_count(self, search_request: SearchRequest, count: int):
+        self._set(count_cache_key(search_request), count, self.ttl)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        stats = {"memory": self.memory.stats.as_dict()}
+        if self.store is not None:
+            stats["disk"] = self.store.stats.as_dict()
+        return stats
+
+
+_article_cache: Optional[ArticleCache] = None
+_article_cache_lock = threading.Lock()
+
+
+def get_article_cache() -> Optional[ArticleCache]:
+    """Cache de artigos compartilhado pelo processo (desligado com PUBMED_ARTICLE_CACHE=off)"""
+    global _article_cache
+    if os.getenv("PUBMED_ARTICLE_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    with _article_cache_lock:
+        if _article_cache is None:
+            _article_cache = ArticleCache()
+        return _article_cache
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    Cache de esearch compartilhado pelo processo. A camada em disco é ligada com
+    PUBMED_SEARCH_CACHE_DISK=on e o cache inteiro desligado com PUBMED_SEARCH_CACHE=off.
+    """
+    global _search_cache
+    if os.getenv("PUBMED_SEARCH_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    with _search_cache_lock:
+        if _search_cache is None:
+            path = None
+            if os.getenv("PUBMED_SEARCH_CACHE_DISK", "off").lower() in ("on", "1", "true"):
+                path = os.path.join(DEFAULT_CACHE_DIR, "searches.sqlite3")
+            _search_cache = SearchCache(path=path)
+        return _search_cache
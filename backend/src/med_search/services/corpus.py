@@ -0,0 +1,372 @@
+import os
+import re
+import gzip
+import json
+import zlib
+import sqlite3
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..models.schemas import SearchRequest, SortType
+from .cache import DEFAULT_CACHE_DIR
+from .pubmed_parser import parse_article_element
+from .query import Node, QuerySyntaxError, Term, parse_query
+
+DEFAULT_CORPUS_PATH = os.getenv("PUBMED_CORPUS_PATH", os.path.join(DEFAULT_CACHE_DIR, "corpus.sqlite3"))
+
+# Responde também consultas simples (texto livre, [tiab], [ti], [ab], [pt]) com o acervo local
+LOCAL_SEARCH_ENABLED = os.getenv("PUBMED_LOCAL_SEARCH", "off").lower() in ("on", "1", "true")
+
+# Artigos gravados por transação durante a ingestão
+WRITE_BATCH_SIZE = 5000
+
+# Etiquetas do PubMed que o índice local sabe responder, e as colunas correspondentes
+FIELD_COLUMNS = {
+    None: ("title", "abstract", "keywords"),
+    "tw": ("title", "abstract", "keywords"),
+    "all fields": ("title", "abstract", "keywords"),
+    "tiab": ("title", "abstract"),
+    "title/abstract": ("title", "abstract"),
+    "ti": ("title",),
+    "title": ("title",),
+    "ab": ("abstract",),
+    "abstract": ("abstract",),
+    "pt": ("pub_types",),
+    "publication type": ("pub_types",),
+}
+
+YEAR_PATTERN = re.compile(r"\d{4}")
+FTS_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    skipped: int = 0
+    articles: int = 0
+    deleted: int = 0
+
+
+def article_year(article: Dict) -> Optional[int]:
+    match = YEAR_PATTERN.match(article.get("publication_date") or "")
+    return int(match.group()) if match else None
+
+
+def article_row(article: Dict) -> Tuple:
+    """Linha do acervo: PMID, ano, JSON comprimido e os textos do índice"""
+    abstract = article.get("simple_abstract") or " ".join((article.get("abstract") or {}).values())
+    data = zlib.compress(json.dumps(article, ensure_ascii=False, separators=(",", ":")).encode())
+    return (
+        int(article["pmid"]),
+        article_year(article),
+        data,
+        article.get("title") or "",
+        abstract,
+        " ".join(article.get("keywords") or []),
+        " ".join(article.get("article_type") or [])
+    )
+
+
+def iter_baseline_file(path: str) -> Iterator[Tuple[str, object]]:
+    """
+    Percorre um arquivo do baseline/atualização da NLM (pubmed*.xml ou
+    .xml.gz) gerando ("article", dict) para cada <PubmedArticle>, extraído
+    como no efetch, e ("delete", [pmids]) para cada <DeleteCitation>.
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rb") as source:
+        context = ET.iterparse(source, events=("start", "end"))
+        _, root = next(context)
+        for event, element in context:
+            if event != "end":
+                continue
+            if element.tag == "PubmedArticle":
+                article = parse_article_element(element)
+                if article.get("pmid"):
+                    yield "article", article
+                # Libera os artigos já processados: a memória não cresce com o arquivo
+                root.clear()
+            elif element.tag == "DeleteCitation":
+                yield "delete", [pmid.text for pmid in element.iter("PMID") if pmid.text]
+                root.clear()
+
+
+def parse_baseline_file(path: str) -> Tuple[List[Tuple], List[int]]:
+    """Linhas e PMIDs removidos de um arquivo; roda nos processos de ingestão"""
+    rows, deleted = [], []
+    for kind, value in iter_baseline_file(path):
+        if kind == "article":
+            rows.append(article_row(value))
+        else:
+            deleted.extend(int(pmid) for pmid in value)
+    return rows, deleted
+
+
+def fts_phrase(text: str, prefix: bool = False) -> Optional[str]:
+    words = FTS_WORD_PATTERN.findall(text)
+    if not words:
+        return None
+    phrase = '"' + " ".join(words) + '"'
+    return f"{phrase} *" if prefix else phrase
+
+
+def to_fts_query(node: Node) -> Optional[str]:
+    """
+    Traduz uma estratégia para a sintaxe do FTS5. Retorna None se ela usa
+    campos que o acervo local não indexa (ex.: [Mesh], datas, autores).
+    """
+    if isinstance(node, Term):
+        tag = (node.tag or "").lower() or None
+        if tag not in FIELD_COLUMNS:
+            return None
+        text = node.text.strip()
+        prefix = text.endswith("*")
+        phrase = fts_phrase(text.rstrip("*"), prefix)
+        if phrase is None:
+            return None
+        return f"{{{' '.join(FIELD_COLUMNS[tag])}}} : {phrase}"
+
+    parts = [to_fts_query(child) for child in node.children]
+    if any(part is None for part in parts):
+        return None
+    # O PubMed avalia da esquerda para a direita; o FTS5 tem precedência: os parênteses fixam a ordem
+    query = parts[0]
+    for part in parts[1:]:
+        query = f"({query} {node.op} {part})"
+    return query
+
+
+class LocalCorpus:
+    """
+    Acervo local do PubMed em SQLite: artigos em JSON comprimido (zlib) por
+    PMID e um índice FTS5 sem conteúdo (só os termos) de título, resumo,
+    keywords e tipos de publicação. Alimentado pelos arquivos do baseline e
+    das atualizações diárias da NLM; cada arquivo é ingerido uma única vez.
+    """
+
+    def __init__(self, path: str = DEFAULT_CORPUS_PATH):
+        self.path = path
+        self._local = threading.local()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (pmid INTEGER PRIMARY KEY, year INTEGER, data BLOB NOT NULL);
+            CREATE INDEX IF NOT EXISTS articles_year ON articles (year);
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, abstract, keywords, pub_types, content='', tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, articles INTEGER, deleted INTEGER);
+        """)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Uma conexão por thread: as leituras do cliente não disputam lock com a ingestão
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def ingested_files(self) -> List[str]:
+        return [row[0] for row in self.conn.execute("SELECT name FROM files ORDER BY name")]
+
+    def get_many(self, pmids: Iterable[str]) -> Dict[str, Dict]:
+        """Artigos do acervo para os PMIDs informados (os ausentes são omitidos)"""
+        ids = [int(pmid) for pmid in pmids if str(pmid).isdigit()]
+        found: Dict[str, Dict] = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT pmid, data FROM articles WHERE pmid IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for pmid, data in rows:
+                found[str(pmid)] = json.loads(zlib.decompress(data))
+        return found
+
+    def year_span(self) -> Optional[Tuple[int, int]]:
+        """Primeiro e último ano de publicação do acervo (None se estiver vazio)"""
+        first, last = self.conn.execute("SELECT MIN(year), MAX(year) FROM articles").fetchone()
+        return (first, last) if first is not None else None
+
+    def covers(self, search_request: SearchRequest) -> bool:
+        """Se o período da busca está dentro dos anos do acervo"""
+        span = self.year_span()
+        if span is None:
+            return False
+        if not search_request.date_range:
+            return True
+        start, end = search_request.date_range
+        return span[0] <= start.year and end.year <= span[1]
+
+    def search(self, search_request: SearchRequest) -> Optional[List[str]]:
+        """
+        PMIDs que respondem a uma consulta simples, ou None se ela precisa do
+        PubMed. Sem resultados ou fora dos anos do acervo também é None: um
+        acervo parcial (ex.: só arquivos de atualização) não prova que não há artigos.
+        """
+        if not self.covers(search_request):
+            return None
+        try:
+            match = to_fts_query(parse_query(search_request.query))
+        except QuerySyntaxError:
+            return None
+        if match is None:
+            return None
+
+        sql = "SELECT a.pmid FROM articles_fts f JOIN articles a ON a.pmid = f.rowid WHERE articles_fts MATCH ?"
+        params: List = [match]
+        if search_request.date_range:
+            start, end = search_request.date_range
+            sql += " AND a.year BETWEEN ? AND ?"
+            params += [start.year, end.year]
+        if SortType(search_request.sort_by) == SortType.DATE:
+            sql += " ORDER BY a.year DESC, a.pmid DESC"
+        else:
+            sql += " ORDER BY bm25(articles_fts)"
+        sql += " LIMIT ?"
+        params.append(search_request.max_results)
+        try:
+            pmids = [str(row[0]) for row in self.conn.execute(sql, params)]
+        except sqlite3.OperationalError:
+            # Sintaxe que o FTS5 não aceita: a busca vai para o PubMed
+            return None
+        return pmids or None
+
+    def _delete(self, pmids: List[int]):
+        """Remove artigos e os seus termos (o índice sem conteúdo exige os valores originais)"""
+        for start in range(0, len(pmids), 500):
+            chunk = pmids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT pmid, data FROM articles WHERE pmid IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for pmid, data in rows:
+                old = article_row(json.loads(zlib.decompress(data)))
+                self.conn.execute(
+                    "INSERT INTO articles_fts (articles_fts, rowid, title, abstract, keywords, pub_types) "
+                    "VALUES ('delete', ?, ?, ?, ?, ?)",
+                    (pmid, *old[3:])
+                )
+            self.conn.executemany("DELETE FROM articles WHERE pmid = ?", [(row[0],) for row in rows])
+
+    def _apply(self, name: str, rows: List[Tuple], deleted: List[int]):
+        """Grava um arquivo processado; versões novas de um artigo substituem as antigas"""
+        conn = self.conn
+        # Um arquivo pode trazer mais de uma versão do mesmo artigo: vale a última
+        rows = list({row[0]: row for row in rows}.values())
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for start in range(0, len(rows), WRITE_BATCH_SIZE):
+                batch = rows[start:start + WRITE_BATCH_SIZE]
+                self._delete([row[0] for row in batch])
+                conn.executemany("INSERT INTO articles (pmid, year, data) VALUES (?, ?, ?)", [row[:3] for row in batch])
+                conn.executemany(
+                    "INSERT INTO articles_fts (rowid, title, abstract, keywords, pub_types) VALUES (?, ?, ?, ?, ?)",
+                    [(row[0], *row[3:]) for row in batch]
+                )
+            self._delete(deleted)
+            conn.execute("INSERT OR REPLACE INTO files (name, articles, deleted) VALUES (?, ?, ?)",
+                         (name, len(rows), len(deleted)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def ingest(self, paths: Iterable[str], workers: Optional[int] = None) -> IngestStats:
+        """
+        Ingere arquivos pubmed*.xml.gz ainda não processados. O XML é lido em
+        paralelo por `workers` processos; a gravação acontece no processo
+        atual, na ordem dos nomes dos arquivos (baseline e depois atualizações).
+        """
+        stats = IngestStats()
+        done = set(self.ingested_files())
+        pending = []
+        for path in sorted(paths, key=lambda p: os.path.basename(p)):
+            if os.path.basename(path) in done:
+                stats.skipped += 1
+            else:
+                pending.append(path)
+
+        def record(path: str, rows: List[Tuple], deleted: List[int]):
+            self._apply(os.path.basename(path), rows, deleted)
+            stats.files += 1
+            stats.articles += len(rows)
+            stats.deleted += len(deleted)
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(pending) <= 1:
+            for path in pending:
+                record(path, *parse_baseline_file(path))
+            return stats
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Janela limitada de arquivos em processamento: a memória não cresce com o baseline inteiro
+            paths = iter(pending)
+            window = deque()
+            for path in paths:
+                window.append((path, executor.submit(parse_baseline_file, path)))
+                if len(window) >= workers * 2:
+                    break
+            while window:
+                path, future = window.popleft()
+                for next_path in paths:
+                    window.append((next_path, executor.submit(parse_baseline_file, next_path)))
+                    break
+                record(path, *future.result())
+        return stats
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_corpus: Optional[LocalCorpus] = None
+_corpus_lock = threading.Lock()
+
+
+def get_local_corpus() -> Optional[LocalCorpus]:
+    """Acervo local compartilhado, ou None se nenhum arquivo foi ingerido"""
+    global _corpus
+    if _corpus is None:
+        if not os.path.exists(DEFAULT_CORPUS_PATH):
+            return None
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = LocalCorpus(DEFAULT_CORPUS_PATH)
+    return _corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingere arquivos do baseline/atualizações do PubMed no acervo local")
+    parser.add_argument("sources", nargs="+", help="Arquivos pubmed*.xml.gz ou diretórios que os contêm")
+    parser.add_argument("--output", default=DEFAULT_CORPUS_PATH, help="Caminho do acervo SQLite")
+    parser.add_argument("--workers", type=int, default=None, help="Processos de leitura do XML (padrão: CPUs)")
+    args = parser.parse_args()
+
+    paths = []
+    for source in args.sources:
+        if os.path.isdir(source):
+            paths += [str(p) for p in Path(source).glob("pubmed*.xml*")]
+        else:
+            paths.append(source)
+    stats = LocalCorpus(args.output).ingest(paths, workers=args.workers)
+    print(
+        f"{stats.files} arquivos ingeridos ({stats.skipped} já processados): "
+        f"{stats.articles} artigos, {stats.deleted} removidos"
+    )
+
+
+if __name__ == "__main__":
+    main()
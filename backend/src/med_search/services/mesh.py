@@ -0,0 +1,215 @@
+import os
+import gzip
+import sqlite3
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .cache import DEFAULT_CACHE_DIR
+from .query import Group, Node, QuerySyntaxError, Term, parse_query
+from .strategy import MESH_TAGS
+
+DEFAULT_MESH_INDEX_PATH = os.getenv("MESH_INDEX_PATH", os.path.join(DEFAULT_CACHE_DIR, "mesh.sqlite3"))
+
+# Tamanho do mapeamento em memória do arquivo do índice
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def normalize_term(term: str) -> str:
+    """Forma usada nas buscas: sem diferença de caixa e com espaços normalizados"""
+    return " ".join(term.casefold().split())
+
+
+@dataclass
+class MeshDescriptor:
+    ui: str
+    name: str
+    entry_terms: List[str] = field(default_factory=list)
+
+
+def iter_descriptors(source: str) -> Iterator[MeshDescriptor]:
+    """Lê o XML de descritores da NLM (desc20XX.xml ou .xml.gz) de forma incremental"""
+    opener = gzip.open if str(source).endswith(".gz") else open
+    with opener(source, "rb") as file:
+        for _, element in ET.iterparse(file, events=("end",)):
+            if element.tag != "DescriptorRecord":
+                continue
+            ui = element.findtext("DescriptorUI")
+            name = element.findtext("DescriptorName/String")
+            if ui and name:
+                terms = [
+                    term.text for term in element.iterfind("ConceptList/Concept/TermList/Term/String")
+                    if term.text and term.text != name
+                ]
+                yield MeshDescriptor(ui, name, list(dict.fromkeys(terms)))
+            element.clear()
+
+
+def build_mesh_index(source: str, output: str = DEFAULT_MESH_INDEX_PATH) -> int:
+    """Cria o índice SQLite de descritores e termos de entrada; retorna o total de descritores"""
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    tmp_output = f"{output}.tmp"
+    if os.path.exists(tmp_output):
+        os.remove(tmp_output)
+
+    conn = sqlite3.connect(tmp_output)
+    conn.executescript("""
+        PRAGMA journal_mode=OFF;
+        PRAGMA synchronous=OFF;
+        CREATE TABLE descriptors (ui TEXT PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE terms (term TEXT NOT NULL, ui TEXT NOT NULL, display TEXT NOT NULL, preferred INTEGER NOT NULL);
+    """)
+    count = 0
+    for descriptor in iter_descriptors(source):
+        conn.execute("INSERT INTO descriptors VALUES (?, ?)", (descriptor.ui, descriptor.name))
+        rows = [(normalize_term(descriptor.name), descriptor.ui, descriptor.name, 1)]
+        rows += [(normalize_term(term), descriptor.ui, term, 0) for term in descriptor.entry_terms]
+        conn.executemany("INSERT INTO terms VALUES (?, ?, ?, ?)", rows)
+        count += 1
+    # O índice B-tree atende tanto a busca exata quanto a por prefixo
+    conn.execute("CREATE INDEX terms_term ON terms (term)")
+    conn.execute("CREATE INDEX terms_ui ON terms (ui)")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_output, output)
+    return count
+
+
+class MeshIndex:
+    """
+    Consulta local ao vocabulário MeSH. O arquivo só é aberto na primeira
+    consulta, em modo somente leitura e mapeado em memória, para não pesar
+    na inicialização da API.
+    """
+
+    def __init__(self, path: str = DEFAULT_MESH_INDEX_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+                    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+                    self._conn = conn
+        return self._conn
+
+    def lookup(self, term: str) -> Optional[MeshDescriptor]:
+        """Busca exata por um descritor ou termo de entrada"""
+        row = self.conn.execute(
+            "SELECT d.ui, d.name FROM terms t JOIN descriptors d ON d.ui = t.ui "
+            "WHERE t.term = ? ORDER BY t.preferred DESC LIMIT 1",
+            (normalize_term(term),)
+        ).fetchone()
+        return MeshDescriptor(*row) if row else None
+
+    def preferred_heading(self, term: str) -> Optional[str]:
+        """Cabeçalho oficial correspondente a um termo (ele mesmo ou um termo de entrada)"""
+        descriptor = self.lookup(term)
+        return descriptor.name if descriptor else None
+
+    def is_heading(self, term: str) -> bool:
+        descriptor = self.lookup(term)
+        return descriptor is not None and normalize_term(descriptor.name) == normalize_term(term)
+
+    def synonyms(self, heading: str, limit: int = 10) -> List[str]:
+        """Termos de entrada (sinônimos) de um cabeçalho"""
+        descriptor = self.lookup(heading)
+        if descriptor is None:
+            return []
+        rows = self.conn.execute(
+            "SELECT display FROM terms WHERE ui = ? AND preferred = 0 LIMIT ?",
+            (descriptor.ui, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def prefix(self, prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """Termos que começam com `prefix`, como pares (termo, cabeçalho oficial)"""
+        start = normalize_term(prefix)
+        rows = self.conn.execute(
+            "SELECT t.display, d.name FROM terms t JOIN descriptors d ON d.ui = t.ui "
+            "WHERE t.term >= ? AND t.term < ? ORDER BY t.term LIMIT ?",
+            (start, start + "\uffff", limit)
+        ).fetchall()
+        return [(display, name) for display, name in rows]
+
+    def rewrite_query(self, query: str, expand_synonyms: bool = False, max_synonyms: int = 3) -> Tuple[str, Dict]:
+        """
+        Valida os termos [Mesh] de uma estratégia: termos de entrada viram o
+        cabeçalho oficial, termos inexistentes passam a ser buscados em título e
+        resumo ([tiab]) e, opcionalmente, sinônimos são adicionados com OR.
+        Subcabeçalhos ("Parkinson Disease/drug therapy"[Mesh]) são preservados:
+        só o descritor é validado, e um termo qualificado nunca vira [tiab].
+        """
+        report = {"valid": [], "mapped": {}, "invalid": []}
+        try:
+            node = parse_query(query)
+        except QuerySyntaxError:
+            return query, report
+
+        def visit(node: Node) -> Node:
+            if isinstance(node, Group):
+                return Group(node.op, [visit(child) for child in node.children])
+            if not node.tag or node.tag.lower() not in MESH_TAGS:
+                return node
+            descriptor, slash, qualifier = node.text.partition("/")
+            heading = self.preferred_heading(descriptor)
+            if heading is None:
+                if slash:
+                    # Sem o descritor no índice, o subcabeçalho não tem equivalente em [tiab]
+                    return node
+                report["invalid"].append(node.text)
+                return Term(node.text, "tiab", quoted=True)
+            if normalize_term(heading) != normalize_term(descriptor):
+                report["mapped"][descriptor] = heading
+            else:
+                report["valid"].append(heading)
+            term = Term(f"{heading}/{qualifier}" if slash else heading, node.tag, quoted=True)
+            if expand_synonyms and not slash:
+                extra = [Term(s, "tiab", quoted=True) for s in self.synonyms(heading, max_synonyms)]
+                if extra:
+                    return Group("OR", [term, *extra])
+            return term
+
+        rewritten = visit(node)
+        if not report["mapped"] and not report["invalid"] and not expand_synonyms:
+            return query, report
+        return rewritten.render(), report
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_mesh_index: Optional[MeshIndex] = None
+
+
+def get_mesh_index() -> Optional[MeshIndex]:
+    """Índice MeSH compartilhado, ou None se o arquivo ainda não foi gerado"""
+    global _mesh_index
+    if _mesh_index is None:
+        if not os.path.exists(DEFAULT_MESH_INDEX_PATH):
+            return None
+        _mesh_index = MeshIndex(DEFAULT_MESH_INDEX_PATH)
+    return _mesh_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o índice local do vocabulário MeSH")
+    parser.add_argument("source", help="Arquivo de descritores da NLM (desc20XX.xml ou .xml.gz)")
+    parser.add_argument("--output", default=DEFAULT_MESH_INDEX_PATH, help="Caminho do índice SQLite")
+    args = parser.parse_args()
+    total = build_mesh_index(args.source, args.output)
+    print(f"{total} descritores indexados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,218 @@
 import os
+import asyncio
+import itertools
+import logging
 import requests
-from typing import List, Dict, Optional
-import xml.etree.ElementTree as ET
+import httpx
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 from datetime import date
-from ..models.schemas import Article, Author, SearchRequest
+from ..models.schemas import Article, Author, BatchSearchResult, SearchHistory, SearchRequest
+from .pubmed_parser import CHUNK_SIZE, aiter_articles_xml, iter_articles_xml
+from .rate_limit import RequestScheduler, get_scheduler
+from .cache import ArticleCache, SearchCache, get_article_cache, get_search_cache
+from .corpus import LOCAL_SEARCH_ENABLED, LocalCorpus, get_local_corpus
+from .telemetry import ametered, metered, record_cache, span
 from dotenv import load_dotenv
 
 load_dotenv()
 
-class PubMedClient:
+logger = logging.getLogger(__name__)
+
+# Configuração do pool de conexões HTTP (pode ser sobrescrita por variáveis de ambiente)
+DEFAULT_POOL_SIZE = int(os.getenv("PUBMED_POOL_SIZE", "10"))
+DEFAULT_TIMEOUT = float(os.getenv("PUBMED_TIMEOUT", "30"))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("PUBMED_CONNECT_TIMEOUT", "5"))
+
+# Quantidade de artigos por requisição ao efetch e requisições simultâneas no modo bulk
+DEFAULT_BATCH_SIZE = int(os.getenv("PUBMED_BATCH_SIZE", "200"))
+DEFAULT_CONCURRENCY = os.getenv("PUBMED_CONCURRENCY")
+
+# Etapa do download e parse do XML do efetch, que acontecem juntos no streaming
+XML_PARSE_STAGE = "eutils.efetch_parse"
+
+
+def eutils_stage(endpoint: str) -> str:
+    """Nome da etapa de uma requisição à E-utilities (ex.: esearch.fcgi -> eutils.esearch)"""
+    return "eutils." + endpoint.split(".")[0]
+
+
+def chunk_ranges(total: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """Divide `total` itens em pares (retstart, retmax) de no máximo `chunk_size`"""
+    return [(start, min(chunk_size, total - start)) for start in range(0, total, chunk_size)]
+
+
+async def ordered_map(
+    func: Callable[..., Awaitable],
+    items: Iterable,
+    concurrency: int
+) -> AsyncIterator:
+    """
+    Executa `func` para cada item com no máximo `concurrency` chamadas em paralelo,
+    devolvendo os resultados na ordem original dos itens.
+    """
+    items = iter(items)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(func(item)))
+            if len(pending) >= concurrency:
+                break
+        while pending:
+            result = await pending.popleft()
+            for item in items:
+                pending.append(asyncio.ensure_future(func(item)))
+                break
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+        # Aguarda os cancelamentos para não deixar tarefas pendentes nem exceções sem leitura
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def thread_ordered_map(executor: Executor, func: Callable, items: Iterable, concurrency: int) -> Iterator:
+    """
+    Versão com threads de `ordered_map`: no máximo `concurrency` chamadas
+    submetidas por vez, então os resultados não se acumulam além do que o
+    consumidor ainda não leu.
+    """
+    items = iter(items)
+    pending = deque(executor.submit(func, item) for item in itertools.islice(items, concurrency))
+    try:
+        while pending:
+            result = pending.popleft().result()
+            for item in itertools.islice(items, 1):
+                pending.append(executor.submit(func, item))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def merge_in_order(pmids: List[str], cached: Dict[str, Dict], fetched: Iterator[Dict]) -> Iterator[Dict]:
+    """Intercala artigos do cache com os buscados na rede, na ordem dos PMIDs"""
+    buffer = {}
+    for pmid in pmids:
+        if pmid in cached:
+            yield cached[pmid]
+            continue
+        while pmid not in buffer:
+            article = next(fetched, None)
+            if article is None:
+                break
+            buffer[article.get("pmid")] = article
+        if pmid in buffer:
+            yield buffer.pop(pmid)
+    yield from buffer.values()
+    yield from fetched
+
+
+async def amerge_in_order(pmids: List[str], cached: Dict[str, Dict], fetched: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+    """Versão assíncrona de `merge_in_order`"""
+    buffer = {}
+    for pmid in pmids:
+        if pmid in cached:
+            yield cached[pmid]
+            continue
+        while pmid not in buffer:
+            try:
+                article = await fetched.__anext__()
+            except StopAsyncIteration:
+                break
+            buffer[article.get("pmid")] = article
+        if pmid in buffer:
+            yield buffer.pop(pmid)
+    for article in buffer.values():
+        yield article
+    async for article in fetched:
+        yield article
+
+
+def batch_overlap(hits: List[List[str]]) -> List[List[int]]:
+    """Quantidade de PMIDs em comum entre cada par de estratégias (a diagonal é o total de cada uma)"""
+    sets = [set(pmids) for pmids in hits]
+    return [[len(a & b) for b in sets] for a in sets]
+
+
+def batch_result(hits: List[List[str]], articles: Optional[List[Dict]]) -> BatchSearchResult:
+    if articles is None:
+        raise RuntimeError("Erro ao buscar os detalhes dos artigos do lote")
+    return BatchSearchResult(hits=hits, articles=articles, overlap=batch_overlap(hits))
+
+
+def parse_articles_summary(pmids: List[str], articles_data: Dict) -> List[Article]:
+    """Converte o resultado JSON do esummary em uma lista de artigos"""
+    articles = []
+
+    for pmid in pmids:
+        article_data = articles_data[pmid]
+
+        # Converte os dados para modelo utilizado
+        article = Article(
+            pmid=pmid,
+            title=article_data["title"],
+            authors=[
+                Author(
+                    name=author["name"],
+                    affiliation=None
+                )
+                for author in article_data.get("authors", [])
+            ],
+            journal=article_data["fulljournalname"],
+            publication_date=article_data["pubdate"],
+            abstract=None,
+            article_type=article_data.get("pubtype", []),
+            doi=next(
+                (id_obj["value"] for id_obj in article_data["articleids"]
+                 if id_obj["idtype"] == "doi"), None
+            ),
+            url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
+        )
+        articles.append(article)
+
+    return articles
+
+
+class _PubMedBase:
+    """Parâmetros e configuração compartilhados pelos clientes síncrono e assíncrono"""
     BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
 
-    def __init__(self, api_key: Optional[str] = None):
-        api_key = os.getenv("PUBMED_API_KEY")
-        self.api_key = api_key
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: Optional[int] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        article_cache: Optional[ArticleCache] = None,
+        search_cache: Optional[SearchCache] = None,
+        corpus: Optional[LocalCorpus] = None,
+        local_search: bool = LOCAL_SEARCH_ENABLED,
+        base_url: Optional[str] = None
+    ):
+        self.api_key = api_key or os.getenv("PUBMED_API_KEY")
+        # PUBMED_EUTILS_URL aponta os clientes para outro servidor (ex.: o substituto local dos benchmarks)
+        self.base_url = (base_url or os.getenv("PUBMED_EUTILS_URL") or self.BASE_URL).rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.batch_size = batch_size
+        # O NCBI permite 3 requisições/s sem chave e 10 com chave
+        if max_concurrency is None:
+            max_concurrency = int(DEFAULT_CONCURRENCY) if DEFAULT_CONCURRENCY else (10 if self.api_key else 3)
+        self.max_concurrency = max(1, min(max_concurrency, pool_size))
+        # Todas as chamadas passam pelo limitador de taxa compartilhado do processo
+        self.scheduler = scheduler or get_scheduler(bool(self.api_key))
+        self.article_cache = article_cache
+        self.search_cache = search_cache
+        # Acervo local (baseline da NLM) consultado antes da rede
+        self.corpus = corpus
+        self.local_search = local_search
 
     def _build_base_params(self, format_type: str = "json") -> Dict:
         """Constrói parâmetros base para as requisições"""
@@ -26,13 +225,13 @@ class PubMedClient:
             params["api_key"] = self.api_key
         return params
 
-    def search_pmids_articles(self, search_request: SearchRequest) -> List[Article]:
-        """Realiza busca no PubMed por meio de uma estratégia de busca para obter IDs de artigos"""
+    def _build_search_params(self, search_request: SearchRequest) -> Dict:
+        """Constrói os parâmetros do esearch a partir da requisição de busca"""
         search_params = self._build_base_params()
         search_params.update({
             "term": search_request.query,
             "retmax": search_request.max_results,
-            "sort": search_request.sort_by
+            "sort": search_request.sort_by.value
         })
 
         # Adiciona filtros de data se especificados
@@ -43,25 +242,166 @@ class PubMedClient:
                 "maxdate": end_date.strftime("%Y/%m/%d"),
                 "datetype": "pdat"
             })
+        return search_params
+
+    def _build_history_search_params(self, search_request: SearchRequest) -> Dict:
+        """Parâmetros do esearch que armazenam o resultado no History server"""
+        search_params = self._build_search_params(search_request)
+        search_params.update({"usehistory": "y", "retmax": 0})
+        return search_params
+
+    def _build_page_search_params(self, search_request: SearchRequest) -> Dict:
+        """Parâmetros do esearch que retornam a primeira página de PMIDs e guardam o resultado no History server"""
+        search_params = self._build_search_params(search_request)
+        search_params["usehistory"] = "y"
+        return search_params
+
+    def _build_count_params(self, search_request: SearchRequest) -> Dict:
+        """Parâmetros do esearch que retornam só o total de resultados (rettype=count, sem PMIDs)"""
+        search_params = self._build_search_params(search_request)
+        del search_params["retmax"], search_params["sort"]
+        search_params["rettype"] = "count"
+        return search_params
+
+    def _build_fetch_params(self, pmids: List[str]) -> Dict:
+        """Parâmetros do efetch para uma lista de PMIDs"""
+        params = self._build_base_params("xml")
+        params["id"] = ",".join(pmids)
+        return params
 
-        # Primeira chamada para obter os PMIDs
-        response = requests.get(
-            f"{self.BASE_URL}/esearch.fcgi",
-            params=search_params
+    def _build_history_fetch_params(self, history: SearchHistory, retstart: int, retmax: int) -> Dict:
+        """Parâmetros do efetch para uma página do resultado no History server"""
+        params = self._build_base_params("xml")
+        params.update({
+            "WebEnv": history.webenv,
+            "query_key": history.query_key,
+            "retstart": retstart,
+            "retmax": retmax
+        })
+        return params
+
+    def _pmid_batches(self, pmids: List[str]) -> List[List[str]]:
+        """Divide a lista de PMIDs em lotes aceitos pela URL do efetch"""
+        return [pmids[start:start + retmax] for start, retmax in chunk_ranges(len(pmids), self.batch_size)]
+
+    def _split_cached(self, pmids: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+        """Separa os artigos já em cache (ou no acervo local) dos PMIDs que precisam ir ao efetch"""
+        if self.article_cache is None:
+            cached, missing = {}, pmids
+        else:
+            cached, missing = self.article_cache.split(pmids)
+            record_cache("article", hits=len(cached), misses=len(missing))
+        if self.corpus is not None and missing:
+            local = self.corpus.get_many(missing)
+            record_cache("corpus", hits=len(local), misses=len(missing) - len(local))
+            if local:
+                cached = {**cached, **local}
+                missing = [pmid for pmid in missing if pmid not in local]
+        return cached, missing
+
+    def _local_search(self, search_request: SearchRequest) -> Optional[List[str]]:
+        """PMIDs de uma consulta simples respondida pelo acervo local, ou None para ir ao esearch"""
+        if self.corpus is None or not self.local_search:
+            return None
+        return self.corpus.search(search_request)
+
+    def _cached_search(self, search_request: SearchRequest) -> Optional[List[str]]:
+        if self.search_cache is None:
+            return None
+        pmids = self.search_cache.get(search_request)
+        record_cache("search", hits=pmids is not None, misses=pmids is None)
+        return pmids
+
+    def _cache_search(self, search_request: SearchRequest, pmids: List[str]):
+        if self.search_cache is not None:
+            self.search_cache.set(search_request, pmids)
+
+    def _cached_count(self, search_request: SearchRequest) -> Optional[int]:
+        if self.search_cache is None:
+            return None
+        count = self.search_cache.get_count(search_request)
+        record_cache("count", hits=count is not None, misses=count is None)
+        return count
+
+    def _cache_count(self, search_request: SearchRequest, count: int):
+        if self.search_cache is not None:
+            self.search_cache.set_count(search_request, count)
+
+    def _cache_articles(self, articles: List[Dict]):
+        if self.article_cache is not None and articles:
+            self.article_cache.put_many(articles)
+
+    @staticmethod
+    def _parse_history(search_results: Dict) -> SearchHistory:
+        result = search_results["esearchresult"]
+        return SearchHistory(
+            webenv=result["webenv"],
+            query_key=result["querykey"],
+            count=int(result["count"])
         )
-        response.raise_for_status()
+
+
+class PubMedClient(_PubMedBase):
+    """Cliente síncrono das E-utilities com sessão HTTP persistente (keep-alive)"""
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _get(self, endpoint: str, params: Dict, stream: bool = False) -> requests.Response:
+        """Executa um GET na E-utilities reaproveitando as conexões do pool"""
+        with span(eutils_stage(endpoint)) as current:
+            response = self.scheduler.execute(
+                lambda: self.session.get(
+                    f"{self.base_url}/{endpoint}",
+                    params=params,
+                    timeout=(self.connect_timeout, self.timeout),
+                    stream=stream
+                ),
+                close=lambda r: r.close()
+            )
+            if not response.ok:
+                response.close()
+            response.raise_for_status()
+            if not stream:
+                current.add_bytes(len(response.content))
+        return response
+
+    def close(self):
+        """Fecha as conexões do pool"""
+        self.session.close()
+
+    def search_pmids_articles(self, search_request: SearchRequest) -> List[str]:
+        """Realiza busca no PubMed por meio de uma estratégia de busca para obter IDs de artigos"""
+        # Estratégias equivalentes (espaços, caixa, ordem dos blocos) reaproveitam o resultado
+        cached = self._cached_search(search_request)
+        if cached is not None:
+            return cached
+
+        # Resultado do acervo local não vai ao cache de buscas, compartilhado com o esearch
+        local = self._local_search(search_request)
+        if local is not None:
+            return local
+
+        search_params = self._build_search_params(search_request)
+
+        # Primeira chamada para obter os PMIDs
+        response = self._get("esearch.fcgi", search_params)
         search_results = response.json()
 
         pmids = search_results["esearchresult"]["idlist"]
+        self._cache_search(search_request, pmids)
 
         # Se não encontrou resultados, retorna lista vazia
         if not pmids:
             return []
 
-        # Busca os detalhes dos artigos encontrados
         return pmids
 
-    def search_articles(self, search_request: SearchRequest) -> List[Article]:
+    def search_articles(self, search_request: SearchRequest) -> List[Dict]:
         """Realiza a busca de artigos no PubMed"""
         # Primeiro, busca os PMIDs
         pmids = self.search_pmids_articles(search_request)
@@ -73,173 +413,387 @@ class PubMedClient:
         # Busca os detalhes dos artigos encontrados
         return self._fetch_articles_details_xml(pmids)
 
+    def iter_search_articles(self, search_request: SearchRequest) -> Iterator[Dict]:
+        """Realiza a busca e gera cada artigo assim que ele é processado"""
+        pmids = self.search_pmids_articles(search_request)
+        if pmids:
+            yield from self.iter_articles_details_xml(pmids)
+
     def _fetch_articles_details(self, pmids: List[str]) -> List[Article]:
         """Busca os detalhes dos artigos usando os PMIDs"""
         summary_params = self._build_base_params()
         summary_params["id"] = ",".join(pmids)
 
-        response = requests.get(
-            f"{self.BASE_URL}/esummary.fcgi",
-            params=summary_params
-        )
-        response.raise_for_status()
-
-        articles_data = response.json()["result"]
-        articles = []
-
-        for pmid in pmids:
-            article_data = articles_data[pmid]
-
-            # Converte os dados para modelo utilizado
-            article = Article(
-                pmid=pmid,
-                title=article_data["title"],
-                authors=[
-                    Author(
-                        name=author["name"],
-                        affiliation=None
-                    )
-                    for author in article_data.get("authors", [])
-                ],
-                journal=article_data["fulljournalname"],
-                publication_date=article_data["pubdate"],
-                abstract=None,
-                article_type=article_data.get("pubtype", []),
-                doi=next(
-                    (id_obj["value"] for id_obj in article_data["articleids"]
-                     if id_obj["idtype"] == "doi"), None
-                ),
-                url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
-            )
-            articles.append(article)
+        response = self._get("esummary.fcgi", summary_params)
+        return parse_articles_summary(pmids, response.json()["result"])
 
-        return articles
-    
-    def _fetch_articles_details_xml(self, pmids: List) -> List[Article]:
+    def _iter_efetch(self, params: Dict) -> Iterator[Dict]:
+        with self._get("efetch.fcgi", params, stream=True) as response, span(XML_PARSE_STAGE) as current:
+            for article in iter_articles_xml(metered(response.iter_content(CHUNK_SIZE), current)):
+                current.add_articles()
+                yield article
 
-        params = self._build_base_params("xml")
-        params["id"] = ",".join(pmids)
-        
+    def _iter_missing(self, pmids: List[str]) -> Iterator[Dict]:
+        for batch in self._pmid_batches(pmids):
+            articles = []
+            for article in self._iter_efetch(self._build_fetch_params(batch)):
+                articles.append(article)
+                yield article
+            self._cache_articles(articles)
+
+    def iter_articles_details_xml(self, pmids: List) -> Iterator[Dict]:
+        """
+        Gera os artigos à medida que o XML é recebido e processado. Artigos em cache
+        são devolvidos imediatamente e apenas os PMIDs ausentes vão ao efetch.
+        """
+        pmids = list(dict.fromkeys(pmids))
+        cached, missing = self._split_cached(pmids)
+        yield from merge_in_order(pmids, cached, self._iter_missing(missing))
+
+    def fetch_articles(self, pmids: List) -> Optional[List[Dict]]:
+        """
+        Artigos completos dos PMIDs, na ordem informada (cache e acervo local
+        antes do efetch); None se a busca na E-utilities falhar
+        """
+        return self._fetch_articles_details_xml(pmids)
+
+    def _fetch_articles_details_xml(self, pmids: List) -> List[Dict]:
         try:
-            response = requests.get(
-                f"{self.BASE_URL}/efetch.fcgi", 
-                params=params
+            return list(self.iter_articles_details_xml(pmids))
+
+        except Exception as e:
+            logger.exception("Erro ao buscar detalhes dos artigos %s: %s", pmids, e)
+            return None
+
+    def search_batch(self, search_requests: List[SearchRequest]) -> BatchSearchResult:
+        """
+        Executa várias estratégias: os esearch rodam em paralelo (dentro do limite
+        de requisições do NCBI) e cada PMID da união é buscado uma única vez.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            hits = list(executor.map(self.search_pmids_articles, search_requests))
+        unique = list(dict.fromkeys(pmid for pmids in hits for pmid in pmids))
+        return batch_result(hits, self._fetch_articles_details_xml(unique) if unique else [])
+
+    def count_articles(self, search_request: SearchRequest) -> int:
+        """Total de artigos da estratégia, sem transferir PMIDs nem artigos"""
+        cached = self._cached_count(search_request)
+        if cached is not None:
+            return cached
+        response = self._get("esearch.fcgi", self._build_count_params(search_request))
+        count = int(response.json()["esearchresult"]["count"])
+        self._cache_count(search_request, count)
+        return count
+
+    def count_queries(self, search_requests: Dict[str, SearchRequest]) -> Dict[str, int]:
+        """Totais de várias consultas (ex.: a estratégia e cada um dos seus blocos), em paralelo"""
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            counts = list(executor.map(self.count_articles, search_requests.values()))
+        return dict(zip(search_requests, counts))
+
+    def search_history(self, search_request: SearchRequest) -> SearchHistory:
+        """Executa o esearch guardando o resultado no History server (WebEnv/query_key)"""
+        response = self._get("esearch.fcgi", self._build_history_search_params(search_request))
+        return self._parse_history(response.json())
+
+    def search_page(self, search_request: SearchRequest) -> Tuple[SearchHistory, List[str]]:
+        """Primeira página da busca (até max_results PMIDs) e a referência no History server para as seguintes"""
+        response = self._get("esearch.fcgi", self._build_page_search_params(search_request))
+        search_results = response.json()
+        return self._parse_history(search_results), search_results["esearchresult"]["idlist"]
+
+    def _fetch_history_chunk(self, history: SearchHistory, retstart: int, retmax: int) -> List[Dict]:
+        articles = list(self._iter_efetch(self._build_history_fetch_params(history, retstart, retmax)))
+        self._cache_articles(articles)
+        return articles
+
+    def fetch_history_page(self, history: SearchHistory, retstart: int, retmax: int) -> List[Dict]:
+        """Artigos de uma página do resultado no History server, sem repetir o esearch"""
+        return self._fetch_history_chunk(history, retstart, retmax)
+
+    def iter_bulk_articles(
+        self,
+        search_request: SearchRequest,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Modo bulk: pagina o efetch pelo History server em lotes de `chunk_size`,
+        buscando os lotes em paralelo e gerando os artigos na ordem do esearch.
+        """
+        history = self.search_history(search_request)
+        total = min(history.count, search_request.max_results)
+        ranges = chunk_ranges(total, chunk_size or self.batch_size)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            def fetch(chunk: Tuple[int, int]) -> List[Dict]:
+                return self._fetch_history_chunk(history, *chunk)
+
+            for batch in thread_ordered_map(executor, fetch, ranges, self.max_concurrency):
+                yield from batch
+
+
+class AsyncPubMedClient(_PubMedBase):
+    """
+    Versão assíncrona do PubMedClient, com a mesma interface de métodos.
+    Usa um único httpx.AsyncClient com pool de conexões keep-alive, evitando
+    bloquear o event loop do servidor durante as chamadas ao esearch/efetch.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        **kwargs
+    ):
+        super().__init__(api_key, **kwargs)
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cria o cliente HTTP sob demanda (precisa de um event loop ativo)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                transport=self.transport
             )
+        return self._client
+
+    async def _get(self, endpoint: str, params: Dict, stream: bool = False) -> httpx.Response:
+        """Executa um GET na E-utilities reaproveitando as conexões do pool"""
+        async def send():
+            request = self.client.build_request("GET", f"/{endpoint}", params=params)
+            return await self.client.send(request, stream=stream)
+
+        with span(eutils_stage(endpoint)) as current:
+            response = await self.scheduler.aexecute(send, close=lambda r: r.aclose())
+            if response.is_error:
+                await response.aclose()
             response.raise_for_status()
+            if not stream:
+                current.add_bytes(len(response.content))
+        return response
+
+    @staticmethod
+    async def _off_loop(func, *args):
+        """Leituras e escritas em disco (SQLite dos caches e do acervo) rodam fora do event loop"""
+        return await asyncio.to_thread(func, *args)
+
+    async def _search_cache_io(self, func, *args):
+        # Só a camada em disco do cache de buscas bloqueia; a memória é consultada direto
+        if self.search_cache is not None and self.search_cache.store is not None:
+            return await self._off_loop(func, *args)
+        return func(*args)
+
+    async def aclose(self):
+        """Fecha as conexões do pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def search_pmids_articles(self, search_request: SearchRequest) -> List[str]:
+        """Realiza busca no PubMed por meio de uma estratégia de busca para obter IDs de artigos"""
+        # Estratégias equivalentes (espaços, caixa, ordem dos blocos) reaproveitam o resultado
+        cached = await self._search_cache_io(self._cached_search, search_request)
+        if cached is not None:
+            return cached
 
-            # Parsear o XML
-            root = ET.fromstring(response.content)
+        # Resultado do acervo local não vai ao cache de buscas, compartilhado com o esearch
+        if self.corpus is not None and self.local_search:
+            local = await self._off_loop(self._local_search, search_request)
+            if local is not None:
+                return local
 
-            # Inicializar o dicionário de resultado
-            articles = []
+        search_params = self._build_search_params(search_request)
 
-            # Encontrar todos os elementos PubmedArticle
-            pubmed_articles = root.findall(".//PubmedArticle")
-
-            # Iterar sobre cada artigo
-            for article_element in pubmed_articles:
-                # Inicializar o dicionário para este artigo
-                article_data = {}
-
-                # Extrair PMID
-                pmid_element = article_element.find(".//PMID")
-                if pmid_element is not None and pmid_element.text:
-                    article_data["pmid"] = pmid_element.text
-
-                # Extrair o título
-                title_element = article_element.find(".//ArticleTitle")
-                if title_element is not None and title_element.text:
-                    article_data["title"] = title_element.text
-
-                # Extrair o abstract
-                abstract_texts = article_element.findall(".//AbstractText")
-                if abstract_texts:
-                    # Versão simples (texto completo)
-                    full_abstract = " ".join([text.text for text in abstract_texts if text.text])
-                    article_data["simple_abstract"] = full_abstract
-
-                    # Versão estruturada (por categoria)
-                    structured_abstract = {}
-                    for text in abstract_texts:
-                        if text.text:
-                            # Obter a categoria do abstract
-                            category = text.get("NlmCategory", "")
-                            label = text.get("Label", "")
-
-                            # Usar Label se disponível, senão usar NlmCategory
-                            section_title = label if label else category
-
-                            if section_title:
-                                structured_abstract[section_title] = text.text
-
-                    # Adicionar o abstract estruturado se houver seções
-                    if structured_abstract:
-                        article_data["abstract"] = structured_abstract
-
-                # Extrair autores
-                authors = []
-                author_elements = article_element.findall(".//Author")
-                for author in author_elements:
-                    last_name = author.find("LastName")
-                    fore_name = author.find("ForeName")
-                    if last_name is not None and last_name.text:
-                        author_name = last_name.text
-                        if fore_name is not None and fore_name.text:
-                            author_name = f"{fore_name.text} {author_name}"
-                        authors.append(author_name)
-
-                if authors:
-                    article_data["authors"] = authors
-
-                # Extrair DOI
-                doi_element = article_element.find(".//ArticleId[@IdType='doi']")
-                if doi_element is not None and doi_element.text:
-                    article_data["doi"] = doi_element.text
-
-                # Extrair data de publicação
-                pub_date = article_element.find(".//PubDate")
-                if pub_date is not None:
-                    year = pub_date.find("Year")
-                    month = pub_date.find("Month")
-                    day = pub_date.find("Day")
-
-                    date_parts = []
-                    if year is not None and year.text:
-                        date_parts.append(year.text)
-                    if month is not None and month.text:
-                        date_parts.append(month.text)
-                    if day is not None and day.text:
-                        date_parts.append(day.text)
-
-                    if date_parts:
-                        article_data["publication_date"] = "/".join(date_parts)
-
-                # Extrair nome do journal
-                journal_title = article_element.find(".//Journal/Title")
-                if journal_title is not None and journal_title.text:
-                    article_data["journal"] = journal_title.text
-
-                # Extrair keywords
-                keyword_elements = article_element.findall(".//Keyword")
-                if keyword_elements:
-                    article_data["keywords"] = [kw.text for kw in keyword_elements if kw.text]
-
-                # Extrair tipos de publicação
-                article_type = []
-                publication_type_elements = article_element.findall(".//PublicationType")
-                if publication_type_elements:
-                    article_type = [pt.text for pt in publication_type_elements if pt.text]
-                article_data["article_type"] = article_type
-
-                # Adicionar URL do artigo
-                if "pmid" in article_data:
-                    article_data["url"] = f"https://pubmed.ncbi.nlm.nih.gov/{article_data['pmid']}/"
-
-                # Adicionar o artigo à lista
-                articles.append(article_data)
-
-            return articles
+        response = await self._get("esearch.fcgi", search_params)
+        search_results = response.json()
+
+        pmids = search_results["esearchresult"]["idlist"]
+        await self._search_cache_io(self._cache_search, search_request, pmids)
+
+        # Se não encontrou resultados, retorna lista vazia
+        if not pmids:
+            return []
+
+        return pmids
+
+    async def search_articles(self, search_request: SearchRequest) -> List[Dict]:
+        """Realiza a busca de artigos no PubMed"""
+        pmids = await self.search_pmids_articles(search_request)
+
+        # Se não encontrou resultados, retorna lista vazia
+        if not pmids:
+            return []
+
+        # Busca os detalhes dos artigos encontrados
+        return await self._fetch_articles_details_xml(pmids)
+
+    async def iter_search_articles(self, search_request: SearchRequest) -> AsyncIterator[Dict]:
+        """Realiza a busca e gera cada artigo assim que ele é processado"""
+        pmids = await self.search_pmids_articles(search_request)
+        if pmids:
+            async for article in self.iter_articles_details_xml(pmids):
+                yield article
+
+    async def _fetch_articles_details(self, pmids: List[str]) -> List[Article]:
+        """Busca os detalhes dos artigos usando os PMIDs"""
+        summary_params = self._build_base_params()
+        summary_params["id"] = ",".join(pmids)
+
+        response = await self._get("esummary.fcgi", summary_params)
+        return parse_articles_summary(pmids, response.json()["result"])
+
+    async def _iter_efetch(self, params: Dict) -> AsyncIterator[Dict]:
+        response = await self._get("efetch.fcgi", params, stream=True)
+        try:
+            with span(XML_PARSE_STAGE) as current:
+                async for article in aiter_articles_xml(ametered(response.aiter_bytes(CHUNK_SIZE), current)):
+                    current.add_articles()
+                    yield article
+        finally:
+            await response.aclose()
+
+    async def _collect_efetch(self, params: Dict) -> List[Dict]:
+        articles = [article async for article in self._iter_efetch(params)]
+        await self._cache_articles_off_loop(articles)
+        return articles
+
+    async def _cache_articles_off_loop(self, articles: List[Dict]):
+        if self.article_cache is not None and articles:
+            await self._off_loop(self._cache_articles, articles)
+
+    async def _iter_missing(self, pmids: List[str]) -> AsyncIterator[Dict]:
+        batches = self._pmid_batches(pmids)
+        if len(batches) == 1:
+            articles = []
+            async for article in self._iter_efetch(self._build_fetch_params(batches[0])):
+                articles.append(article)
+                yield article
+            await self._cache_articles_off_loop(articles)
+            return
+
+        # Vários lotes: busca em paralelo mantendo a ordem dos PMIDs
+        params = [self._build_fetch_params(batch) for batch in batches]
+        async for batch in ordered_map(self._collect_efetch, params, self.max_concurrency):
+            for article in batch:
+                yield article
+
+    async def iter_articles_details_xml(self, pmids: List) -> AsyncIterator[Dict]:
+        """
+        Gera os artigos à medida que o XML é recebido e processado. Artigos em cache
+        são devolvidos imediatamente e apenas os PMIDs ausentes vão ao efetch.
+        """
+        pmids = list(dict.fromkeys(pmids))
+        if self.article_cache is not None or self.corpus is not None:
+            cached, missing = await self._off_loop(self._split_cached, pmids)
+        else:
+            cached, missing = {}, pmids
+        async for article in amerge_in_order(pmids, cached, self._iter_missing(missing)):
+            yield article
+
+    async def fetch_articles(self, pmids: List) -> Optional[List[Dict]]:
+        """
+        Artigos completos dos PMIDs, na ordem informada (cache e acervo local
+        antes do efetch); None se a busca na E-utilities falhar
+        """
+        return await self._fetch_articles_details_xml(pmids)
+
+    async def _fetch_articles_details_xml(self, pmids: List) -> List[Dict]:
+        try:
+            return [article async for article in self.iter_articles_details_xml(pmids)]
 
         except Exception as e:
-            print(f"Erro ao buscar detalhes do artigo {pmids}: {str(e)}")
+            logger.exception("Erro ao buscar detalhes dos artigos %s: %s", pmids, e)
             return None
+
+    async def search_batch(self, search_requests: List[SearchRequest]) -> BatchSearchResult:
+        """
+        Executa várias estratégias: os esearch rodam em paralelo (dentro do limite
+        de requisições do NCBI) e cada PMID da união é buscado uma única vez.
+        """
+        hits = [
+            pmids async for pmids in ordered_map(self.search_pmids_articles, search_requests, self.max_concurrency)
+        ]
+        unique = list(dict.fromkeys(pmid for pmids in hits for pmid in pmids))
+        return batch_result(hits, await self._fetch_articles_details_xml(unique) if unique else [])
+
+    async def count_articles(self, search_request: SearchRequest) -> int:
+        """Total de artigos da estratégia, sem transferir PMIDs nem artigos"""
+        cached = await self._search_cache_io(self._cached_count, search_request)
+        if cached is not None:
+            return cached
+        response = await self._get("esearch.fcgi", self._build_count_params(search_request))
+        count = int(response.json()["esearchresult"]["count"])
+        await self._search_cache_io(self._cache_count, search_request, count)
+        return count
+
+    async def count_queries(self, search_requests: Dict[str, SearchRequest]) -> Dict[str, int]:
+        """Totais de várias consultas (ex.: a estratégia e cada um dos seus blocos), em paralelo"""
+        counts = [
+            count async for count in ordered_map(self.count_articles, search_requests.values(), self.max_concurrency)
+        ]
+        return dict(zip(search_requests, counts))
+
+    async def search_history(self, search_request: SearchRequest) -> SearchHistory:
+        """Executa o esearch guardando o resultado no History server (WebEnv/query_key)"""
+        response = await self._get("esearch.fcgi", self._build_history_search_params(search_request))
+        return self._parse_history(response.json())
+
+    async def search_page(self, search_request: SearchRequest) -> Tuple[SearchHistory, List[str]]:
+        """Primeira página da busca (até max_results PMIDs) e a referência no History server para as seguintes"""
+        response = await self._get("esearch.fcgi", self._build_page_search_params(search_request))
+        search_results = response.json()
+        return self._parse_history(search_results), search_results["esearchresult"]["idlist"]
+
+    async def fetch_history_page(self, history: SearchHistory, retstart: int, retmax: int) -> List[Dict]:
+        """Artigos de uma página do resultado no History server, sem repetir o esearch"""
+        return await self._collect_efetch(self._build_history_fetch_params(history, retstart, retmax))
+
+    async def iter_bulk_articles(
+        self,
+        search_request: SearchRequest,
+        chunk_size: Optional[int] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Modo bulk: pagina o efetch pelo History server em lotes de `chunk_size`,
+        buscando os lotes em paralelo e gerando os artigos na ordem do esearch.
+        """
+        history = await self.search_history(search_request)
+        total = min(history.count, search_request.max_results)
+        params = [
+            self._build_history_fetch_params(history, retstart, retmax)
+            for retstart, retmax in chunk_ranges(total, chunk_size or self.batch_size)
+        ]
+        async for batch in ordered_map(self._collect_efetch, params, self.max_concurrency):
+            for article in batch:
+                yield article
+
+
+# Cliente compartilhado pelo processo: um único pool de conexões para todas as sessões
+_async_client: Optional[AsyncPubMedClient] = None
+
+
+def get_async_pubmed_client() -> AsyncPubMedClient:
+    """Retorna o cliente assíncrono compartilhado do PubMed"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncPubMedClient(
+            article_cache=get_article_cache(),
+            search_cache=get_search_cache(),
+            corpus=get_local_corpus()
+        )
+    return _async_client
+
+
+async def close_async_pubmed_client():
+    """Fecha o pool de conexões do cliente compartilhado"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
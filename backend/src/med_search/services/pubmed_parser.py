@@ -0,0 +1,175 @@
+import io
+import xml.etree.ElementTree as ET
+from typing import AsyncIterable, Dict, Iterable, Iterator, List, Optional, Union
+
+# Tamanho dos blocos lidos da resposta HTTP / arquivo
+CHUNK_SIZE = 64 * 1024
+
+# Caminhos diretos a partir de <PubmedArticle>, sem buscas por descendentes (.//)
+PMID_PATH = "MedlineCitation/PMID"
+ARTICLE_PATH = "MedlineCitation/Article"
+TITLE_PATH = "ArticleTitle"
+ABSTRACT_PATH = "Abstract/AbstractText"
+AUTHOR_PATH = "AuthorList/Author"
+PUB_DATE_PATH = "Journal/JournalIssue/PubDate"
+JOURNAL_TITLE_PATH = "Journal/Title"
+PUBLICATION_TYPE_PATH = "PublicationTypeList/PublicationType"
+KEYWORD_PATH = "MedlineCitation/KeywordList/Keyword"
+ARTICLE_ID_PATH = "PubmedData/ArticleIdList/ArticleId"
+
+
+def parse_article_element(article_element: ET.Element) -> Dict:
+    """Extrai os dados de um elemento <PubmedArticle> em um dicionário"""
+    article_data = {}
+
+    # Extrair PMID
+    pmid_element = article_element.find(PMID_PATH)
+    if pmid_element is not None and pmid_element.text:
+        article_data["pmid"] = pmid_element.text
+
+    article = article_element.find(ARTICLE_PATH)
+    if article is None:
+        article = ET.Element("Article")
+
+    # Extrair o título
+    title_element = article.find(TITLE_PATH)
+    if title_element is not None and title_element.text:
+        article_data["title"] = title_element.text
+
+    # Extrair o abstract
+    abstract_texts = article.findall(ABSTRACT_PATH)
+    if abstract_texts:
+        # Versão simples (texto completo)
+        article_data["simple_abstract"] = " ".join([text.text for text in abstract_texts if text.text])
+
+        # Versão estruturada (por categoria): usar Label se disponível, senão NlmCategory
+        structured_abstract = {}
+        for text in abstract_texts:
+            if text.text:
+                section_title = text.get("Label") or text.get("NlmCategory", "")
+                if section_title:
+                    structured_abstract[section_title] = text.text
+
+        if structured_abstract:
+            article_data["abstract"] = structured_abstract
+
+    # Extrair autores
+    authors = []
+    for author in article.iterfind(AUTHOR_PATH):
+        last_name = author.findtext("LastName")
+        if last_name:
+            fore_name = author.findtext("ForeName")
+            authors.append(f"{fore_name} {last_name}" if fore_name else last_name)
+
+    if authors:
+        article_data["authors"] = authors
+
+    # Extrair DOI (apenas do próprio artigo, ignorando a lista de referências)
+    for article_id in article_element.iterfind(ARTICLE_ID_PATH):
+        if article_id.get("IdType") == "doi" and article_id.text:
+            article_data["doi"] = article_id.text
+            break
+
+    # Extrair data de publicação
+    pub_date = article.find(PUB_DATE_PATH)
+    if pub_date is not None:
+        date_parts = [
+            part for part in (pub_date.findtext("Year"), pub_date.findtext("Month"), pub_date.findtext("Day"))
+            if part
+        ]
+        if date_parts:
+            article_data["publication_date"] = "/".join(date_parts)
+
+    # Extrair nome do journal
+    journal_title = article.findtext(JOURNAL_TITLE_PATH)
+    if journal_title:
+        article_data["journal"] = journal_title
+
+    # Extrair keywords
+    keyword_elements = article_element.findall(KEYWORD_PATH)
+    if keyword_elements:
+        article_data["keywords"] = [kw.text for kw in keyword_elements if kw.text]
+
+    # Extrair tipos de publicação
+    article_data["article_type"] = [pt.text for pt in article.iterfind(PUBLICATION_TYPE_PATH) if pt.text]
+
+    # Adicionar URL do artigo
+    if "pmid" in article_data:
+        article_data["url"] = f"https://pubmed.ncbi.nlm.nih.gov/{article_data['pmid']}/"
+
+    return article_data
+
+
+class ArticleStreamParser:
+    """
+    Parser incremental do XML do efetch.
+
+    Recebe a resposta em blocos via `feed` e devolve cada artigo assim que o
+    seu <PubmedArticle> é fechado, descartando os elementos já processados para
+    manter a memória constante independentemente do tamanho do lote.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: Optional[ET.Element] = None
+
+    def feed(self, data: bytes) -> Iterator[Dict]:
+        """Alimenta o parser com um bloco de bytes e retorna os artigos concluídos"""
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self) -> Iterator[Dict]:
+        """Finaliza o documento e retorna os artigos restantes"""
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> Iterator[Dict]:
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                continue
+            if element.tag == "PubmedArticle":
+                yield parse_article_element(element)
+                element.clear()
+                if self._root is not None and self._root is not element:
+                    self._root.remove(element)
+
+
+def iter_articles_xml(source: Union[bytes, str, Iterable[bytes], io.IOBase]) -> Iterator[Dict]:
+    """
+    Gera os artigos de um XML do efetch à medida que são lidos.
+
+    `source` pode ser o conteúdo completo, um caminho, um arquivo aberto em modo
+    binário ou qualquer iterável de blocos de bytes (ex.: `response.iter_content()`).
+    """
+    if isinstance(source, bytes):
+        chunks: Iterable[bytes] = (source,)
+    elif isinstance(source, str):
+        with open(source, "rb") as file:
+            yield from iter_articles_xml(file)
+        return
+    elif hasattr(source, "read"):
+        chunks = iter(lambda: source.read(CHUNK_SIZE), b"")
+    else:
+        chunks = source
+
+    parser = ArticleStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_articles_xml(chunks: AsyncIterable[bytes]):
+    """Versão assíncrona de `iter_articles_xml` para streams do httpx"""
+    parser = ArticleStreamParser()
+    async for chunk in chunks:
+        for article in parser.feed(chunk):
+            yield article
+    for article in parser.close():
+        yield article
+
+
+def parse_articles_xml(content: bytes) -> List[Dict]:
+    """Converte a resposta XML completa do efetch em uma lista de dicionários de artigos"""
+    return list(iter_articles_xml(content))
@@ -0,0 +1,203 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
+
+# Operadores booleanos do PubMed (avaliados da esquerda para a direita, sem precedência)
+OPERATORS = ("AND", "OR", "NOT")
+
+TOKEN_PATTERN = re.compile(
+    r'''
+    (?P<lparen>\()
+    | (?P<rparen>\))
+    | (?P<phrase>"[^"]*"(?:\s*\[[^\]]+\])?)
+    | (?P<word>[^\s()"]+(?:\s*\[[^\]]+\])?)
+    ''',
+    re.VERBOSE
+)
+FIELD_TAG_PATTERN = re.compile(r"\[([^\]]+)\]\s*$")
+
+# Intervalo de datas na sintaxe do PubMed: "2020/01/01"[Date - Publication] : "2025/12/31"[Date - Publication]
+DATE_RANGE_PATTERN = re.compile(
+    r'"?(\d{4}(?:/\d{1,2}(?:/\d{1,2})?)?)"?\s*(\[[^\]]+\])?\s*:\s*"?(\d{4}(?:/\d{1,2}(?:/\d{1,2})?)?)"?\s*(\[[^\]]+\])'
+)
+
+
+class QuerySyntaxError(ValueError):
+    """A estratégia de busca não é uma expressão booleana válida"""
+
+
+@dataclass
+class Term:
+    """Termo de busca com a etiqueta de campo opcional (ex.: "Aged"[Mesh])"""
+    text: str
+    tag: Optional[str] = None
+    quoted: bool = False
+
+    def render(self, canonical: bool = False) -> str:
+        text = self.text.lower() if canonical else self.text
+        # Com etiqueta de campo as aspas não mudam o resultado: "Aged"[Mesh] == Aged[Mesh]
+        quoted = self.quoted or (canonical and self.tag is not None)
+        rendered = f'"{text}"' if quoted else text
+        if self.tag:
+            tag = self.tag.lower() if canonical else self.tag
+            rendered += f"[{tag}]"
+        return rendered
+
+
+@dataclass
+class Group:
+    """Expressão booleana n-ária; `op` é None para um grupo entre parênteses com um único item"""
+    op: Optional[str]
+    children: List[Union["Group", Term]] = field(default_factory=list)
+
+    def render(self, canonical: bool = False) -> str:
+        parts = []
+        for child in self.children:
+            text = child.render(canonical)
+            if isinstance(child, Group) and len(child.children) > 1:
+                text = f"({text})"
+            parts.append(text)
+        return f" {self.op} ".join(parts) if self.op else "".join(parts)
+
+
+Node = Union[Group, Term]
+
+
+def _make_term(raw: str) -> Term:
+    raw = raw.strip()
+    tag = None
+    match = FIELD_TAG_PATTERN.search(raw)
+    if match:
+        tag = match.group(1).strip()
+        raw = raw[:match.start()].strip()
+    if raw.startswith('"') and raw.endswith('"') and len(raw) >= 2:
+        return Term(" ".join(raw[1:-1].split()), tag, quoted=True)
+    return Term(" ".join(raw.split()), tag)
+
+
+def normalize_date_ranges(query: str) -> str:
+    """Reescreve intervalos de datas como um único termo: 2020/01/01:2025/12/31[Date - Publication]"""
+    return DATE_RANGE_PATTERN.sub(lambda m: f"{m.group(1)}:{m.group(3)}{m.group(4)}", query)
+
+
+def tokenize(query: str) -> List[str]:
+    """Divide a estratégia em parênteses, operadores e termos (frases sem aspas ficam juntas)"""
+    query = normalize_date_ranges(query)
+    tokens: List[str] = []
+    words: List[str] = []
+
+    def flush():
+        if words:
+            tokens.append(" ".join(words))
+            words.clear()
+
+    position = 0
+    for match in TOKEN_PATTERN.finditer(query):
+        if query[position:match.start()].strip():
+            raise QuerySyntaxError(f"Caractere inesperado na posição {position}")
+        position = match.end()
+        kind, value = match.lastgroup, match.group()
+        if kind in ("lparen", "rparen"):
+            flush()
+            tokens.append(value)
+        elif kind == "word" and value.upper() in OPERATORS:
+            flush()
+            tokens.append(value.upper())
+        elif kind == "phrase":
+            flush()
+            tokens.append(value)
+        else:
+            # Palavras consecutivas sem operador formam um único termo (ex.: parkinson disease)
+            if words and (FIELD_TAG_PATTERN.search(words[-1]) or words[-1].startswith('"')):
+                flush()
+            words.append(value)
+    if query[position:].strip():
+        raise QuerySyntaxError(f"Caractere inesperado na posição {position}")
+    flush()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def next(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise QuerySyntaxError("Fim inesperado da estratégia")
+        self.position += 1
+        return token
+
+    def operand(self) -> Node:
+        token = self.next()
+        if token == "(":
+            node = self.expression()
+            if self.next() != ")":
+                raise QuerySyntaxError("Parêntese não fechado")
+            return node if isinstance(node, Group) and node.op else Group(None, [node])
+        if token == ")" or token in OPERATORS:
+            raise QuerySyntaxError(f"Token inesperado: {token}")
+        return _make_term(token)
+
+    def expression(self) -> Node:
+        node = self.operand()
+        while self.peek() is not None and self.peek() != ")":
+            # Termos adjacentes sem operador são combinados com AND, como no PubMed
+            op = self.next() if self.peek() in OPERATORS else "AND"
+            right = self.operand()
+            # Avaliação da esquerda para a direita: (a OR b) AND c
+            if isinstance(node, Group) and node.op == op and op != "NOT":
+                node.children.append(right)
+            else:
+                node = Group(op, [node, right])
+        return node
+
+
+def parse_query(query: str) -> Node:
+    """Converte uma estratégia de busca do PubMed em uma árvore booleana"""
+    tokens = tokenize(query)
+    if not tokens:
+        raise QuerySyntaxError("Estratégia vazia")
+    parser = _Parser(tokens)
+    node = parser.expression()
+    if parser.peek() is not None:
+        raise QuerySyntaxError(f"Token inesperado: {parser.peek()}")
+    return node
+
+
+def _canonical(node: Node) -> Node:
+    if isinstance(node, Term):
+        return node
+    children = [_canonical(child) for child in node.children]
+    # Desfaz parênteses redundantes: ((a)) -> a
+    if node.op is None and len(children) == 1:
+        return children[0]
+    flat: List[Node] = []
+    for child in children:
+        # (a AND b) AND c -> a AND b AND c
+        if isinstance(child, Group) and child.op == node.op and node.op in ("AND", "OR"):
+            flat.extend(child.children)
+        else:
+            flat.append(child)
+    if node.op in ("AND", "OR"):
+        # AND/OR são comutativos: a ordem dos blocos não altera o resultado
+        flat.sort(key=lambda child: child.render(canonical=True))
+    return Group(node.op, flat)
+
+
+def canonicalize_query(query: str) -> str:
+    """
+    Forma canônica de uma estratégia: espaços e quebras de linha normalizados,
+    operadores em maiúsculas, termos em minúsculas, parênteses redundantes
+    removidos e blocos de AND/OR em ordem estável.
+    """
+    try:
+        return _canonical(parse_query(query)).render(canonical=True)
+    except QuerySyntaxError:
+        # Estratégia malformada: normaliza apenas espaços e operadores
+        normalized = " ".join(query.split())
+        return re.sub(r"\b(and|or|not)\b", lambda m: m.group().upper(), normalized, flags=re.IGNORECASE)
@@ -0,0 +1,256 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import httpx
+import requests
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from .telemetry import EUTILS_REQUESTS
+
+# Limites de requisições por segundo do NCBI (sem e com PUBMED_API_KEY)
+NCBI_RATE_WITHOUT_KEY = 3.0
+NCBI_RATE_WITH_KEY = 10.0
+
+# Status HTTP que indicam falha temporária e podem ser repetidos
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+# Falhas de rede que também são repetidas (clientes requests e httpx)
+RETRY_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    httpx.TransportError,
+    ConnectionError,
+    TimeoutError
+)
+
+DEFAULT_MAX_RETRIES = int(os.getenv("PUBMED_MAX_RETRIES", "4"))
+DEFAULT_BACKOFF_BASE = float(os.getenv("PUBMED_BACKOFF_BASE", "0.5"))
+DEFAULT_BACKOFF_MAX = float(os.getenv("PUBMED_BACKOFF_MAX", "10"))
+DEFAULT_DEADLINE = float(os.getenv("PUBMED_REQUEST_DEADLINE", "60"))
+
+
+class DeadlineExceeded(Exception):
+    """A requisição não pôde ser concluída dentro do prazo configurado"""
+
+
+class TokenBucket:
+    """
+    Token bucket compartilhado entre threads e event loops.
+
+    A reserva de um token é feita sob lock e devolve o tempo de espera; a espera
+    em si acontece fora do lock (time.sleep ou asyncio.sleep), então o mesmo
+    bucket serve tanto o cliente síncrono quanto o assíncrono.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Reserva um token e retorna quantos segundos esperar, ou None se exceder `max_wait`"""
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def penalize(self, delay: float):
+        """Esvazia o bucket por `delay` segundos (ex.: após um 429 com Retry-After)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -delay * self.rate)
+
+    def acquire(self, max_wait: Optional[float] = None) -> bool:
+        wait = self.reserve(max_wait)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, max_wait: Optional[float] = None) -> bool:
+        wait = self.reserve(max_wait)
+        if wait is None:
+            return False
+        if wait:
+            await asyncio.sleep(wait)
+        return True
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """
+    Agenda as chamadas à E-utilities: limita a taxa com um token bucket e repete
+    respostas 429/5xx e falhas de conexão com backoff exponencial e jitter,
+    respeitando o Retry-After e um prazo total por requisição.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+        deadline: float = DEFAULT_DEADLINE,
+        retry_exceptions: Tuple[Type[BaseException], ...] = RETRY_EXCEPTIONS
+    ):
+        self.bucket = TokenBucket(rate, capacity)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.retry_exceptions = retry_exceptions
+        self._counters = {"requests": 0, "throttled": 0, "retried": 0, "failed": 0, "deadline_exceeded": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+        EUTILS_REQUESTS.inc(outcome=name)
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de requisições, 429 recebidos, repetições e falhas"""
+        with self._lock:
+            return dict(self._counters)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _retry_delay(self, attempt: int, response=None) -> Optional[float]:
+        """Decide se a tentativa deve ser repetida e retorna a espera antes dela"""
+        retry_after = None
+        if response is not None:
+            if response.status_code not in RETRY_STATUS:
+                return None
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code == 429:
+                self._count("throttled")
+                # Segura as demais requisições para não agravar o throttling
+                self.bucket.penalize(retry_after or self.backoff_base)
+        if attempt >= self.max_retries:
+            return None
+        return self._backoff(attempt, retry_after)
+
+    def _remaining(self, started: float, deadline: Optional[float]) -> Optional[float]:
+        deadline = self.deadline if deadline is None else deadline
+        if not deadline:
+            return None
+        return deadline - (time.monotonic() - started)
+
+    def _deadline_exceeded(self, deadline: Optional[float]) -> DeadlineExceeded:
+        self._count("deadline_exceeded")
+        deadline = self.deadline if deadline is None else deadline
+        return DeadlineExceeded(f"Prazo de {deadline}s excedido para a requisição ao NCBI")
+
+    def execute(self, send: Callable, close: Optional[Callable] = None, deadline: Optional[float] = None):
+        """Executa `send()` de forma síncrona passando pelo limitador e pelas repetições"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            if not self.bucket.acquire(self._remaining(started, deadline)):
+                raise self._deadline_exceeded(deadline)
+            self._count("requests")
+            try:
+                response = send()
+            except self.retry_exceptions:
+                delay = self._retry_delay(attempt)
+                if delay is None:
+                    self._count("failed")
+                    raise
+            else:
+                delay = self._retry_delay(attempt, response)
+                if delay is None:
+                    if response.status_code >= 400:
+                        self._count("failed")
+                    return response
+                if close:
+                    close(response)
+
+            remaining = self._remaining(started, deadline)
+            if remaining is not None and delay > remaining:
+                raise self._deadline_exceeded(deadline)
+            self._count("retried")
+            time.sleep(delay)
+            attempt += 1
+
+    async def aexecute(
+        self,
+        send: Callable[[], Awaitable],
+        close: Optional[Callable[..., Awaitable]] = None,
+        deadline: Optional[float] = None
+    ):
+        """Versão assíncrona de `execute`"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            if not await self.bucket.acquire_async(self._remaining(started, deadline)):
+                raise self._deadline_exceeded(deadline)
+            self._count("requests")
+            try:
+                response = await send()
+            except self.retry_exceptions:
+                delay = self._retry_delay(attempt)
+                if delay is None:
+                    self._count("failed")
+                    raise
+            else:
+                delay = self._retry_delay(attempt, response)
+                if delay is None:
+                    if response.status_code >= 400:
+                        self._count("failed")
+                    return response
+                if close:
+                    await close(response)
+
+            remaining = self._remaining(started, deadline)
+            if remaining is not None and delay > remaining:
+                raise self._deadline_exceeded(deadline)
+            self._count("retried")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+# Um scheduler por orçamento do NCBI, compartilhado por todos os clientes do processo
+_schedulers: Dict[bool, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(has_api_key: bool) -> RequestScheduler:
+    """Retorna o scheduler global com a taxa adequada à presença de API key"""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(has_api_key)
+        if scheduler is None:
+            default_rate = NCBI_RATE_WITH_KEY if has_api_key else NCBI_RATE_WITHOUT_KEY
+            rate = float(os.getenv("PUBMED_RATE_LIMIT", default_rate))
+            scheduler = RequestScheduler(rate=rate)
+            _schedulers[has_api_key] = scheduler
+        return scheduler
@@ -0,0 +1,273 @@
+import os
+import re
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import MemoryLRU
+from .query import Group, Node, QuerySyntaxError, Term, parse_query
+from .strategy import DATE_TAGS, PUBLICATION_TYPE_TAGS
+
+# Parâmetros clássicos do BM25
+DEFAULT_K1 = float(os.getenv("SEARCH_INDEX_K1", "1.2"))
+DEFAULT_B = float(os.getenv("SEARCH_INDEX_B", "0.75"))
+
+# O título pesa mais que o resumo (equivale a repetir os seus termos)
+DEFAULT_TITLE_WEIGHT = int(os.getenv("SEARCH_INDEX_TITLE_WEIGHT", "2"))
+
+# Limites dos índices por sessão e do índice global opcional (SEARCH_INDEX_GLOBAL=on)
+DEFAULT_MAX_DOCUMENTS = int(os.getenv("SEARCH_INDEX_MAX_DOCUMENTS", "200000"))
+DEFAULT_SESSION_INDEXES = int(os.getenv("SEARCH_INDEX_SESSIONS", "256"))
+DEFAULT_SESSION_TTL = float(os.getenv("SEARCH_INDEX_SESSION_TTL", str(3600)))
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+FIELD_TAG_PATTERN = re.compile(r"\[[^\]]*\]")
+OPERATOR_PATTERN = re.compile(r"\b(?:AND|OR|NOT)\b")
+
+STOPWORDS = frozenset("""
+    a an and are as at be by for from has have in into is it its of on or that the their these this to
+    was were which with we our after before between during than vs versus not no
+""".split())
+
+
+def tokenize_text(text: str) -> List[str]:
+    """Termos indexáveis: minúsculas, sem pontuação e sem palavras vazias"""
+    return [
+        word for word in WORD_PATTERN.findall(text.casefold())
+        if word not in STOPWORDS and (len(word) > 1 or word.isdigit())
+    ]
+
+
+def article_tokens(article: Dict, title_weight: int = DEFAULT_TITLE_WEIGHT) -> List[str]:
+    """Termos de um artigo do efetch: título (com peso), resumo completo e keywords"""
+    tokens = tokenize_text(article.get("title") or "") * title_weight
+    abstract = article.get("simple_abstract")
+    if not abstract and isinstance(article.get("abstract"), dict):
+        abstract = " ".join(article["abstract"].values())
+    tokens += tokenize_text(abstract or "")
+    tokens += tokenize_text(" ".join(article.get("keywords") or []))
+    return tokens
+
+
+def query_terms(query: str) -> List[str]:
+    """
+    Termos de uma pergunta livre ou de uma estratégia do PubMed. Operadores e
+    etiquetas de campo são ignorados, assim como filtros de data e tipo de
+    publicação e o lado negado de um NOT.
+    """
+    try:
+        node = parse_query(query)
+    except QuerySyntaxError:
+        return list(dict.fromkeys(tokenize_text(OPERATOR_PATTERN.sub(" ", FIELD_TAG_PATTERN.sub(" ", query)))))
+
+    terms: List[str] = []
+
+    def visit(node: Node):
+        if isinstance(node, Group):
+            children = node.children[:1] if node.op == "NOT" else node.children
+            for child in children:
+                visit(child)
+        elif (node.tag or "").lower() not in DATE_TAGS | PUBLICATION_TYPE_TAGS:
+            terms.extend(tokenize_text(node.text))
+
+    visit(node)
+    return list(dict.fromkeys(terms))
+
+
+class BM25Index:
+    """
+    Índice invertido em memória com ranqueamento BM25 sobre os artigos já
+    buscados. A inserção é incremental e a pontuação é vetorizada: cada termo
+    da consulta soma a sua contribuição em todos os documentos de uma vez.
+    """
+
+    def __init__(
+        self,
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+        title_weight: int = DEFAULT_TITLE_WEIGHT,
+        max_documents: int = DEFAULT_MAX_DOCUMENTS
+    ):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.max_documents = max_documents
+        self._pmids: List[str] = []
+        self._titles: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lengths: List[int] = []
+        self._total_length = 0
+        # termo -> (documentos, frequências), em ordem de inserção
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        # Cópias em numpy das listas acima, refeitas só quando o termo recebe documentos novos
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._length_array: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pmids)
+
+    def __contains__(self, pmid: str) -> bool:
+        return pmid in self._positions
+
+    def add(self, article: Dict) -> bool:
+        """Indexa um artigo; retorna False se ele já estava no índice ou se o índice está cheio"""
+        pmid = article.get("pmid")
+        if not pmid or pmid in self._positions or len(self._pmids) >= self.max_documents:
+            return False
+        tokens = article_tokens(article, self.title_weight)
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        with self._lock:
+            if pmid in self._positions:
+                return False
+            position = len(self._pmids)
+            self._pmids.append(pmid)
+            self._titles.append(article.get("title") or "")
+            self._positions[pmid] = position
+            self._lengths.append(len(tokens))
+            self._total_length += len(tokens)
+            self._length_array = None
+            for token, frequency in frequencies.items():
+                docs, tfs = self._postings.setdefault(token, ([], []))
+                docs.append(position)
+                tfs.append(frequency)
+        return True
+
+    def add_many(self, articles: Iterable[Dict]) -> int:
+        """Indexa vários artigos e retorna quantos eram novos"""
+        return sum(self.add(article) for article in articles)
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        postings = self._postings.get(term)
+        if postings is None:
+            return None
+        arrays = self._arrays.get(term)
+        if arrays is None or len(arrays[0]) != len(postings[0]):
+            arrays = (np.array(postings[0], dtype=np.int64), np.array(postings[1], dtype=np.float64))
+            self._arrays[term] = arrays
+        return arrays
+
+    def score_terms(self, terms: List[str]) -> np.ndarray:
+        """Pontuação BM25 de todos os documentos para os termos dados"""
+        with self._lock:
+            total = len(self._pmids)
+            scores = np.zeros(total, dtype=np.float64)
+            if not total or not terms:
+                return scores
+            if self._length_array is None or len(self._length_array) != total:
+                self._length_array = np.array(self._lengths, dtype=np.float64)
+            average_length = self._total_length / total or 1.0
+            # Fator de normalização pelo tamanho do documento, comum a todos os termos
+            norm = self.k1 * (1 - self.b + self.b * self._length_array / average_length)
+            for term in terms:
+                arrays = self._term_arrays(term)
+                if arrays is None:
+                    continue
+                docs, tfs = arrays
+                idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+            return scores
+
+    def search(self, query: str, limit: int = 10, pmids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Responde uma consulta localmente. Retorna pares (PMID, pontuação) dos
+        documentos com pontuação positiva, opcionalmente restritos a `pmids`.
+        """
+        if limit <= 0:
+            return []
+        scores = self.score_terms(query_terms(query))
+        if pmids is not None:
+            candidates = np.array([self._positions[p] for p in pmids if p in self._positions], dtype=np.int64)
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[scores[candidates] > 0]
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        ranked = sorted(candidates.tolist(), key=lambda position: (-scores[position], position))
+        return [(self._pmids[position], float(scores[position])) for position in ranked]
+
+    def title(self, pmid: str) -> str:
+        return self._titles[self._positions[pmid]]
+
+    def score_articles(self, query: str, articles: List[Dict]) -> List[Dict]:
+        """
+        Indexa um conjunto de resultados do PubMed e preenche `relevance_score`
+        com a pontuação BM25 da consulta, mantendo a ordem recebida.
+        """
+        self.add_many(articles)
+        scores = self.score_terms(query_terms(query))
+        scored = []
+        for article in articles:
+            position = self._positions.get(article.get("pmid"))
+            score = float(scores[position]) if position is not None else 0.0
+            scored.append({**article, "relevance_score": round(score, 4)})
+        return scored
+
+    def rerank(self, query: str, articles: List[Dict]) -> List[Dict]:
+        """
+        Reordena um conjunto de resultados do PubMed pela pontuação BM25 da
+        consulta, preenchendo `relevance_score`. Empates mantêm a ordem original.
+        """
+        return sorted(self.score_articles(query, articles), key=lambda article: -article["relevance_score"])
+
+
+_session_indexes = MemoryLRU(DEFAULT_SESSION_INDEXES)
+_global_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+
+def rerank_enabled() -> bool:
+    """Reordenar os resultados do PubMed pelo BM25 é opcional (SEARCH_RERANK=on); por padrão vale a ordem pedida"""
+    return os.getenv("SEARCH_RERANK", "off").lower() in ("on", "1", "true")
+
+
+def global_index_enabled() -> bool:
+    return os.getenv("SEARCH_INDEX_GLOBAL", "off").lower() in ("on", "1", "true")
+
+
+def get_global_index() -> Optional[BM25Index]:
+    """Índice compartilhado entre sessões, ou None se estiver desligado"""
+    global _global_index
+    if not global_index_enabled():
+        return None
+    with _index_lock:
+        if _global_index is None:
+            _global_index = BM25Index()
+        return _global_index
+
+
+def get_search_index(session_id: Optional[str] = None) -> BM25Index:
+    """
+    Índice da sessão (expira após SEARCH_INDEX_SESSION_TTL sem uso). Sem
+    sessão, usa o índice global ou um índice descartável.
+    """
+    if session_id is None:
+        return get_global_index() or BM25Index()
+    with _index_lock:
+        index = _session_indexes.get(session_id)
+        if index is None:
+            index = BM25Index()
+        # Renova a expiração a cada acesso
+        _session_indexes.set(session_id, index, DEFAULT_SESSION_TTL)
+        return index
+
+
+def drop_search_index(session_id: str):
+    """Descarta o índice de uma sessão expirada ou removida"""
+    with _index_lock:
+        _session_indexes.delete(session_id)
+
+
+def index_articles(articles: List[Dict], session_id: Optional[str] = None) -> BM25Index:
+    """Indexa os artigos na sessão e no índice global (se ligado); retorna o índice da sessão"""
+    index = get_search_index(session_id)
+    index.add_many(articles)
+    global_index = get_global_index()
+    if global_index is not None and global_index is not index:
+        global_index.add_many(articles)
+    return index
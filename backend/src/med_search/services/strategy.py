@@ -0,0 +1,154 @@
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from ..models.schemas import SearchRequest, SearchStrategy, SortType
+from .query import Group, Node, QuerySyntaxError, Term, parse_query
+
+# Etiquetas de campo reconhecidas pelo compilador
+MESH_TAGS = {"mesh", "mh", "mesh terms", "majr", "mesh:noexp", "mh:noexp", "majr:noexp"}
+PUBLICATION_TYPE_TAGS = {"publication type", "pt"}
+DATE_TAGS = {"dp", "pdat", "date - publication", "publication date"}
+
+# Termos sem aspas com muitas palavras indicam texto corrido, não estratégia
+MAX_WORDS_PER_TERM = 5
+
+CODE_FENCE_PATTERN = re.compile(r"```[a-zA-Z]*\n?(.*?)```", re.S)
+LABEL_PATTERN = re.compile(r'^[^()"\n]*?:\s*(?=[("])')
+YEAR_PATTERN = re.compile(r"(\d{4})")
+
+
+class StrategyParseError(ValueError):
+    """O texto recebido não contém uma estratégia de busca reconhecível"""
+
+
+def _terms(node: Node) -> List[Term]:
+    if isinstance(node, Term):
+        return [node]
+    return [term for child in node.children for term in _terms(child)]
+
+
+def _tag(term: Term) -> Optional[str]:
+    return term.tag.lower() if term.tag else None
+
+
+def _looks_like_strategy(node: Node) -> bool:
+    """Confere se a árvore tem cara de estratégia booleana e não de texto corrido"""
+    if not isinstance(node, Group) or node.op is None:
+        return False
+    terms = _terms(node)
+    if len(terms) < 2:
+        return False
+    for term in terms:
+        if not term.quoted and len(term.text.split()) > MAX_WORDS_PER_TERM:
+            return False
+        if ":" in term.text and _tag(term) not in DATE_TAGS and not (_tag(term) or "").endswith("noexp"):
+            return False
+    return True
+
+
+def _candidates(text: str) -> List[str]:
+    """Trechos do texto que podem conter a estratégia (blocos de código, parágrafos, linhas)"""
+    sources = CODE_FENCE_PATTERN.findall(text) or [text]
+    candidates = []
+    for source in sources:
+        source = source.replace("**", "").replace("`", "")
+        candidates.append(source)
+        candidates.extend(paragraph for paragraph in re.split(r"\n\s*\n", source))
+        candidates.extend(source.splitlines())
+    return [LABEL_PATTERN.sub("", c.strip(), count=1) for c in candidates if c.strip()]
+
+
+def extract_strategy(text: str) -> Tuple[str, Node]:
+    """Localiza a estratégia booleana no texto e devolve o trecho e a árvore correspondente"""
+    best: Optional[Tuple[str, Node]] = None
+    for candidate in _candidates(text):
+        try:
+            node = parse_query(candidate)
+        except QuerySyntaxError:
+            continue
+        if not _looks_like_strategy(node):
+            continue
+        if best is None or len(_terms(node)) > len(_terms(best[1])):
+            best = (" ".join(candidate.split()), node)
+    if best is None:
+        raise StrategyParseError("Nenhuma estratégia booleana encontrada no texto")
+    return best
+
+
+def _date_limits(terms: List[Term]) -> Tuple[Optional[int], Optional[int]]:
+    years = [int(year) for term in terms if _tag(term) in DATE_TAGS for year in YEAR_PATTERN.findall(term.text)]
+    if not years:
+        return None, None
+    return min(years), max(years)
+
+
+def compile_strategy(text: str) -> SearchStrategy:
+    """
+    Compila localmente uma estratégia booleana do PubMed: separa os blocos
+    combinados com AND, extrai termos [Mesh], tipos de publicação e limites de data.
+    """
+    final_search_strategy, node = extract_strategy(text)
+
+    blocks = node.children if node.op == "AND" else [node]
+    grouped: Dict[str, List[Node]] = {}
+    for index, block in enumerate(blocks, start=1):
+        block_terms = _terms(block)
+        tags = {_tag(term) for term in block_terms}
+        if tags and tags <= PUBLICATION_TYPE_TAGS:
+            label = "study_design"
+        elif tags and tags <= DATE_TAGS:
+            label = "time"
+        else:
+            label = f"block_{index}"
+        grouped.setdefault(label, []).append(block)
+    # Blocos com o mesmo rótulo são combinados com AND entre parênteses: o PubMed
+    # avalia os operadores da esquerda para a direita, sem precedência
+    search_blocks = {
+        label: nodes[0].render() if len(nodes) == 1 else Group("AND", nodes).render()
+        for label, nodes in grouped.items()
+    }
+
+    terms = _terms(node)
+    start_year, end_year = _date_limits(terms)
+    return SearchStrategy(
+        search_blocks=search_blocks,
+        final_search_strategy=final_search_strategy,
+        mesh_terms=list(dict.fromkeys(t.text for t in terms if _tag(t) in MESH_TAGS)),
+        publication_types=list(dict.fromkeys(t.text for t in terms if _tag(t) in PUBLICATION_TYPE_TAGS)),
+        start_year=start_year,
+        end_year=end_year
+    )
+
+
+def build_search_request(
+    strategy: SearchStrategy,
+    max_results: int = 10,
+    sort_by: SortType = SortType.RELEVANCE,
+    default_start_year: Optional[int] = None,
+    default_end_year: Optional[int] = None
+) -> SearchRequest:
+    """Monta a requisição do esearch a partir da estratégia estruturada"""
+    request = SearchRequest(
+        query=strategy.final_search_strategy,
+        max_results=max_results,
+        sort_by=sort_by
+    )
+    start_year = strategy.start_year or default_start_year
+    end_year = strategy.end_year or default_end_year
+    if start_year and end_year:
+        request.date_range = (date(int(start_year), 1, 1), date(int(end_year), 12, 31))
+    return request
+
+
+def block_search_requests(strategy: SearchStrategy, search_request: SearchRequest) -> Dict[str, SearchRequest]:
+    """
+    Consultas de contagem da estratégia: a completa (chave
+    `final_search_strategy`) e cada bloco de `search_blocks`, com o mesmo
+    período, para localizar o bloco que zera ou amplia demais o resultado.
+    """
+    requests = {"final_search_strategy": search_request}
+    for name, block in (strategy.search_blocks or {}).items():
+        if block:
+            requests[name] = search_request.model_copy(update={"query": block})
+    return requests
@@ -0,0 +1,411 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Spans também são enviados ao OpenTelemetry (se o pacote estiver instalado) com TELEMETRY_OTEL=on
+OTEL_ENABLED = os.getenv("TELEMETRY_OTEL", "off").lower() in ("on", "1", "true")
+
+# Limites dos histogramas: segundos, bytes do payload e artigos por resposta
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(9))
+COUNT_BUCKETS = (0.0, 1.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0, 1000.0, 5000.0, 10000.0)
+
+Labels = Tuple[str, ...]
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Contador monotônico com rótulos, no formato de exposição do Prometheus"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Labels:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}" for key, value in values]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Histograma de buckets cumulativos (`_bucket`, `_sum` e `_count`) com rótulos"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por rótulos: [contagem por bucket (+Inf no fim), soma]
+        self._series: Dict[Labels, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = format_labels(self.labelnames, key, f'le="{format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+# Coletor: função chamada a cada exposição que devolve (nome, tipo, descrição, [(rótulos, valor)])
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]
+
+
+class MetricsRegistry:
+    """
+    Métricas do processo. Contadores e histogramas são atualizados no caminho
+    das requisições; coletores leem estados já mantidos por outros componentes
+    (caches, scheduler, gateway) só no momento da exposição.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            samples = metric.render()
+            if samples:
+                lines += [f"# HELP {metric.name} {metric.documentation}", f"# TYPE {metric.name} {metric.kind}", *samples]
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.warning("Falha no coletor de métricas %r: %r", collector, e)
+                continue
+            for name, kind, documentation, samples in families:
+                if not samples:
+                    continue
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(list(labels), list(labels.values()))} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Zera as séries (usado nos testes)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "med_search_stage_duration_seconds",
+    "Duração de cada etapa (ferramentas, E-utilities, parse do XML, LLM)",
+    ("stage", "status")
+)
+PAYLOAD_BYTES = REGISTRY.histogram(
+    "med_search_payload_bytes",
+    "Bytes recebidos por etapa",
+    ("stage",),
+    BYTES_BUCKETS
+)
+ARTICLE_COUNT = REGISTRY.histogram(
+    "med_search_articles",
+    "Artigos processados por etapa",
+    ("stage",),
+    COUNT_BUCKETS
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "med_search_cache_lookups_total",
+    "Consultas aos caches por resultado (hit ou miss)",
+    ("cache", "result")
+)
+EUTILS_REQUESTS = REGISTRY.counter(
+    "med_search_eutils_requests_total",
+    "Tentativas de requisição à E-utilities por desfecho (requests, throttled, retried, failed, deadline_exceeded)",
+    ("outcome",)
+)
+LLM_TOKENS = REGISTRY.counter(
+    "med_search_llm_tokens_total",
+    "Tokens consumidos nas chamadas ao LLM",
+    ("model", "kind")
+)
+
+# Campos de uso de tokens somados por requisição
+USAGE_FIELDS = ("input_tokens", "output_tokens", "total_tokens")
+
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0):
+    """Acertos e falhas de uma consulta a um cache (aceita bool para consultas unitárias)"""
+    if hits:
+        CACHE_LOOKUPS.inc(int(hits), cache=cache, result="hit")
+    if misses:
+        CACHE_LOOKUPS.inc(int(misses), cache=cache, result="miss")
+
+
+class RequestTimings:
+    """Tempo, número de chamadas e tokens acumulados por etapa em uma requisição"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.usage: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+
+    def add_usage(self, usage: Dict[str, Any]):
+        with self._lock:
+            for field in USAGE_FIELDS:
+                if usage.get(field):
+                    self.usage[field] = self.usage.get(field, 0) + int(usage[field])
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Tempo total e por etapa, em segundos (etapas paralelas se sobrepõem no total)"""
+        with self._lock:
+            stages = {
+                stage: {"seconds": round(entry["seconds"], 4), "calls": entry["calls"]}
+                for stage, entry in self.stages.items()
+            }
+        return {"total_seconds": round(self.elapsed, 4), "stages": stages}
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[RequestTimings]:
+    """
+    Acumula as etapas executadas dentro do bloco, inclusive em tarefas
+    criadas nele (o contexto é copiado para as tarefas do asyncio).
+    """
+    timings = RequestTimings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        try:
+            _timings.reset(token)
+        except ValueError:
+            # Bloco dentro de um gerador consumido por outra tarefa (ex.: stream SSE)
+            _timings.set(None)
+
+
+def observe_stage(stage: str, seconds: float, status: str = "ok"):
+    STAGE_SECONDS.observe(seconds, stage=stage, status=status)
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def record_usage(model: str, usage: Optional[Dict[str, Any]]):
+    """Tokens de uma resposta do LLM (`usage_metadata` do LangChain)"""
+    if not usage:
+        return
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc(usage[kind], model=model, kind=kind.split("_")[0])
+    timings = _timings.get()
+    if timings is not None:
+        timings.add_usage(usage)
+
+
+_tracer = None
+
+
+def get_tracer():
+    """Tracer do OpenTelemetry, ou None quando desligado ou não instalado"""
+    global _tracer
+    if not OTEL_ENABLED:
+        return None
+    if _tracer is None:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            return None
+        _tracer = trace.get_tracer("med_search")
+    return _tracer
+
+
+class Span:
+    """Etapa em execução: guarda atributos e os bytes e artigos processados"""
+
+    __slots__ = ("name", "attributes", "bytes", "articles", "_otel")
+
+    def __init__(self, name: str, attributes: Dict[str, Any], otel=None):
+        self.name = name
+        self.attributes = attributes
+        self.bytes: Optional[int] = None
+        self.articles: Optional[int] = None
+        self._otel = otel
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(key, value)
+
+    def add_bytes(self, amount: int):
+        self.bytes = (self.bytes or 0) + amount
+
+    def add_articles(self, amount: int = 1):
+        self.articles = (self.articles or 0) + amount
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Mede uma etapa: registra a duração no histograma (com o status ok, error
+    ou cancelled), os bytes e artigos informados e o tempo na requisição
+    corrente. Com o OpenTelemetry ligado, também abre um span com os atributos.
+    """
+    tracer = get_tracer()
+    # O span não é ativado no contexto: etapas dentro de geradores podem terminar em outra tarefa
+    otel = tracer.start_span(name, attributes=attributes) if tracer is not None else None
+    current = Span(name, attributes, otel)
+    status = "ok"
+    started = time.perf_counter()
+    try:
+        yield current
+    except (asyncio.CancelledError, GeneratorExit):
+        status = "cancelled"
+        raise
+    except Exception as e:
+        status = "error"
+        if otel is not None:
+            otel.record_exception(e)
+        raise
+    finally:
+        observe_stage(name, time.perf_counter() - started, status)
+        if current.bytes is not None:
+            PAYLOAD_BYTES.observe(current.bytes, stage=name)
+        if current.articles is not None:
+            ARTICLE_COUNT.observe(current.articles, stage=name)
+        if otel is not None:
+            otel.set_attribute("status", status)
+            if current.bytes is not None:
+                otel.set_attribute("bytes", current.bytes)
+            if current.articles is not None:
+                otel.set_attribute("articles", current.articles)
+            otel.end()
+
+
+def metered(chunks: Iterable[bytes], current: Span) -> Iterator[bytes]:
+    """Repassa os blocos de um stream somando os bytes no span"""
+    for chunk in chunks:
+        current.add_bytes(len(chunk))
+        yield chunk
+
+
+async def ametered(chunks: AsyncIterable[bytes], current: Span) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        current.add_bytes(len(chunk))
+        yield chunk
@@ -0,0 +1,104 @@
+"""Geradores de respostas sintéticas da E-utilities usadas pelos testes offline"""
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import httpx
+
+TESTS_DIR = Path(__file__).parent
+
+ARTICLE_TEMPLATE = """<PubmedArticle>
+  <MedlineCitation Status="MEDLINE" Owner="NLM">
+    <PMID Version="1">{pmid}</PMID>
+    <Article PubModel="Print">
+      <Journal>
+        <JournalIssue CitedMedium="Internet"><PubDate><Year>{year}</Year><Month>Jan</Month></PubDate></JournalIssue>
+        <Title>Journal of Synthetic Neurology</Title>
+      </Journal>
+      <ArticleTitle>Synthetic article {pmid} on deep brain stimulation and levodopa.</ArticleTitle>
+      <Abstract>
+        <AbstractText Label="BACKGROUND" NlmCategory="BACKGROUND">Background of article {pmid} about parkinson disease.</AbstractText>
+        <AbstractText Label="RESULTS" NlmCategory="RESULTS">Dyskinesia and quality of life outcomes for article {pmid}.</AbstractText>
+      </Abstract>
+      <AuthorList CompleteYN="Y">
+        <Author ValidYN="Y"><LastName>Author{pmid}</LastName><ForeName>First</ForeName></Author>
+        <Author ValidYN="Y"><LastName>Coauthor</LastName><ForeName>Second</ForeName></Author>
+      </AuthorList>
+      <PublicationTypeList><PublicationType UI="D016428">Journal Article</PublicationType></PublicationTypeList>
+    </Article>
+    <KeywordList Owner="NOTNLM"><Keyword MajorTopicYN="N">parkinson</Keyword></KeywordList>
+  </MedlineCitation>
+  <PubmedData>
+    <ArticleIdList>
+      <ArticleId IdType="pubmed">{pmid}</ArticleId>
+      <ArticleId IdType="doi">10.5555/synthetic.{pmid}</ArticleId>
+    </ArticleIdList>
+  </PubmedData>
+</PubmedArticle>
+"""
+
+
+def make_pmids(count: int, start: int = 30000000) -> list:
+    return [str(start + i) for i in range(count)]
+
+
+def make_efetch_xml(pmids: Iterable[str]) -> bytes:
+    articles = "".join(
+        ARTICLE_TEMPLATE.format(pmid=pmid, year=2015 + int(pmid) % 10) for pmid in pmids
+    )
+    return f'<?xml version="1.0" ?>\n<PubmedArticleSet>\n{articles}</PubmedArticleSet>\n'.encode()
+
+
+def make_esearch_json(pmids: list, count: int = None, webenv: str = None, query_key: str = "1") -> dict:
+    result = {"count": str(len(pmids) if count is None else count), "idlist": pmids}
+    if webenv:
+        result.update({"webenv": webenv, "querykey": query_key})
+    return {"esearchresult": result}
+
+
+def make_eutils_handler(
+    results: Union[List[str], Callable[[str], List[str]]],
+    calls: Optional[list] = None,
+    webenv: str = "MCID_test"
+) -> Callable[[httpx.Request], httpx.Response]:
+    """
+    Simula esearch (retstart/retmax, History server, rettype=count) e efetch
+    (por id ou por WebEnv). `results` é a lista de PMIDs de qualquer busca ou
+    uma função que recebe o termo e retorna os PMIDs.
+    """
+    histories: Dict[str, List[str]] = {}
+
+    def pmids_for(term: str) -> List[str]:
+        return results(term) if callable(results) else results
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if calls is not None:
+            calls.append(request)
+        params = request.url.params
+        retstart, retmax = int(params.get("retstart", 0)), int(params.get("retmax", 20))
+        if request.url.path.endswith("/esearch.fcgi"):
+            pmids = pmids_for(params["term"])
+            if params.get("rettype") == "count":
+                return httpx.Response(200, json={"esearchresult": {"count": str(len(pmids))}})
+            history = None
+            if params.get("usehistory") == "y":
+                history = f"{webenv}_{len(histories)}"
+                histories[history] = pmids
+            return httpx.Response(200, json=make_esearch_json(
+                pmids[retstart:retstart + retmax], count=len(pmids), webenv=history
+            ))
+        if request.url.path.endswith("/efetch.fcgi"):
+            if "id" in params:
+                pmids = params["id"].split(",")
+            else:
+                pmids = histories.get(params.get("WebEnv"), [])[retstart:retstart + retmax]
+            return httpx.Response(200, content=make_efetch_xml(pmids))
+        return httpx.Response(404)
+
+    return handler
+
+
+def strategy_from(script: str) -> str:
+    """Estratégia de busca usada pelos scripts de teste manuais (tests/test_pubmed*.py)"""
+    source = (TESTS_DIR / script).read_text(encoding="utf-8")
+    return re.search(r'final_search_strategy="""(.*?)"""', source, re.S).group(1)
@@ -0,0 +1,115 @@
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.prebuilt import create_react_agent
+
+from api.services import agent_service
+from api.services.agent_service import AgentService
+from med_search.agent.langgraph.checkpoint import sqlite_checkpointer_supported
+from med_search.services import search_index
+
+
+class RecordingChatModel(BaseChatModel):
+    """Modelo falso que registra quantas mensagens recebeu em cada turno"""
+    received: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.received.append(len(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"resposta {len(self.received)}"))])
+
+
+@pytest.fixture(params=["memory", pytest.param("sqlite", marks=pytest.mark.skipif(
+    not sqlite_checkpointer_supported(),
+    reason="aiosqlite>=0.22 é incompatível com o AsyncSqliteSaver 2.0 (pyproject.toml fixa aiosqlite<0.22)"
+))])
+def service(request, tmp_path, monkeypatch):
+    model = RecordingChatModel(received=[])
+    monkeypatch.setattr(agent_service, "build_graph", lambda checkpointer: create_react_agent(
+        model=model, tools=[], checkpointer=checkpointer
+    ))
+    service = AgentService()
+    service.settings.checkpointer_backend = request.param
+    service.settings.checkpointer_path = str(tmp_path / "checkpoints.sqlite3")
+    service.model = model
+    yield service
+    service.sessions.close()
+
+
+def test_history_is_restored_by_the_checkpointer(service):
+    async def run():
+        first = await service.process_message("primeira pergunta")
+        second = await service.process_message("segunda pergunta", first["session_id"])
+        history = await service.get_history(first["session_id"])
+        await service.close()
+        return first, second, history
+
+    first, second, history = asyncio.run(run())
+    assert second["session_id"] == first["session_id"]
+    assert second["message"] == "resposta 2"
+    # O segundo turno recebe o histórico completo, mas só a nova mensagem foi enviada
+    assert service.model.received == [1, 3]
+    assert [m["role"] for m in history] == ["user", "assistant", "user", "assistant"]
+
+
+def test_evicted_sessions_lose_their_history(service):
+    async def run():
+        first = await service.process_message("pergunta")
+        service.sessions.delete(first["session_id"])
+        assert await service.get_history(first["session_id"]) is None
+        await service.process_message("outra pergunta", first["session_id"])
+        history = await service.get_history(first["session_id"])
+        await service.close()
+        return history
+
+    assert [m["content"] for m in asyncio.run(run())] == ["outra pergunta", "resposta 2"]
+
+
+def test_evicted_sessions_drop_their_search_index():
+    service = AgentService()
+    search_index.index_articles([{"pmid": "1", "title": "Levodopa"}], "evicted-session")
+    service._on_sessions_evicted(["evicted-session"])
+    service.sessions.close()
+
+    assert search_index._session_indexes.get("evicted-session") is None
+
+
+def test_stream_message_emits_typed_token_events(tmp_path, monkeypatch):
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="olá mundo")]))
+    monkeypatch.setattr(agent_service, "build_graph", lambda checkpointer: create_react_agent(
+        model=model, tools=[], checkpointer=checkpointer
+    ))
+    service = AgentService()
+
+    async def run():
+        events = [event async for event in service.stream_message("pergunta")]
+        history = await service.get_history(events[-1]["session_id"])
+        await service.close()
+        return events, history
+
+    events, history = asyncio.run(run())
+    tokens = [event["content"] for event in events if event["type"] == "token"]
+    assert len(tokens) > 1 and "".join(tokens) == "olá mundo"
+    assert events[-1]["type"] == "done" and events[-1]["message"] == "olá mundo"
+    assert [m["content"] for m in history] == ["pergunta", "olá mundo"]
+
+
+def test_tool_articles_accepts_tool_messages_and_lists():
+    from langchain_core.messages import ToolMessage
+
+    articles = [{"pmid": "1", "title": "A"}]
+    message = ToolMessage(content='[{"pmid": "1", "title": "A"}]', tool_call_id="c")
+    assert agent_service.tool_articles(message) == articles
+    assert agent_service.tool_articles(articles) == articles
+    assert agent_service.tool_articles("Nenhum artigo") == []
@@ -0,0 +1,41 @@
+import asyncio
+
+from benchmarks.eutils_server import EutilsServer, RecordedArticles
+from benchmarks.run import BenchmarkResult, compare, percentile, run_benchmarks
+from med_search.services.pubmed_parser import parse_articles_xml
+
+
+def test_recorded_articles_are_replayed_with_new_pmids():
+    articles = RecordedArticles()
+    pmids = articles.pmids(7)
+    parsed = parse_articles_xml(articles.efetch(pmids))
+    assert [article["pmid"] for article in parsed] == pmids
+    # Os artigos gravados se repetem: títulos iguais a cada len(templates) posições
+    period = len(articles.templates)
+    assert parsed[0]["title"] == parsed[period]["title"]
+
+
+def test_benchmarks_run_against_the_local_server_with_throttling():
+    articles = RecordedArticles()
+    with EutilsServer(articles=articles, throttle_every=4) as server:
+        results = asyncio.run(run_benchmarks(server.url, articles, sizes=[10, 250], repeat=2))
+        counters = dict(server.counters)
+
+    assert [result.key for result in results] == [
+        "search[10]", "fetch[10]", "parse[10]", "search[250]", "fetch[250]", "parse[250]"
+    ]
+    assert all(result.p50 > 0 and result.peak_memory > 0 for result in results)
+    # Os 429 foram repetidos pelo scheduler e nenhum cenário ficou incompleto
+    assert counters["throttled"] > 0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    def result(p50: float, peak_memory: int) -> BenchmarkResult:
+        return BenchmarkResult("fetch", 100, 5, p50, p50, p50, 100 / p50, peak_memory)
+
+    baseline = {"fetch[100]": {"p50": 0.1, "peak_memory": 1000}}
+    assert compare([result(0.12, 1100)], baseline, tolerance=0.25) == []
+    regressions = compare([result(0.2, 1100)], baseline, tolerance=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("fetch[100] p50")
+    assert percentile([1, 2, 3, 4, 100], 0.5) == 3
+    assert percentile([1, 2, 3, 4, 100], 0.99) == 100
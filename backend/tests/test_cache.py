@@ -0,0 +1,94 @@
+import os
+import time
+
+from med_search.models.schemas import SearchRequest, SortType
+from med_search.services.cache import DEFAULT_CACHE_DIR, ArticleCache, MemoryLRU, SearchCache, SQLiteStore
+
+
+def test_sqlite_store_expires_entries(tmp_path):
+    store = SQLiteStore(str(tmp_path / "kv.sqlite3"), table="kv", max_entries=10)
+    store.set("fresh", {"v": 1}, ttl=60)
+    store.set("stale", {"v": 2}, ttl=-1)
+
+    assert store.get_many(["fresh", "stale", "absent"]) == {"fresh": {"v": 1}}
+    assert store.stats.as_dict()["misses"] == 2
+
+
+def test_sqlite_store_evicts_least_recently_used(tmp_path):
+    store = SQLiteStore(str(tmp_path / "kv.sqlite3"), table="kv", max_entries=3)
+    for key in ("a", "b", "c"):
+        store.set(key, key, ttl=60)
+        time.sleep(0.01)
+    store.get("a")
+    store.set("d", "d", ttl=60)
+
+    assert len(store) == 3
+    assert store.get("b") is None
+    assert store.get_many(["a", "c", "d"]) == {"a": "a", "c": "c", "d": "d"}
+    assert store.stats.evictions == 1
+
+
+def test_article_cache_persists_between_instances(tmp_path):
+    path = str(tmp_path / "articles.sqlite3")
+    ArticleCache(path=path).put_many([{"pmid": "1", "title": "Título"}, {"title": "sem pmid"}])
+
+    cached, missing = ArticleCache(path=path).split(["1", "2", "1"])
+    assert cached == {"1": {"pmid": "1", "title": "Título"}}
+    assert missing == ["2"]
+
+
+def test_memory_lru_bounds_and_ttl():
+    lru = MemoryLRU(max_entries=2)
+    lru.set("a", 1, ttl=60)
+    lru.set("b", 2, ttl=60)
+    lru.get("a")
+    lru.set("c", 3, ttl=60)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.stats.evictions == 1
+
+    lru.set("d", 4, ttl=-1)
+    assert lru.get("d") is None
+
+
+def test_search_cache_uses_canonical_strategy(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "searches.sqlite3"))
+    original = SearchRequest(query="""
+        ("Aged"[Mesh] OR elderly) AND
+        (Parkinson Disease[Mesh] OR parkinson)
+    """, max_results=5)
+    tweaked = SearchRequest(query='(parkinson or "parkinson disease"[MeSH]) and (elderly or aged[mesh])', max_results=5)
+
+    cache.set(original, ["1", "2"])
+
+    assert cache.get(tweaked) == ["1", "2"]
+    assert cache.get(tweaked.model_copy(update={"max_results": 10})) is None
+    assert cache.get(tweaked.model_copy(update={"sort_by": SortType.DATE})) is None
+
+    # A camada em disco sobrevive a uma nova instância
+    assert SearchCache(path=str(tmp_path / "searches.sqlite3")).get(tweaked) == ["1", "2"]
+
+
+def test_search_cache_date_sort_expires_sooner():
+    cache = SearchCache(ttl=60, date_ttl=-1)
+    by_date = SearchRequest(query="levodopa", sort_by="date")
+    cache.set(by_date, ["1"])
+    cache.set(SearchRequest(query="levodopa"), ["2"])
+
+    assert cache.get(by_date) is None
+    assert cache.get(SearchRequest(query="LEVODOPA")) == ["2"]
+
+
+def test_count_cache_ignores_page_size_and_sort():
+    cache = SearchCache(date_ttl=-1)
+    page = SearchRequest(query="levodopa AND dbs", max_results=10)
+    cache.set_count(page, 42)
+
+    assert cache.get_count(SearchRequest(query="dbs and LEVODOPA", max_results=500, sort_by="date")) == 42
+    # Totais e listas de PMIDs não se misturam
+    assert cache.get(page) is None
+
+
+def test_default_cache_dir_does_not_depend_on_the_working_directory():
+    assert os.path.isabs(DEFAULT_CACHE_DIR)
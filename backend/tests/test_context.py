@@ -0,0 +1,62 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from med_search.agent.langgraph.context import ContextManager, estimate_tokens, extract_article_refs
+
+
+def search_turn(n, articles=10):
+    payload = json.dumps([
+        {"pmid": str(1000 * n + i), "title": f"Artigo {i} da busca {n}", "simple_abstract": "texto " * 200}
+        for i in range(articles)
+    ])
+    call = {"name": "pubmed_research", "args": {"query": f"busca {n}"}, "id": f"call-{n}"}
+    return [
+        HumanMessage(content=f"pergunta {n}", id=f"h{n}"),
+        AIMessage(content="", tool_calls=[call], id=f"a{n}"),
+        ToolMessage(content=payload, tool_call_id=f"call-{n}", name="pubmed_research", id=f"t{n}"),
+        AIMessage(content=f"resposta {n}", id=f"r{n}"),
+    ]
+
+
+def test_history_within_budget_is_untouched():
+    messages = search_turn(1)
+    assert ContextManager(max_tokens=100_000).compact(messages) == messages
+
+
+def test_article_refs_keep_pmids_and_titles():
+    text = json.dumps([{"pmid": "1", "title": "A"}, {"title": "B", "pmid": "2"}, {"pmid": "1", "title": "A"}])
+    assert [pmid for pmid, _ in extract_article_refs(text)] == ["1", "2"]
+    assert extract_article_refs(text)[0] == ("1", "A")
+
+
+def test_old_tool_payloads_are_compacted_and_recent_turns_kept():
+    messages = search_turn(1) + search_turn(2)
+    manager = ContextManager(max_tokens=estimate_tokens(messages[6]) + 500, recent_turns=1)
+    compacted = manager.compact(messages)
+
+    assert compacted[4:] == messages[4:]
+    old_tool = compacted[2]
+    assert isinstance(old_tool, ToolMessage) and old_tool.tool_call_id == "call-1"
+    assert "PMID 1000: Artigo 0 da busca 1" in old_tool.content
+    assert "texto" not in old_tool.content
+    assert manager.count_messages(compacted) <= manager.max_tokens
+
+
+def test_oldest_turns_become_a_summary_and_tokens_stay_flat():
+    manager = ContextManager(max_tokens=3000, recent_turns=1)
+    history, sizes = [], []
+    for n in range(1, 30):
+        history += search_turn(n)
+        compacted = manager.compact(history)
+        sizes.append(manager.count_messages(compacted))
+        assert isinstance(compacted[-1], AIMessage) and compacted[-1].content == f"resposta {n}"
+
+    assert max(sizes[5:]) <= 3000 + 500
+    summary = compacted[0]
+    assert isinstance(summary, SystemMessage)
+    assert "pergunta 27" in summary.content and "27000" in summary.content
+    assert "pergunta 1\n" not in summary.content
+    # Nenhum resultado de ferramenta fica sem a chamada correspondente
+    call_ids = {call["id"] for m in compacted if isinstance(m, AIMessage) for call in m.tool_calls}
+    assert all(m.tool_call_id in call_ids for m in compacted if isinstance(m, ToolMessage))
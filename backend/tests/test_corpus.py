@@ -0,0 +1,140 @@
+import asyncio
+import gzip
+from datetime import date
+
+import httpx
+
+from med_search.models.schemas import SearchRequest
+from med_search.services.cache import SearchCache
+from med_search.services.corpus import LocalCorpus, to_fts_query
+from med_search.services.pubmed import AsyncPubMedClient
+from med_search.services.query import parse_query
+from med_search.services.rate_limit import RequestScheduler
+from tests.eutils_fixtures import make_efetch_xml, make_pmids
+
+
+def write_baseline(path, pmids, extra: str = "") -> str:
+    xml = make_efetch_xml(pmids).decode().replace("</PubmedArticleSet>", f"{extra}</PubmedArticleSet>")
+    with gzip.open(path, "wb") as f:
+        f.write(xml.encode())
+    return str(path)
+
+
+def test_ingests_files_in_parallel_and_only_once(tmp_path):
+    files = [
+        write_baseline(tmp_path / "pubmed25n0001.xml.gz", make_pmids(20)),
+        write_baseline(tmp_path / "pubmed25n0002.xml.gz", make_pmids(20, start=30000020)),
+        write_baseline(tmp_path / "pubmed25n0003.xml.gz", make_pmids(5, start=30000040)),
+    ]
+    corpus = LocalCorpus(str(tmp_path / "corpus.sqlite3"))
+
+    stats = corpus.ingest(files, workers=2)
+    again = corpus.ingest(files, workers=2)
+
+    assert (stats.files, stats.articles) == (3, 45)
+    assert (again.files, again.skipped) == (0, 3)
+    assert len(corpus) == 45
+    article = corpus.get_many(["30000001"])["30000001"]
+    assert article["title"] == "Synthetic article 30000001 on deep brain stimulation and levodopa."
+    assert article["abstract"]["RESULTS"].startswith("Dyskinesia")
+
+
+def test_daily_update_replaces_and_deletes_articles(tmp_path):
+    corpus = LocalCorpus(str(tmp_path / "corpus.sqlite3"))
+    corpus.ingest([write_baseline(tmp_path / "pubmed25n0001.xml.gz", make_pmids(3))], workers=1)
+
+    revised = make_efetch_xml(["30000000"]).decode().replace("deep brain stimulation", "focused ultrasound")
+    revised = revised.split("<PubmedArticleSet>")[1].split("</PubmedArticleSet>")[0]
+    delete = "<DeleteCitation><PMID Version=\"1\">30000002</PMID></DeleteCitation>"
+    update = write_baseline(tmp_path / "pubmed25n1300.xml.gz", [], extra=revised + delete)
+    stats = corpus.ingest([update], workers=1)
+
+    assert (stats.articles, stats.deleted) == (1, 1)
+    assert set(corpus.get_many(make_pmids(3))) == {"30000000", "30000001"}
+    request = SearchRequest(query='"focused ultrasound"[tiab]', max_results=10)
+    assert corpus.search(request) == ["30000000"]
+    # Os termos da versão antiga saem do índice
+    old_terms = SearchRequest(query='"deep brain stimulation"[ti]', max_results=10)
+    assert corpus.search(old_terms) == ["30000001"]
+
+
+def test_translates_only_simple_queries():
+    assert to_fts_query(parse_query("levodopa[tiab] OR carbidopa NOT dyskinesia[ti]")) == (
+        '(({title abstract} : "levodopa" OR {title abstract keywords} : "carbidopa") NOT {title} : "dyskinesia")'
+    )
+    assert to_fts_query(parse_query("parkins*[tiab]")) == '{title abstract} : "parkins" *'
+    assert to_fts_query(parse_query('"Parkinson Disease"[Mesh] AND levodopa')) is None
+
+
+def test_client_resolves_pmids_and_simple_queries_locally(tmp_path):
+    corpus = LocalCorpus(str(tmp_path / "corpus.sqlite3"))
+    corpus.ingest([write_baseline(tmp_path / "pubmed25n0001.xml.gz", make_pmids(10))], workers=1)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(500)
+
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(handler),
+        scheduler=RequestScheduler(rate=1000, max_retries=0),
+        corpus=corpus,
+        local_search=True
+    )
+    # Ano de publicação dos artigos sintéticos: 2015 + PMID % 10
+    request = SearchRequest(
+        query='"deep brain stimulation"[tiab] AND parkinson',
+        max_results=20,
+        date_range=(date(2018, 1, 1), date(2019, 12, 31))
+    )
+
+    async def run():
+        by_pmid = await client.fetch_articles(make_pmids(2))
+        searched = await client.search_articles(request)
+        await client.aclose()
+        return by_pmid, searched
+
+    by_pmid, searched = asyncio.run(run())
+
+    assert [article["pmid"] for article in by_pmid] == make_pmids(2)
+    assert sorted(article["pmid"] for article in searched) == ["30000003", "30000004"]
+    assert calls == []
+
+
+def test_local_search_falls_back_to_eutils_without_hits_or_coverage(tmp_path):
+    corpus = LocalCorpus(str(tmp_path / "corpus.sqlite3"))
+    corpus.ingest([write_baseline(tmp_path / "pubmed25n1300.xml.gz", make_pmids(10))], workers=1)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"esearchresult": {"count": "1", "idlist": ["40000000"]}})
+
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(handler),
+        scheduler=RequestScheduler(rate=1000, max_retries=0),
+        search_cache=SearchCache(),
+        corpus=corpus,
+        local_search=True
+    )
+    no_hits = SearchRequest(query="thalamotomy[tiab]", max_results=20)
+    # Artigos sintéticos vão de 2015 a 2024: 2010 está fora do acervo
+    outside = SearchRequest(
+        query="parkinson", max_results=20, date_range=(date(2010, 1, 1), date(2020, 12, 31))
+    )
+    covered = SearchRequest(query="parkinson", max_results=20)
+
+    async def run():
+        results = [await client.search_pmids_articles(r) for r in (no_hits, outside, covered)]
+        await client.aclose()
+        return results
+
+    no_hits_pmids, outside_pmids, covered_pmids = asyncio.run(run())
+
+    assert no_hits_pmids == outside_pmids == ["40000000"]
+    assert len(calls) == 2
+    assert len(covered_pmids) == 10
+    # Só as respostas do esearch entram no cache de buscas
+    assert client.search_cache.get(covered) is None
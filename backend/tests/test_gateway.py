@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from med_search.agent.langgraph import gateway as gateway_module
+from med_search.agent.langgraph.gateway import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    LLMGateway,
+    PriorityLimiter,
+    StreamInterruptedError,
+    llm_priority
+)
+
+
+class FakeModel:
+    """Modelo falso com latência configurável que registra a concorrência"""
+
+    def __init__(self, name: str, delay: float = 0.0, error: Exception = None, tokens: int = 0):
+        self.model = name
+        self.delay = delay
+        self.error = error
+        self.tokens = tokens
+        self.active = 0
+        self.peak = 0
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            # Tokens enviados ao stream antes da resposta completa, como no astream_events
+            for handler in (config or {}).get("callbacks") or []:
+                for _ in range(self.tokens):
+                    handler.on_llm_new_token("tok")
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            return f"{self.model}: {input}"
+        finally:
+            self.active -= 1
+
+
+def use_models(monkeypatch, *models: FakeModel):
+    by_name = {model.model: model for model in models}
+    monkeypatch.setattr(gateway_module, "get_chat_model", lambda temperature, model: by_name[model])
+
+
+def test_limiter_serves_interactive_requests_before_batch():
+    limiter = PriorityLimiter(1)
+    order = []
+
+    async def request(name: str, priority: int):
+        await limiter.acquire(priority)
+        order.append(name)
+        await asyncio.sleep(0)
+        limiter.release()
+
+    async def run():
+        await limiter.acquire()
+        waiting = [
+            asyncio.create_task(request("batch-1", PRIORITY_BATCH)),
+            asyncio.create_task(request("batch-2", PRIORITY_BATCH)),
+            asyncio.create_task(request("chat", PRIORITY_INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert limiter.waiting == 3
+        limiter.release()
+        await asyncio.gather(*waiting)
+
+    asyncio.run(run())
+
+    assert order == ["chat", "batch-1", "batch-2"]
+    assert limiter.active == 0
+
+
+def test_concurrent_calls_are_capped_per_model(monkeypatch):
+    model = FakeModel("primary", delay=0.02)
+    use_models(monkeypatch, model)
+    gateway = LLMGateway(default_model="primary", fallback_models=[], model_limits={"primary": 2})
+
+    async def run():
+        with llm_priority(PRIORITY_BATCH):
+            return await asyncio.gather(*(gateway.chat_model().ainvoke(f"p{i}") for i in range(6)))
+
+    responses = asyncio.run(run())
+
+    assert responses == [f"primary: p{i}" for i in range(6)]
+    assert model.peak == 2
+    assert gateway.stats()["primary"]["calls"] == 6
+
+
+def test_timeouts_and_errors_fall_back_to_the_next_model(monkeypatch):
+    slow = FakeModel("primary", delay=1)
+    broken = FakeModel("secondary", error=RuntimeError("429 resource exhausted"))
+    fallback = FakeModel("tertiary")
+    use_models(monkeypatch, slow, broken, fallback)
+    gateway = LLMGateway(default_model="primary", fallback_models=["secondary", "tertiary"], timeout=0.05)
+
+    response = asyncio.run(gateway.ainvoke("pergunta"))
+    stats = gateway.stats()
+
+    assert response == "tertiary: pergunta"
+    assert stats["primary"]["timeouts"] == 1
+    assert stats["secondary"]["failures"] == 1
+    assert stats["tertiary"]["fallbacks"] == 1
+    # O tempo esgotado libera a vaga do modelo
+    assert stats["primary"]["active"] == 0
+
+
+def test_last_error_is_raised_when_every_model_fails(monkeypatch):
+    use_models(monkeypatch, FakeModel("primary", error=RuntimeError("indisponível")))
+    gateway = LLMGateway(default_model="primary", fallback_models=[])
+
+    with pytest.raises(RuntimeError, match="indisponível"):
+        asyncio.run(gateway.ainvoke("pergunta"))
+
+
+def test_no_fallback_after_tokens_were_streamed(monkeypatch):
+    streaming = FakeModel("primary", delay=1, tokens=3)
+    fallback = FakeModel("secondary")
+    use_models(monkeypatch, streaming, fallback)
+    gateway = LLMGateway(default_model="primary", fallback_models=["secondary"], timeout=0.05)
+
+    with pytest.raises(StreamInterruptedError):
+        asyncio.run(gateway.ainvoke("pergunta"))
+    # O segundo modelo não repete a resposta no mesmo stream
+    assert "secondary" not in gateway.stats()
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from med_search.agent.langgraph import graph as agent_graph
+from med_search.agent.langgraph.prefetch import StrategyPrefetcher
+from med_search.agent.langgraph.tools import pubmed_tools
+from med_search.models.schemas import SearchRequest
+from med_search.services.cache import ArticleCache, SearchCache
+from med_search.services.pubmed import AsyncPubMedClient
+from med_search.services.rate_limit import RequestScheduler
+from tests.eutils_fixtures import make_eutils_handler, make_pmids, strategy_from
+
+PROMPT = SystemMessage(content="teste")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Modelo falso que devolve as respostas do roteiro, uma por chamada"""
+    script: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.script.pop(0))])
+
+
+def tool_call(name: str, call_id: str, **args) -> dict:
+    return {"name": name, "args": args, "id": call_id, "type": "tool_call"}
+
+
+def test_tool_calls_of_one_response_run_concurrently():
+    @tool
+    async def search_web(query: str) -> str:
+        """Busca na web"""
+        await asyncio.sleep(0.2)
+        return "web"
+
+    @tool
+    async def search_pubmed(query: str) -> str:
+        """Busca no PubMed"""
+        await asyncio.sleep(0.2)
+        return "pubmed"
+
+    model = ScriptedChatModel(script=[
+        AIMessage(content="", tool_calls=[
+            tool_call("search_web", "1", query="dbs"),
+            tool_call("search_pubmed", "2", query="dbs")
+        ]),
+        AIMessage(content="pronto")
+    ])
+    graph = agent_graph.build_agent_graph(model, [search_web, search_pubmed], PROMPT)
+
+    started = time.perf_counter()
+    result = asyncio.run(graph.ainvoke({"messages": [HumanMessage(content="dbs")]}))
+    elapsed = time.perf_counter() - started
+
+    assert [m.content for m in result["messages"][2:]] == ["web", "pubmed", "pronto"]
+    assert elapsed < 0.35
+
+
+def test_strategy_is_prefetched_and_reused_by_the_confirmed_search(tmp_path, monkeypatch):
+    pmids = make_pmids(3)
+    calls = []
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(make_eutils_handler(pmids, calls)),
+        scheduler=RequestScheduler(rate=1000),
+        article_cache=ArticleCache(path=str(tmp_path / "articles.sqlite3")),
+        search_cache=SearchCache()
+    )
+    prefetcher = StrategyPrefetcher()
+    monkeypatch.setattr(pubmed_tools, "get_async_pubmed_client", lambda: client)
+    monkeypatch.setattr(pubmed_tools, "get_mesh_index", lambda: None)
+    monkeypatch.setattr(pubmed_tools, "get_prefetcher", lambda: prefetcher)
+    strategy = strategy_from("test_pubmed_xml.py")
+
+    @tool
+    def medical_query(query: str) -> str:
+        """Cria a estratégia"""
+        return f"Estratégia final:\n```\n{strategy}\n```"
+
+    model = ScriptedChatModel(script=[
+        AIMessage(content="", tool_calls=[tool_call("medical_query", "1", query="dbs")]),
+        AIMessage(content="Deseja que eu realize a busca?")
+    ])
+    graph = agent_graph.build_agent_graph(model, [medical_query], PROMPT)
+    config = {"configurable": {"thread_id": "prefetch-test"}}
+
+    async def run():
+        await graph.ainvoke({"messages": [HumanMessage(content="dbs")]}, config)
+        # A especulação começou com a estratégia, antes de qualquer confirmação
+        assert len(prefetcher) == 1 or calls
+        # A busca confirmada aguarda a especulação (ou usa o cache) em vez de repeti-la
+        articles = await pubmed_tools.pubmed_research.ainvoke({"query": strategy}, config)
+        await client.aclose()
+        return articles
+
+    articles = asyncio.run(run())
+
+    assert {article["pmid"] for article in articles} == set(pmids)
+    paths = [request.url.path.rsplit("/", 1)[-1] for request in calls]
+    assert paths == ["esearch.fcgi", "efetch.fcgi"]
+    assert len(prefetcher) == 0
+
+
+def test_new_strategy_or_different_search_cancels_the_prefetch():
+    async def slow_handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(10)
+        return httpx.Response(500)
+
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(slow_handler),
+        scheduler=RequestScheduler(rate=1000)
+    )
+    prefetcher = StrategyPrefetcher()
+    first = SearchRequest(query="levodopa", max_results=10)
+    second = SearchRequest(query="deep brain stimulation", max_results=10)
+
+    async def run():
+        task_1 = prefetcher.start("s", first, client)
+        task_2 = prefetcher.start("s", second, client)
+        # A mesma busca ainda em andamento não é reiniciada
+        assert prefetcher.start("s", second, client) is task_2
+        await asyncio.sleep(0)
+        assert task_1.cancelled() or task_1.cancelling()
+        started = time.perf_counter()
+        assert await prefetcher.claim("s", first) is False
+        assert time.perf_counter() - started < 1
+        await asyncio.gather(task_1, task_2, return_exceptions=True)
+        await client.aclose()
+        return task_2
+
+    task_2 = asyncio.run(run())
+
+    assert task_2.cancelled()
+    assert len(prefetcher) == 0
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+
+from med_search.agent.langgraph.llm_cache import LLMResponseCache, get_tool_llm_cache, llm_cache_key
+from med_search.services.cache import SQLiteStore
+
+
+class CountingModel:
+    def __init__(self, model="gemini-test", temperature=0.2, delay=0.0):
+        self.model = model
+        self.temperature = temperature
+        self.delay = delay
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        return AIMessage(content=f"resposta para {prompt}", usage_metadata={"input_tokens": 3, "output_tokens": 4, "total_tokens": 7})
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return AIMessage(content=f"resposta para {prompt}")
+
+
+def test_key_depends_on_model_and_temperature():
+    prompt = "estratégia para parkinson"
+    assert llm_cache_key(CountingModel(), prompt) == llm_cache_key(CountingModel(), prompt)
+    assert llm_cache_key(CountingModel(temperature=0.7), prompt) != llm_cache_key(CountingModel(), prompt)
+    assert llm_cache_key(CountingModel(model="other"), prompt) != llm_cache_key(CountingModel(), prompt)
+
+
+def test_cached_response_survives_restart(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    model = CountingModel()
+    first = LLMResponseCache(path=path).invoke(model, "pergunta")
+    second = LLMResponseCache(path=path).invoke(model, "pergunta")
+
+    assert model.calls == 1
+    assert second.content == first.content
+    assert second.usage_metadata == first.usage_metadata
+
+
+def test_async_path_reads_and_writes_disk_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    threads = []
+
+    class RecordingStore(SQLiteStore):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value, ttl):
+            threads.append(threading.get_ident())
+            super().set(key, value, ttl)
+
+    class RecordingCache(LLMResponseCache):
+        def __init__(self, path):
+            super().__init__()
+            self.store = RecordingStore(path, table="llm_responses", max_entries=100)
+
+    model = CountingModel()
+
+    async def run():
+        await RecordingCache(path=path).ainvoke(model, "pergunta")
+        cached = await RecordingCache(path=path).ainvoke(model, "pergunta")
+        return threading.get_ident(), cached
+
+    loop_thread, cached = asyncio.run(run())
+    assert model.calls == 1
+    assert cached.content == "resposta para pergunta"
+    # Leitura vazia e escrita do primeiro cache, leitura do segundo
+    assert len(threads) == 3
+    assert loop_thread not in threads
+
+
+def test_concurrent_async_prompts_share_one_call():
+    cache = LLMResponseCache()
+    model = CountingModel(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(cache.ainvoke(model, "mesma pergunta") for _ in range(5)))
+
+    responses = asyncio.run(run())
+    assert model.calls == 1
+    assert {r.content for r in responses} == {"resposta para mesma pergunta"}
+    assert cache.stats()["deduplicated"] == 4
+
+
+def test_followers_retry_when_the_leader_is_cancelled():
+    cache = LLMResponseCache()
+    model = CountingModel(delay=0.05)
+
+    async def run():
+        leader = asyncio.create_task(cache.ainvoke(model, "mesma pergunta"))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(cache.ainvoke(model, "mesma pergunta")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        # Um cliente desconecta no meio da chamada: só ele deve ser cancelado
+        leader.cancel()
+        responses = await asyncio.gather(*followers)
+        return leader, responses
+
+    leader, responses = asyncio.run(run())
+    assert leader.cancelled()
+    assert {r.content for r in responses} == {"resposta para mesma pergunta"}
+    # Um dos seguidores refez a chamada e os outros a compartilharam
+    assert model.calls == 2
+
+
+def test_concurrent_threads_share_one_call():
+    cache = LLMResponseCache()
+    model = CountingModel(delay=0.05)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.invoke(model, "p"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.calls == 1
+    assert len(results) == 4
+
+
+def test_cache_can_be_switched_per_tool(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_PUBMED_RESEARCH", raising=False)
+    monkeypatch.setenv("LLM_CACHE_DISK", "off")
+    assert get_tool_llm_cache("pubmed_research") is None
+    monkeypatch.setenv("LLM_CACHE_MEDICAL_QUERY", "off")
+    assert get_tool_llm_cache("medical_query") is None
+    monkeypatch.setenv("LLM_CACHE_PUBMED_RESEARCH", "on")
+    assert get_tool_llm_cache("pubmed_research") is not None
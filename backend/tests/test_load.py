@@ -0,0 +1,52 @@
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
+
+import pytest
+
+from api.main import app
+from benchmarks.eutils_server import EutilsServer
+from benchmarks.fake_llm import FakeChatModel, install_fake_models, uninstall_fake_models
+from benchmarks.load import run_load
+from med_search.agent.langgraph import gateway
+from med_search.services import pubmed, rate_limit
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    """App com o modelo falso e o cliente PubMed apontado para a E-utilities local"""
+    with EutilsServer() as server:
+        # As mesmas variáveis de benchmarks.load.configure_environment, restauradas ao fim do teste
+        monkeypatch.setenv("PUBMED_EUTILS_URL", server.url)
+        monkeypatch.setenv("PUBMED_RATE_LIMIT", "1000")
+        for name in ("PUBMED_ARTICLE_CACHE", "PUBMED_SEARCH_CACHE", "LLM_CACHE_MEDICAL_QUERY"):
+            monkeypatch.setenv(name, "off")
+        monkeypatch.setattr(pubmed, "_async_client", None)
+        monkeypatch.setattr(rate_limit, "_schedulers", {})
+        monkeypatch.setattr(gateway, "_gateway", None)
+        install_fake_models(FakeChatModel(delay=0.01, results=5), web_search_delay=0.01)
+        try:
+            yield server
+        finally:
+            uninstall_fake_models()
+
+
+def test_load_stages_run_conversations_against_both_endpoints(fake_backend):
+    async def run():
+        async with app.router.lifespan_context(app):
+            return await run_load(app, stages=[1, 3], duration=0.3, endpoints=["message", "stream"])
+
+    results = asyncio.run(run())
+
+    assert [(r.endpoint, r.concurrency) for r in results] == [
+        ("message", 1), ("message", 3), ("stream", 1), ("stream", 3)
+    ]
+    for result in results:
+        assert result.requests > 0 and result.errors == 0
+        assert result.p99 >= result.p50 > 0
+        assert result.loop_lag_max >= 0 and result.rss > 0
+    assert all(r.first_token_p50 is not None for r in results if r.endpoint == "stream")
+    # Cada sessão confirmada buscou no servidor local (sem cache entre sessões)
+    assert fake_backend.counters["efetch"] >= sum(r.sessions for r in results)
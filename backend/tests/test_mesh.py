@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+
+from med_search.services.mesh import MeshIndex, build_mesh_index
+
+MESH_SAMPLE = Path(__file__).parent / "fixtures" / "mesh_sample.xml"
+
+
+@pytest.fixture(scope="module")
+def mesh_index(tmp_path_factory):
+    path = tmp_path_factory.mktemp("mesh") / "mesh.sqlite3"
+    assert build_mesh_index(str(MESH_SAMPLE), str(path)) == 3
+    index = MeshIndex(str(path))
+    yield index
+    index.close()
+
+
+def test_index_is_opened_lazily(tmp_path):
+    index = MeshIndex(str(tmp_path / "missing.sqlite3"))
+    assert index._conn is None
+
+
+def test_exact_and_entry_term_lookup(mesh_index):
+    assert mesh_index.is_heading("parkinson   DISEASE")
+    assert mesh_index.preferred_heading("Paralysis Agitans") == "Parkinson Disease"
+    assert mesh_index.preferred_heading("Drug-Induced Dyskinesia") == "Dyskinesia, Drug-Induced"
+    assert mesh_index.lookup("Parkinsonian Tremor Syndrome") is None
+
+
+def test_synonyms_and_prefix(mesh_index):
+    assert mesh_index.synonyms("Parkinson Disease", limit=2) == ["Paralysis Agitans", "Parkinson's Disease"]
+    assert [term for term, _ in mesh_index.prefix("park")] == ["Parkinson Disease", "Parkinson's Disease"]
+
+
+def test_rewrite_query_fixes_mesh_terms(mesh_index):
+    query = '(Paralysis Agitans[Mesh] OR parkinson) AND ("Brain Pacemaker"[Mesh] OR "Deep Brain Stimulation"[Mesh])'
+    rewritten, report = mesh_index.rewrite_query(query)
+
+    assert rewritten == ('("Parkinson Disease"[Mesh] OR parkinson) AND '
+                         '("Brain Pacemaker"[tiab] OR "Deep Brain Stimulation"[Mesh])')
+    assert report == {
+        "valid": ["Deep Brain Stimulation"],
+        "mapped": {"Paralysis Agitans": "Parkinson Disease"},
+        "invalid": ["Brain Pacemaker"],
+    }
+
+
+def test_rewrite_keeps_valid_query_untouched_and_expands_synonyms(mesh_index):
+    query = '"Deep Brain Stimulation"[Mesh] AND levodopa'
+    assert mesh_index.rewrite_query(query)[0] == query
+    expanded, _ = mesh_index.rewrite_query(query, expand_synonyms=True)
+    assert expanded == '("Deep Brain Stimulation"[Mesh] OR "Brain Stimulation, Deep"[tiab]) AND levodopa'
+
+
+def test_rewrite_preserves_subheadings(mesh_index):
+    query = '"Paralysis Agitans/drug therapy"[Mesh] AND "Brain Pacemaker/adverse effects"[Mesh]'
+    rewritten, report = mesh_index.rewrite_query(query, expand_synonyms=True)
+
+    # O descritor é mapeado e o subcabeçalho volta; o desconhecido qualificado não vira [tiab]
+    assert rewritten == '"Parkinson Disease/drug therapy"[Mesh] AND "Brain Pacemaker/adverse effects"[Mesh]'
+    assert report == {"valid": [], "mapped": {"Paralysis Agitans": "Parkinson Disease"}, "invalid": []}
+
+
+def test_strategy_blocks_are_rewritten_like_the_final_strategy(mesh_index, monkeypatch):
+    from med_search.agent.langgraph.tools import pubmed_tools
+    from med_search.models.schemas import SearchStrategy
+
+    monkeypatch.setattr(pubmed_tools, "get_mesh_index", lambda: mesh_index)
+    strategy = pubmed_tools.rewrite_mesh_terms(SearchStrategy(
+        picots={},
+        search_blocks={"population": "Paralysis Agitans[Mesh]", "comparison": None},
+        final_search_strategy="Paralysis Agitans[Mesh] AND levodopa",
+        mesh_terms=[]
+    ))
+    assert strategy.final_search_strategy == '"Parkinson Disease"[Mesh] AND levodopa'
+    assert strategy.search_blocks == {"population": '"Parkinson Disease"[Mesh]', "comparison": None}
@@ -21,17 +21,17 @@ def main():
         sort_by="relevance"
     )
 
-    # Busqua os artigos
+    # Busca os artigos (dicionários produzidos pelo parser do efetch)
     articles = client.search_articles(request)
 
     # Exibe os resultados
     for article in articles:
-        print(f"Título: {article.title}")
-        print(f"Autores: {', '.join(a.name for a in article.authors)}")
-        print(f"Article Type: {', '.join(article.article_type)}")
-        print(f"Journal: {article.journal}")
-        print(f"DOI: {article.doi}")
-        print(f"Link: {article.url}")
+        print(f"Título: {article.get('title')}")
+        print(f"Autores: {', '.join(article.get('authors', []))}")
+        print(f"Article Type: {', '.join(article.get('article_type', []))}")
+        print(f"Journal: {article.get('journal')}")
+        print(f"DOI: {article.get('doi')}")
+        print(f"Link: {article.get('url')}")
         print("---")
 
 if __name__ == "__main__":
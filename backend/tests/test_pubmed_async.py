@@ -0,0 +1,263 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+
+from med_search.services.pubmed import AsyncPubMedClient, ordered_map, thread_ordered_map
+from med_search.models.schemas import SearchRequest
+from med_search.services.cache import ArticleCache, SearchCache
+from med_search.services.rate_limit import RequestScheduler
+from tests.eutils_fixtures import make_efetch_xml, make_esearch_json, make_eutils_handler, make_pmids
+
+EFETCH_SAMPLE = (Path(__file__).parent / "fixtures" / "efetch_sample.xml").read_bytes()
+
+
+def fast_scheduler():
+    return RequestScheduler(rate=1000, backoff_base=0.001)
+
+
+def make_transport(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if request.url.path.endswith("/esearch.fcgi"):
+            return httpx.Response(200, json={
+                "esearchresult": {"count": "3", "idlist": ["38012345", "37654321", "36111222"]}
+            })
+        if request.url.path.endswith("/efetch.fcgi"):
+            return httpx.Response(200, content=EFETCH_SAMPLE)
+        return httpx.Response(404)
+    return httpx.MockTransport(handler)
+
+
+def test_async_search_articles_reuses_one_pool():
+    calls = []
+    client = AsyncPubMedClient(api_key="test-key", transport=make_transport(calls), scheduler=fast_scheduler())
+    request = SearchRequest(query="parkinson AND dbs", max_results=3, sort_by="relevance")
+
+    async def run():
+        first = await client.search_articles(request)
+        http_client = client.client
+        second = await client.search_articles(request)
+        assert client.client is http_client
+        await client.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert [a["pmid"] for a in first] == ["38012345", "37654321", "36111222"]
+    assert first == second
+    assert len(calls) == 4
+    esearch = calls[0].url.params
+    assert esearch["sort"] == "relevance"
+    assert esearch["api_key"] == "test-key"
+    assert calls[1].url.params["id"] == "38012345,37654321,36111222"
+
+
+def test_async_search_articles_without_hits():
+    def handler(request):
+        return httpx.Response(200, json={"esearchresult": {"count": "0", "idlist": []}})
+
+    client = AsyncPubMedClient(transport=httpx.MockTransport(handler), scheduler=fast_scheduler())
+    request = SearchRequest(query="nothing matches this", max_results=5)
+    assert asyncio.run(client.search_articles(request)) == []
+
+
+def test_efetch_failures_are_logged(caplog):
+    def handler(request):
+        return httpx.Response(400)
+
+    client = AsyncPubMedClient(transport=httpx.MockTransport(handler), scheduler=fast_scheduler())
+    with caplog.at_level("ERROR", logger="med_search.services.pubmed"):
+        assert asyncio.run(client.fetch_articles(["38012345"])) is None
+    assert "Erro ao buscar detalhes dos artigos" in caplog.text
+    assert caplog.records[0].exc_info is not None
+
+
+def test_bulk_articles_page_history_in_order():
+    pmids = make_pmids(1050)
+    fetches = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if request.url.path.endswith("/esearch.fcgi"):
+            assert params["usehistory"] == "y"
+            return httpx.Response(200, json=make_esearch_json([], count=len(pmids), webenv="MCID_1"))
+        assert params["WebEnv"] == "MCID_1"
+        start, size = int(params["retstart"]), int(params["retmax"])
+        fetches.append((start, size))
+        # Lotes iniciais respondem mais devagar para forçar conclusão fora de ordem
+        await asyncio.sleep(0.02 if start == 0 else 0)
+        return httpx.Response(200, content=make_efetch_xml(pmids[start:start + size]))
+
+    client = AsyncPubMedClient(transport=httpx.MockTransport(handler), batch_size=200, max_concurrency=4,
+                               scheduler=fast_scheduler())
+    request = SearchRequest(query="parkinson", max_results=1000)
+
+    async def run():
+        return [article["pmid"] async for article in client.iter_bulk_articles(request)]
+
+    assert asyncio.run(run()) == pmids[:1000]
+    assert sorted(fetches) == [(0, 200), (200, 200), (400, 200), (600, 200), (800, 200)]
+
+
+def test_large_pmid_lists_are_split_into_batches():
+    pmids = make_pmids(450)
+    batches = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ids = request.url.params["id"].split(",")
+        batches.append(len(ids))
+        return httpx.Response(200, content=make_efetch_xml(ids))
+
+    client = AsyncPubMedClient(transport=httpx.MockTransport(handler), batch_size=200, scheduler=fast_scheduler())
+    articles = asyncio.run(client._fetch_articles_details_xml(pmids))
+
+    assert [a["pmid"] for a in articles] == pmids
+    assert sorted(batches) == [50, 200, 200]
+
+
+def test_throttled_efetch_is_retried():
+    responses = iter([
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(503),
+        httpx.Response(200, content=EFETCH_SAMPLE),
+    ])
+    scheduler = fast_scheduler()
+    client = AsyncPubMedClient(transport=httpx.MockTransport(lambda request: next(responses)), scheduler=scheduler)
+
+    articles = asyncio.run(client._fetch_articles_details_xml(["38012345"]))
+
+    assert len(articles) == 3
+    assert scheduler.stats() == {"requests": 3, "throttled": 1, "retried": 2, "failed": 0, "deadline_exceeded": 0}
+
+
+def test_article_cache_skips_cached_pmids(tmp_path):
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ids = request.url.params["id"].split(",")
+        requested.append(ids)
+        return httpx.Response(200, content=make_efetch_xml(ids))
+
+    cache = ArticleCache(path=str(tmp_path / "articles.sqlite3"))
+    client = AsyncPubMedClient(transport=httpx.MockTransport(handler), scheduler=fast_scheduler(),
+                               article_cache=cache)
+    pmids = make_pmids(6)
+
+    cold = asyncio.run(client._fetch_articles_details_xml(pmids[:4]))
+    warm = asyncio.run(client._fetch_articles_details_xml(pmids))
+
+    assert [a["pmid"] for a in warm] == pmids
+    assert warm[:4] == cold
+    assert requested == [pmids[:4], pmids[4:]]
+    assert cache.stats.as_dict()["hits"] == 4
+
+    asyncio.run(client._fetch_articles_details_xml(list(reversed(pmids))))
+    assert len(requested) == 2
+
+
+def test_disk_caches_are_read_and_written_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingCache(ArticleCache):
+        def get_many(self, pmids):
+            threads.append(threading.get_ident())
+            return super().get_many(pmids)
+
+        def put_many(self, articles):
+            threads.append(threading.get_ident())
+            super().put_many(articles)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=make_efetch_xml(request.url.params["id"].split(",")))
+
+    client = AsyncPubMedClient(transport=httpx.MockTransport(handler), scheduler=fast_scheduler(),
+                               article_cache=RecordingCache(path=str(tmp_path / "articles.sqlite3")))
+
+    async def run():
+        await client._fetch_articles_details_xml(make_pmids(3))
+        await client.aclose()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+def test_count_mode_runs_blocks_concurrently_and_is_cached():
+    calls = []
+    sizes = {"parkinson": 5, "dbs": 3, "parkinson AND dbs": 0}
+    handler = make_eutils_handler(lambda term: make_pmids(sizes[term]), calls)
+
+    async def slow_handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.1)
+        return handler(request)
+
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(slow_handler),
+        scheduler=fast_scheduler(),
+        search_cache=SearchCache()
+    )
+    requests = {name: SearchRequest(query=term, max_results=10) for name, term in (
+        ("final_search_strategy", "parkinson AND dbs"), ("population", "parkinson"), ("intervention", "dbs")
+    )}
+
+    async def run():
+        started = time.perf_counter()
+        counts = await client.count_queries(requests)
+        elapsed = time.perf_counter() - started
+        # Segunda chamada vem do cache de buscas
+        assert await client.count_queries(requests) == counts
+        await client.aclose()
+        return counts, elapsed
+
+    counts, elapsed = asyncio.run(run())
+
+    assert counts == {"final_search_strategy": 0, "population": 5, "intervention": 3}
+    assert elapsed < 0.25
+    assert len(calls) == 3
+    assert all(request.url.params["rettype"] == "count" for request in calls)
+    assert all("retmax" not in request.url.params for request in calls)
+
+
+def test_ordered_map_awaits_cancelled_tasks_on_early_exit():
+    started = []
+
+    async def slow(item):
+        started.append(item)
+        await asyncio.sleep(1)
+        return item
+
+    async def fast_then_slow(item):
+        return item if item == 0 else await slow(item)
+
+    async def run():
+        results = ordered_map(fast_then_slow, range(10), concurrency=3)
+        first = await results.__anext__()
+        await results.aclose()
+        return first, [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    first, leftover = asyncio.run(run())
+    assert first == 0
+    # Tarefas ainda não iniciadas são canceladas antes de rodar
+    assert started == [1, 2]
+    assert leftover == []
+
+
+def test_thread_ordered_map_bounds_submitted_work():
+    submitted = []
+
+    def work(item):
+        submitted.append(item)
+        return item * 2
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = thread_ordered_map(executor, work, range(100), concurrency=2)
+        assert [next(results) for _ in range(3)] == [0, 2, 4]
+        # Só a janela à frente do consumidor foi submetida, não os 100 itens
+        assert len(submitted) <= 5
+        results.close()
@@ -0,0 +1,59 @@
+import io
+from pathlib import Path
+
+from med_search.services.pubmed_parser import (
+    ArticleStreamParser,
+    iter_articles_xml,
+    parse_articles_xml,
+)
+
+EFETCH_SAMPLE = (Path(__file__).parent / "fixtures" / "efetch_sample.xml").read_bytes()
+
+
+def test_parse_structured_article():
+    article = parse_articles_xml(EFETCH_SAMPLE)[0]
+
+    assert article["pmid"] == "38012345"
+    assert article["title"].startswith("Deep brain stimulation versus")
+    assert list(article["abstract"]) == ["BACKGROUND", "METHODS", "RESULTS"]
+    assert article["simple_abstract"].startswith("Motor fluctuations")
+    assert article["authors"] == ["Ana Silva", "Chidi Okafor"]
+    assert article["doi"] == "10.1002/mds.29999"
+    assert article["publication_date"] == "2024/Feb/12"
+    assert article["journal"].startswith("Movement disorders")
+    assert article["keywords"] == ["deep brain stimulation", "dyskinesia"]
+    assert article["article_type"] == ["Randomized Controlled Trial", "Journal Article"]
+    assert article["url"] == "https://pubmed.ncbi.nlm.nih.gov/38012345/"
+
+
+def test_parse_optional_fields():
+    _, unstructured, no_abstract = parse_articles_xml(EFETCH_SAMPLE)
+
+    assert "abstract" not in unstructured
+    assert unstructured["simple_abstract"].startswith("Continuous dopaminergic")
+    assert unstructured["authors"] == ["Linh Nguyen"]
+    assert "doi" not in unstructured
+    assert "keywords" not in unstructured
+    assert unstructured["publication_date"] == "2023"
+
+    assert "simple_abstract" not in no_abstract
+    assert no_abstract["article_type"] == ["Journal Article"]
+
+
+def test_small_chunks_match_full_parse():
+    chunks = [EFETCH_SAMPLE[i:i + 97] for i in range(0, len(EFETCH_SAMPLE), 97)]
+    assert list(iter_articles_xml(chunks)) == parse_articles_xml(EFETCH_SAMPLE)
+    assert list(iter_articles_xml(io.BytesIO(EFETCH_SAMPLE))) == parse_articles_xml(EFETCH_SAMPLE)
+
+
+def test_articles_are_emitted_before_document_ends():
+    parser = ArticleStreamParser()
+    cut = EFETCH_SAMPLE.index(b"</PubmedArticle>") + len(b"</PubmedArticle>")
+
+    first = list(parser.feed(EFETCH_SAMPLE[:cut]))
+    assert [a["pmid"] for a in first] == ["38012345"]
+    # Elementos já emitidos são descartados da árvore
+    assert len(parser._root) == 0
+
+    rest = list(parser.feed(EFETCH_SAMPLE[cut:])) + list(parser.close())
+    assert [a["pmid"] for a in rest] == ["37654321", "36111222"]
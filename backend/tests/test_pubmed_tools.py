@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import httpx
+
+from med_search.agent.langgraph.events import ARTICLE_EVENT_FIELDS
+from med_search.agent.langgraph.tools import pubmed_tools
+from med_search.services.pubmed import AsyncPubMedClient
+from med_search.services.rate_limit import RequestScheduler
+from med_search.services.strategy import compile_strategy
+from tests.eutils_fixtures import make_efetch_xml, make_esearch_json, make_eutils_handler, make_pmids, strategy_from
+
+
+def test_articles_are_streamed_before_the_tool_returns(monkeypatch):
+    pmids = make_pmids(5)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/esearch.fcgi"):
+            return httpx.Response(200, json=make_esearch_json(pmids))
+        return httpx.Response(200, content=make_efetch_xml(pmids))
+
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(handler),
+        scheduler=RequestScheduler(rate=1000)
+    )
+    monkeypatch.setattr(pubmed_tools, "get_async_pubmed_client", lambda: client)
+    monkeypatch.setattr(pubmed_tools, "get_mesh_index", lambda: None)
+
+    async def run():
+        events = [
+            event async for event in pubmed_tools.pubmed_research.astream_events(
+                {"query": '"Parkinson Disease"[Mesh] AND "Deep Brain Stimulation"[Mesh]'},
+                config={"configurable": {"thread_id": "stream-test"}},
+                version="v2"
+            )
+        ]
+        await client.aclose()
+        return events
+
+    events = asyncio.run(run())
+    kinds = [event["event"] for event in events]
+    articles = [event["data"] for event in events if event["event"] == "on_custom_event"]
+
+    assert [article["pmid"] for article in articles] == pmids
+    assert set(articles[0]) == set(ARTICLE_EVENT_FIELDS)
+    assert kinds.index("on_custom_event") < kinds.index("on_tool_end")
+    output = events[kinds.index("on_tool_end")]["data"]["output"]
+    # A ordem do PubMed é mantida; o BM25 só preenche a pontuação
+    assert [article["pmid"] for article in output] == pmids
+    assert all("relevance_score" in article for article in output)
+
+
+def test_counts_note_points_out_empty_blocks():
+    note = pubmed_tools.counts_note({"final_search_strategy": 0, "population": 1200, "outcomes": 0})
+
+    assert "- Estratégia completa: 0 artigos" in note
+    assert "- Bloco population: 1200 artigos" in note
+    assert "Blocos sem resultado: outcomes" in note
+    assert "ampla demais" in pubmed_tools.counts_note({"final_search_strategy": pubmed_tools.COUNT_TOO_BROAD + 1})
+    assert pubmed_tools.counts_note(None) == ""
+
+
+def test_strategy_counts_cover_the_strategy_and_each_block(monkeypatch):
+    calls = []
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(make_eutils_handler(lambda term: make_pmids(len(term) % 7), calls)),
+        scheduler=RequestScheduler(rate=1000)
+    )
+    monkeypatch.setattr(pubmed_tools, "get_async_pubmed_client", lambda: client)
+    monkeypatch.setattr(pubmed_tools, "get_mesh_index", lambda: None)
+    strategy = strategy_from("test_pubmed_xml.py")
+
+    async def run():
+        counts = await pubmed_tools.strategy_counts(strategy)
+        await client.aclose()
+        return counts
+
+    counts = asyncio.run(run())
+
+    assert list(counts) == ["final_search_strategy", *compile_strategy(strategy).search_blocks]
+    assert len(calls) == len(counts)
+    assert {request.url.params["mindate"] for request in calls} == {"2020/01/01"}
+    assert asyncio.run(pubmed_tools.strategy_counts("qual o melhor tratamento?")) is None
+
+
+def test_strategy_counts_give_up_after_the_deadline(monkeypatch):
+    async def slow_handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(10)
+        return httpx.Response(500)
+
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(slow_handler),
+        scheduler=RequestScheduler(rate=1000)
+    )
+    monkeypatch.setattr(pubmed_tools, "get_async_pubmed_client", lambda: client)
+    monkeypatch.setattr(pubmed_tools, "get_mesh_index", lambda: None)
+
+    async def run():
+        started = time.perf_counter()
+        counts = await pubmed_tools.strategy_counts(strategy_from("test_pubmed_xml.py"), timeout=0.05)
+        elapsed = time.perf_counter() - started
+        await client.aclose()
+        return counts, elapsed
+
+    counts, elapsed = asyncio.run(run())
+    assert counts is None
+    assert elapsed < 1
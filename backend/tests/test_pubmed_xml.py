@@ -48,7 +48,7 @@ def main ():
         print(f"Tipos de publicação: {', '.join(article.get('article_type', []))}")
         print(f"DOI: {article.get('doi', [])}")
         print(f"Link: {article.get('url',[])}")
-        print(f"Data da publicação: {article.get("publication_date",[])}")
+        print(f"Data da publicação: {article.get('publication_date',[])}")
         print("---")
     
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+import pytest
+
+from med_search.services.query import QuerySyntaxError, Term, canonicalize_query, parse_query
+from tests.eutils_fixtures import strategy_from
+
+
+def test_multiline_and_single_line_strategies_are_equivalent():
+    assert canonicalize_query(strategy_from("test_pubmed.py")) == canonicalize_query(strategy_from("test_pubmed_xml.py"))
+
+
+def test_block_order_and_operator_case_do_not_matter():
+    assert canonicalize_query("(a OR b) AND (c OR d)") == canonicalize_query("(d or c) and (b or a)")
+
+
+def test_non_commutative_structure_is_preserved():
+    assert canonicalize_query("a NOT b") != canonicalize_query("b NOT a")
+    # O PubMed avalia da esquerda para a direita
+    assert canonicalize_query("a OR b AND c") == "(a OR b) AND c"
+    assert canonicalize_query("a OR (b AND c)") == "a OR (b AND c)"
+
+
+def test_terms_keep_field_tags_and_phrases():
+    node = parse_query('"Randomized Controlled Trial"[Publication Type] OR Parkinson Disease[Mesh] OR dbs')
+    assert node.children == [
+        Term("Randomized Controlled Trial", "Publication Type", quoted=True),
+        Term("Parkinson Disease", "Mesh"),
+        Term("dbs"),
+    ]
+
+
+def test_malformed_strategy_falls_back_to_whitespace_normalization():
+    with pytest.raises(QuerySyntaxError):
+        parse_query("(cancer or tumor")
+    assert canonicalize_query("(cancer   or\n tumor") == "(cancer OR tumor"
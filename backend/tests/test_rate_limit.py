@@ -0,0 +1,98 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from med_search.services.rate_limit import (
+    DeadlineExceeded,
+    RequestScheduler,
+    TokenBucket,
+    get_scheduler,
+    parse_retry_after,
+)
+
+
+def response(status, headers=None):
+    return SimpleNamespace(status_code=status, headers=headers or {})
+
+
+def test_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=20, capacity=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.05, abs=0.01)
+    assert waits[3] == pytest.approx(0.10, abs=0.01)
+
+
+def test_bucket_reserve_respects_max_wait():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve(max_wait=0.1) is None
+    # A reserva recusada não consome token
+    assert bucket.reserve(max_wait=1.5) == pytest.approx(1.0, abs=0.05)
+
+
+def test_retry_after_formats():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+
+def test_execute_retries_throttled_and_server_errors():
+    scheduler = RequestScheduler(rate=1000, backoff_base=0.001)
+    responses = iter([response(429, {"Retry-After": "0"}), response(502), response(200)])
+    closed = []
+
+    result = scheduler.execute(lambda: next(responses), close=closed.append)
+
+    assert result.status_code == 200
+    assert [r.status_code for r in closed] == [429, 502]
+    assert scheduler.stats() == {"requests": 3, "throttled": 1, "retried": 2, "failed": 0, "deadline_exceeded": 0}
+
+
+def test_execute_gives_up_after_max_retries():
+    scheduler = RequestScheduler(rate=1000, backoff_base=0.001, max_retries=2)
+    result = scheduler.execute(lambda: response(500))
+    assert result.status_code == 500
+    assert scheduler.stats()["requests"] == 3
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_client_errors_are_not_retried():
+    scheduler = RequestScheduler(rate=1000)
+    assert scheduler.execute(lambda: response(400)).status_code == 400
+    assert scheduler.stats()["retried"] == 0
+
+
+def test_network_errors_are_retried_async():
+    scheduler = RequestScheduler(rate=1000, backoff_base=0.001)
+    attempts = []
+
+    async def send():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("reset")
+        return response(200)
+
+    assert asyncio.run(scheduler.aexecute(send)).status_code == 200
+    assert scheduler.stats()["retried"] == 2
+
+
+def test_deadline_stops_retries():
+    scheduler = RequestScheduler(rate=1000, deadline=0.05)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        scheduler.execute(lambda: response(429, {"Retry-After": "5"}))
+    assert time.monotonic() - started < 1
+    assert scheduler.stats()["deadline_exceeded"] == 1
+    # A mensagem informa o prazo da chamada, não o padrão do agendador
+    with pytest.raises(DeadlineExceeded, match="Prazo de 0.02s"):
+        scheduler.execute(lambda: response(429, {"Retry-After": "5"}), deadline=0.02)
+
+
+def test_global_scheduler_budget_depends_on_api_key():
+    assert get_scheduler(False).bucket.rate == 3
+    assert get_scheduler(True).bucket.rate == 10
+    assert get_scheduler(True) is get_scheduler(True)
@@ -0,0 +1,166 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from api.routes import search as search_routes
+from api.services.search_service import SearchService, decode_cursor
+from med_search.models.schemas import SearchRequest
+from med_search.services.pubmed import AsyncPubMedClient
+from med_search.services.rate_limit import RequestScheduler
+from tests.eutils_fixtures import make_eutils_handler, make_pmids
+
+PMIDS = make_pmids(45)
+
+
+def run_requests(monkeypatch, send):
+    calls = []
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(make_eutils_handler(PMIDS, calls)),
+        scheduler=RequestScheduler(rate=1000)
+    )
+    monkeypatch.setattr(search_routes, "search_service", SearchService(client))
+    app = FastAPI()
+    app.include_router(search_routes.router)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            result = await send(http)
+        await client.aclose()
+        return result
+
+    return asyncio.run(run()), calls
+
+
+def test_cursor_pagination_walks_the_history_server(monkeypatch):
+    async def send(http):
+        pages = [(await http.post("/search", json={"query": "parkinson", "max_results": 20})).json()]
+        while pages[-1]["next_cursor"]:
+            response = await http.get("/search/page", params={"cursor": pages[-1]["next_cursor"]})
+            pages.append(response.json())
+        return pages
+
+    pages, calls = run_requests(monkeypatch, send)
+    assert [len(page["results"]) for page in pages] == [20, 20, 5]
+    assert [r["pubmed_id"] for page in pages for r in page["results"]] == PMIDS
+    assert pages[0]["total_found"] == 45 and pages[-1]["next_cursor"] is None
+    # Uma única esearch: as páginas seguintes usam apenas o WebEnv
+    assert sum(call.url.path.endswith("/esearch.fcgi") for call in calls) == 1
+    assert decode_cursor(pages[0]["next_cursor"])["retstart"] == 20
+
+
+def test_field_projection_and_article_type_filter(monkeypatch):
+    async def send(http):
+        return await http.post(
+            "/search?fields=pubmed_id,title",
+            json={"query": "parkinson", "max_results": 5, "filter": {"article_types": ["Review"]}}
+        )
+
+    response, calls = run_requests(monkeypatch, send)
+    body = response.json()
+    assert set(body["results"][0]) == {"pubmed_id", "title"}
+    assert body["query_used"] == '(parkinson) AND ("Review"[pt])'
+
+
+def test_etag_returns_not_modified_without_efetch(monkeypatch):
+    async def send(http):
+        first = await http.post("/search", json={"query": "parkinson", "max_results": 5})
+        second = await http.post(
+            "/search", json={"query": "parkinson", "max_results": 5},
+            headers={"If-None-Match": first.headers["ETag"]}
+        )
+        return first, second
+
+    (first, second), calls = run_requests(monkeypatch, send)
+    assert first.status_code == 200 and second.status_code == 304
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert sum(call.url.path.endswith("/efetch.fcgi") for call in calls) == 1
+
+
+def test_etag_covers_the_query_and_accepts_weak_lists(monkeypatch):
+    async def send(http):
+        first = await http.post("/search", json={"query": "parkinson", "max_results": 5})
+        etag = first.headers["ETag"]
+        # Mesmos PMIDs e total, mas outra estratégia
+        other = await http.post(
+            "/search", json={"query": "levodopa", "max_results": 5}, headers={"If-None-Match": etag}
+        )
+        listed = await http.post(
+            "/search", json={"query": "parkinson", "max_results": 5},
+            headers={"If-None-Match": f'"outro", W/{etag}'}
+        )
+        return other, listed
+
+    (other, listed), _ = run_requests(monkeypatch, send)
+    assert other.status_code == 200
+    assert listed.status_code == 304
+
+
+def test_invalid_requests(monkeypatch):
+    async def send(http):
+        return (
+            await http.get("/search/page", params={"cursor": "nao-e-um-cursor"}),
+            await http.post("/search?fields=senha", json={"query": "parkinson"}),
+        )
+
+    (bad_cursor, bad_fields), _ = run_requests(monkeypatch, send)
+    assert bad_cursor.status_code == 400 and bad_fields.status_code == 400
+
+
+def test_esearch_failures_map_to_bad_gateway(monkeypatch):
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(lambda request: httpx.Response(400)),
+        scheduler=RequestScheduler(rate=1000)
+    )
+    monkeypatch.setattr(search_routes, "search_service", SearchService(client))
+    app = FastAPI()
+    app.include_router(search_routes.router)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            response = await http.post("/search", json={"query": "parkinson", "max_results": 5})
+        await client.aclose()
+        return response
+
+    response = asyncio.run(run())
+    assert response.status_code == 502
+    assert "PubMed" in response.json()["detail"]
+
+
+def test_batch_search_fetches_each_pmid_once(monkeypatch):
+    results = {"parkinson": PMIDS[:10], "dbs": PMIDS[5:15], "tremor": PMIDS[30:32]}
+    calls = []
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(make_eutils_handler(lambda term: results[term], calls)),
+        scheduler=RequestScheduler(rate=1000)
+    )
+
+    async def run():
+        batch = await client.search_batch([
+            SearchRequest(query=query, max_results=20) for query in results
+        ])
+        await client.aclose()
+        return batch
+
+    batch = asyncio.run(run())
+    assert batch.hits == list(results.values())
+    assert [article["pmid"] for article in batch.articles] == PMIDS[:15] + PMIDS[30:32]
+    assert batch.overlap == [[10, 5, 0], [5, 10, 0], [0, 0, 2]]
+    fetched = [call.url.params["id"].split(",") for call in calls if call.url.path.endswith("/efetch.fcgi")]
+    assert sorted(pmid for ids in fetched for pmid in ids) == sorted(PMIDS[:15] + PMIDS[30:32])
+
+
+def test_batch_endpoint(monkeypatch):
+    async def send(http):
+        return await http.post("/search/batch?fields=pubmed_id", json={"searches": [
+            {"query": "parkinson", "max_results": 10}, {"query": "dbs", "max_results": 5}
+        ]})
+
+    response, _ = run_requests(monkeypatch, send)
+    body = response.json()
+    assert [len(s["pmids"]) for s in body["strategies"]] == [10, 5]
+    assert body["unique_found"] == 10 and body["overlap"] == [[10, 5], [5, 5]]
+    assert body["results"][0] == {"pubmed_id": PMIDS[0]}
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from med_search.services.pubmed_parser import parse_articles_xml
+from med_search.services.search_index import BM25Index, get_search_index, query_terms
+
+EFETCH_SAMPLE = Path(__file__).parent / "fixtures" / "efetch_sample.xml"
+
+
+def make_article(pmid, title, abstract="", keywords=None):
+    return {"pmid": pmid, "title": title, "simple_abstract": abstract, "keywords": keywords or []}
+
+
+def sample_index():
+    index = BM25Index()
+    index.add_many([
+        make_article("1", "Deep brain stimulation in Parkinson disease", "Motor outcomes improved after surgery."),
+        make_article("2", "Levodopa induced dyskinesia", "Dyskinesia outcomes in advanced Parkinson disease."),
+        make_article("3", "Exercise and cognition in older adults", "Aerobic training improved memory."),
+    ])
+    return index
+
+
+def test_query_terms_ignore_operators_filters_and_negated_terms():
+    query = ('("Parkinson Disease"[Mesh] OR parkinson*) AND dyskinesia[tiab] NOT "Review"[pt] '
+             'AND ("2020"[dp] : "2025"[dp])')
+    assert query_terms(query) == ["parkinson", "disease", "dyskinesia"]
+    assert query_terms("quais artigos citam (dyskinesia") == ["quais", "artigos", "citam", "dyskinesia"]
+
+
+def test_search_ranks_and_restricts_results():
+    index = sample_index()
+    assert [pmid for pmid, _ in index.search("dyskinesia outcomes")] == ["2", "1"]
+    assert index.search("dyskinesia outcomes", pmids=["1", "3"])[0][0] == "1"
+    assert index.search("tremor") == []
+    assert len(index.search("parkinson", limit=1)) == 1
+    assert index.search("parkinson", limit=0) == []
+    assert [pmid for pmid, _ in index.search("parkinson disease", limit=50)] == ["1", "2"]
+
+
+def test_add_is_incremental_and_idempotent():
+    index = sample_index()
+    assert index.search("dyskinesia")[0][0] == "2"
+    assert not index.add(make_article("2", "duplicate"))
+    assert index.add(make_article("4", "Dyskinesia dyskinesia", "dyskinesia"))
+    assert index.search("dyskinesia")[0][0] == "4"
+    assert len(index) == 4
+
+
+def test_rerank_fills_relevance_score_and_keeps_ties_in_order():
+    articles = parse_articles_xml(EFETCH_SAMPLE.read_bytes())
+    index = BM25Index()
+    reranked = index.rerank("zzz", articles)
+    assert [a["pmid"] for a in reranked] == [a["pmid"] for a in articles]
+    assert all(a["relevance_score"] == 0 for a in reranked)
+    assert "relevance_score" not in articles[0]
+
+    top_title_word = query_terms(articles[-1]["title"])[0]
+    assert index.rerank(top_title_word, articles)[0]["pmid"] == articles[-1]["pmid"]
+    scored = index.score_articles(top_title_word, articles)
+    assert [a["pmid"] for a in scored] == [a["pmid"] for a in articles]
+    assert scored[-1]["relevance_score"] > 0
+
+
+def test_session_indexes_are_isolated():
+    get_search_index("session-a").add(make_article("1", "Dyskinesia"))
+    assert get_search_index("session-a").search("dyskinesia")
+    assert not get_search_index("session-b").search("dyskinesia")
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from api.services.session_store import MemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    stores = []
+
+    def factory(max_sessions=10, ttl_seconds=60):
+        if request.param == "memory":
+            store = MemorySessionStore(max_sessions, ttl_seconds)
+        else:
+            store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), max_sessions, ttl_seconds)
+        stores.append(store)
+        return store
+
+    yield factory
+    for store in stores:
+        store.close()
+
+
+def test_set_get_delete(make_store):
+    store = make_store()
+    store.set("a", {"messages": [{"role": "user", "content": "oi"}]})
+    assert store.get("a") == {"messages": [{"role": "user", "content": "oi"}]}
+    assert "a" in store and "b" not in store
+    store.delete("a")
+    assert store.get("a") is None
+
+
+def test_sessions_expire_after_inactivity(make_store):
+    store = make_store(ttl_seconds=0.05)
+    store.set("a", {"messages": []})
+    time.sleep(0.1)
+    assert store.get("a") is None
+    assert len(store) == 1
+    assert store.sweep() == 1
+    assert len(store) == 0
+
+
+def test_least_recently_active_sessions_are_evicted(make_store):
+    store = make_store(max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        store.set(session_id, {"messages": []})
+        time.sleep(0.01)
+    store.set("a", {"messages": []})
+    store.sweep()
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+
+def test_background_sweeper_removes_expired_sessions():
+    store = MemorySessionStore(max_sessions=10, ttl_seconds=0.01)
+    store.set("a", {"messages": []})
+    store.start_sweeper(0.02)
+    try:
+        deadline = time.time() + 2
+        while len(store) and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(store) == 0
+    finally:
+        store.close()
+
+
+def test_sweeper_failures_are_logged(caplog):
+    store = MemorySessionStore(max_sessions=10, ttl_seconds=0.01)
+    store.on_evict = lambda session_ids: 1 / 0
+    store.set("a", {"messages": []})
+    with caplog.at_level("ERROR", logger="api.services.session_store"):
+        store.start_sweeper(0.02)
+        try:
+            deadline = time.time() + 2
+            while not caplog.records and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            store.close()
+    assert "Falha na varredura" in caplog.text
+    assert caplog.records[0].exc_info[0] is ZeroDivisionError
+
+
+def test_sqlite_sessions_are_shared_between_stores(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    writer, reader = SQLiteSessionStore(path, 10, 60), SQLiteSessionStore(path, 10, 60)
+    writer.set("a", {"messages": [{"role": "user", "content": "olá"}]})
+    assert reader.get("a")["messages"][0]["content"] == "olá"
+    writer.close()
+    reader.close()
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from api.core.sse import HEARTBEAT_FRAME, sse_event, sse_stream
+
+
+def collect(stream):
+    async def run():
+        return [frame async for frame in stream]
+    return asyncio.run(run())
+
+
+def test_event_framing():
+    frame = sse_event({"type": "token", "content": "olá\nmundo"})
+    assert frame.startswith("event: token\ndata: ")
+    assert frame.endswith("\n\n") and frame.count("\n") == 3
+    assert json.loads(frame.split("data: ", 1)[1]) == {"type": "token", "content": "olá\nmundo"}
+
+
+def test_heartbeat_does_not_cancel_slow_events():
+    async def events():
+        await asyncio.sleep(0.05)
+        yield {"type": "token", "content": "a"}
+        yield {"type": "done"}
+
+    frames = collect(sse_stream(events(), heartbeat_interval=0.01))
+    assert HEARTBEAT_FRAME in frames
+    assert [f for f in frames if f != HEARTBEAT_FRAME] == [
+        sse_event({"type": "token", "content": "a"}), sse_event({"type": "done"})
+    ]
+
+
+def test_errors_become_error_events():
+    async def events():
+        yield {"type": "token", "content": "a"}
+        raise RuntimeError("falhou")
+
+    frames = collect(sse_stream(events()))
+    assert frames[-1] == sse_event({"type": "error", "message": "falhou"})
+
+
+def test_disconnect_cancels_the_producer():
+    state = {"closed": False, "produced": 0}
+
+    async def events():
+        try:
+            while True:
+                state["produced"] += 1
+                yield {"type": "token", "content": "x"}
+                await asyncio.sleep(0.01)
+        finally:
+            state["closed"] = True
+
+    async def is_disconnected():
+        return state["produced"] >= 3
+
+    frames = collect(sse_stream(events(), heartbeat_interval=1, is_disconnected=is_disconnected))
+    assert len(frames) == 2
+    assert state["closed"]
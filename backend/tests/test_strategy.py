@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+from med_search.services.strategy import StrategyParseError, build_search_request, compile_strategy
+from tests.eutils_fixtures import strategy_from
+
+AGENT_MESSAGE = """Aqui está a estratégia de busca PICOTS para a sua pergunta:
+
+**P (População):** Idosos com doença de Parkinson avançada
+
+**Estratégia final:**
+```
+{strategy}
+```
+
+Deseja que eu realize a busca no PubMed?"""
+
+
+def test_compiles_strategy_from_agent_markdown():
+    strategy = compile_strategy(AGENT_MESSAGE.format(strategy=strategy_from("test_pubmed_xml.py")))
+
+    assert strategy.final_search_strategy.startswith("((Parkinson Disease[Mesh] OR parkinson")
+    assert strategy.mesh_terms == ["Parkinson Disease", "Aged", "Deep Brain Stimulation", "Dyskinesias", "Quality of Life"]
+    assert strategy.publication_types == ["Randomized Controlled Trial", "Systematic Review", "Meta-Analysis"]
+    assert len(strategy.search_blocks) == 7
+    assert strategy.search_blocks["block_1"] == "Parkinson Disease[Mesh] OR parkinson OR parkinsonian"
+    assert "Meta-Analysis" in strategy.search_blocks["study_design"]
+    assert strategy.start_year is None
+
+
+def test_extracts_date_limits():
+    strategy = compile_strategy(
+        'Estratégia: ("Levodopa"[Mesh] OR levodopa) AND '
+        '("2018/01/01"[Date - Publication] : "2023/12/31"[Date - Publication])'
+    )
+    assert (strategy.start_year, strategy.end_year) == (2018, 2023)
+    assert strategy.search_blocks["time"] == "2018/01/01:2023/12/31[Date - Publication]"
+    assert compile_strategy("(levodopa OR carbidopa) AND 2015:2020[dp]").start_year == 2015
+
+
+def test_blocks_sharing_a_label_keep_their_parentheses():
+    strategy = compile_strategy(
+        "levodopa AND (RCT[pt] OR CT[pt]) AND (Meta-Analysis[pt] OR review[pt])"
+    )
+    assert strategy.search_blocks["study_design"] == "(RCT[pt] OR CT[pt]) AND (Meta-Analysis[pt] OR review[pt])"
+    assert compile_strategy("levodopa AND RCT[pt] AND review[pt]").search_blocks["study_design"] == "RCT[pt] AND review[pt]"
+
+
+def test_prose_is_rejected_so_the_llm_fallback_runs():
+    with pytest.raises(StrategyParseError):
+        compile_strategy("Quero artigos sobre parkinson e estimulação cerebral profunda em idosos (acima de 65 anos)")
+
+
+def test_build_search_request_applies_default_years():
+    strategy = compile_strategy("(levodopa OR carbidopa) AND dyskinesia")
+    request = build_search_request(strategy, max_results=10, default_start_year=2020, default_end_year=2025)
+
+    assert request.query == "(levodopa OR carbidopa) AND dyskinesia"
+    assert request.date_range == (date(2020, 1, 1), date(2025, 12, 31))
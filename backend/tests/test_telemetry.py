@@ -0,0 +1,137 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+
+from api.routes import metrics as metrics_routes
+from api.routes import search as search_routes
+from api.services.search_service import SearchService
+from med_search.agent.langgraph import graph as agent_graph
+from med_search.agent.langgraph.tracing import ToolTimingHandler
+from med_search.services.cache import SearchCache
+from med_search.services.pubmed import AsyncPubMedClient
+from med_search.services.rate_limit import RequestScheduler
+from med_search.services.telemetry import (
+    CACHE_LOOKUPS, MetricsRegistry, STAGE_SECONDS, collect_timings, span
+)
+from tests.eutils_fixtures import make_eutils_handler, make_pmids
+from tests.test_graph import PROMPT, ScriptedChatModel, tool_call
+
+
+def test_registry_renders_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requisições", ("outcome",))
+    latency = registry.histogram("latency_seconds", "Latência", ("stage",), buckets=(0.1, 1.0))
+    registry.add_collector(lambda: [("queue_size", "gauge", "Fila", [({"model": 'a"b'}, 3)])])
+
+    requests.inc(outcome="throttled")
+    requests.inc(2, outcome="throttled")
+    latency.observe(0.05, stage="esearch")
+    latency.observe(0.5, stage="esearch")
+    latency.observe(5, stage="esearch")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{outcome="throttled"} 3.0' in lines
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{stage="esearch",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="esearch",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{stage="esearch",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="esearch"} 3' in lines
+    assert 'latency_seconds_sum{stage="esearch"} 5.55' in lines
+    assert 'queue_size{model="a\\"b"} 3.0' in lines
+
+
+def test_spans_accumulate_in_the_request_including_child_tasks():
+    async def stage(name: str):
+        with span(name) as current:
+            current.add_bytes(100)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        with collect_timings() as timings:
+            await asyncio.gather(stage("test.parallel"), stage("test.parallel"))
+            with pytest.raises(ValueError):
+                with span("test.failing"):
+                    raise ValueError("falha")
+        return timings
+
+    errors_before = STAGE_SECONDS.count(stage="test.failing", status="error")
+    timings = asyncio.run(run()).as_dict()
+    assert timings["stages"]["test.parallel"]["calls"] == 2
+    assert timings["stages"]["test.parallel"]["seconds"] >= 0.02
+    assert timings["stages"]["test.failing"]["calls"] == 1
+    assert STAGE_SECONDS.count(stage="test.failing", status="error") == errors_before + 1
+
+    # Fora de collect_timings as etapas vão apenas para as métricas do processo
+    with span("test.outside"):
+        pass
+    assert STAGE_SECONDS.count(stage="test.outside", status="ok") >= 1
+
+
+def test_search_reports_stage_timings_and_exposes_metrics(monkeypatch):
+    client = AsyncPubMedClient(
+        api_key="test-key",
+        transport=httpx.MockTransport(make_eutils_handler(make_pmids(5), [])),
+        scheduler=RequestScheduler(rate=1000),
+        article_cache=None,
+        search_cache=SearchCache()
+    )
+    monkeypatch.setattr(search_routes, "search_service", SearchService(client))
+    app = FastAPI()
+    app.include_router(search_routes.router)
+    app.include_router(metrics_routes.router)
+    misses_before = CACHE_LOOKUPS.value(cache="search", result="miss")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            search = await http.post("/search/batch", json={"searches": [{"query": "parkinson"}]})
+            exposed = await http.get("/metrics")
+        await client.aclose()
+        return search, exposed
+
+    search, exposed = asyncio.run(run())
+    body = search.json()
+    assert body["timings"]["eutils.esearch"]["calls"] == 1
+    assert body["timings"]["eutils.efetch_parse"]["calls"] == 1
+    assert body["execution_time"] >= body["timings"]["eutils.esearch"]["seconds"]
+
+    assert exposed.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = exposed.text
+    assert 'med_search_stage_duration_seconds_count{stage="eutils.esearch",status="ok"}' in text
+    assert 'med_search_articles_bucket{stage="eutils.efetch_parse",le="5.0"}' in text
+    assert 'med_search_payload_bytes_count{stage="eutils.efetch_parse"}' in text
+    assert 'med_search_eutils_requests_total{outcome="requests"}' in text
+    assert CACHE_LOOKUPS.value(cache="search", result="miss") == misses_before + 1
+
+
+def test_turn_timings_cover_tools_and_llm_calls():
+    @tool
+    async def search_web(query: str) -> str:
+        """Busca na web"""
+        await asyncio.sleep(0.01)
+        return "web"
+
+    usage = {"input_tokens": 10, "output_tokens": 5, "total_tokens": 15}
+    model = ScriptedChatModel(script=[
+        AIMessage(content="", tool_calls=[tool_call("search_web", "1", query="dbs")], usage_metadata=usage),
+        AIMessage(content="pronto", usage_metadata=usage)
+    ])
+    graph = agent_graph.build_agent_graph(model, [search_web], PROMPT)
+
+    async def run():
+        with collect_timings() as timings:
+            await graph.ainvoke(
+                {"messages": [HumanMessage(content="dbs")]},
+                config={"callbacks": [ToolTimingHandler()]}
+            )
+        return timings
+
+    timings = asyncio.run(run())
+    stages = timings.as_dict()["stages"]
+    assert stages["tool.search_web"]["calls"] == 1
+    assert stages["llm.invoke"]["calls"] == 2
+    assert timings.usage == {"input_tokens": 20, "output_tokens": 10, "total_tokens": 30}